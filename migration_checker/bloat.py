@@ -0,0 +1,142 @@
+"""
+Measurement of the dead tuples and growth on disk a migration leaves behind.
+Each updated row leaves a dead version of the row, so a data migration that
+updates every row doubles the size of the table until autovacuum cleans up,
+which can take hours on a large table in production.
+"""
+
+from dataclasses import dataclass
+
+from django.db import DatabaseError, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+from .metrics import format_bytes
+from .results import TableBloat
+from .warnings import TABLE_BLOAT, Warning, with_details
+
+SNAPSHOT_QUERY = """
+SELECT
+    schemaname || '.' || relname,
+    n_live_tup,
+    n_dead_tup,
+    n_tup_upd,
+    pg_table_size(relid),
+    pg_total_relation_size(relid)
+FROM pg_stat_user_tables
+"""
+
+# Autovacuum starts cleaning up a table once dead tuples reach this fraction of
+# the live tuples, by default
+DEFAULT_MAX_BLOAT = 0.2
+
+
+@dataclass(frozen=True)
+class TableStats:
+    live_tuples: int
+    dead_tuples: int
+    updated_tuples: int
+    # Bytes of the table and its TOAST table, without indexes
+    table_size: int
+    # Bytes including indexes
+    size: int
+
+
+def take_snapshot(connection: BaseDatabaseWrapper) -> dict[str, TableStats]:
+    """
+    Get the statistics of each table, including changes committed by this
+    connection.
+    """
+
+    # Statistics of committed transactions are only flushed every second,
+    # unless forced. Before Postgres 15 they can lag behind instead.
+    try:
+        with transaction.atomic(using=connection.alias):
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT pg_stat_force_next_flush()")
+    except DatabaseError:
+        pass
+
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT pg_stat_clear_snapshot()")
+        cursor.execute(SNAPSHOT_QUERY)
+        return {
+            table: TableStats(
+                live_tuples=live_tuples,
+                dead_tuples=dead_tuples,
+                updated_tuples=updated_tuples,
+                table_size=table_size,
+                size=size,
+            )
+            for (
+                table,
+                live_tuples,
+                dead_tuples,
+                updated_tuples,
+                table_size,
+                size,
+            ) in cursor.fetchall()
+        }
+
+
+def get_table_bloat(
+    before: dict[str, TableStats], after: dict[str, TableStats]
+) -> list[TableBloat]:
+    """
+    Get the tables that got dead tuples, updates or changed size between two
+    snapshots. Tables created in between are left out.
+    """
+
+    bloat = []
+    for table, stats in sorted(after.items()):
+        previous = before.get(table)
+        if previous is None:
+            continue
+
+        # Autovacuum may have cleaned up in between
+        dead_tuples = max(stats.dead_tuples - previous.dead_tuples, 0)
+        updated_tuples = max(stats.updated_tuples - previous.updated_tuples, 0)
+        if dead_tuples or updated_tuples or stats.size != previous.size:
+            bloat.append(
+                TableBloat(
+                    table=table,
+                    live_tuples=previous.live_tuples,
+                    dead_tuples=dead_tuples,
+                    updated_tuples=updated_tuples,
+                    size_before=previous.size,
+                    size_after=stats.size,
+                    table_size_before=previous.table_size,
+                    table_size_after=stats.table_size,
+                )
+            )
+    return bloat
+
+
+def get_bloat_warnings(
+    bloat: list[TableBloat], *, max_bloat: float = DEFAULT_MAX_BLOAT
+) -> list[Warning]:
+    """
+    Warn about tables that got more dead tuples, or grew by more, than the
+    given fraction of the table.
+    """
+
+    details = []
+    for table in bloat:
+        # The size of empty tables says nothing about tables in production
+        if not table.live_tuples:
+            continue
+
+        dead_fraction = table.dead_tuples / table.live_tuples
+        # Indexes are left out, as adding one isn't bloat
+        growth = (
+            (table.table_size_after - table.table_size_before) / table.table_size_before
+            if table.table_size_before
+            else 0.0
+        )
+        if dead_fraction >= max_bloat or growth >= max_bloat:
+            details.append(
+                f"{table.table}: {table.dead_tuples} dead tuples for "
+                f"{table.live_tuples} live tuples, {format_bytes(table.size_before)}"
+                f" -> {format_bytes(table.size_after)}"
+            )
+
+    return [with_details(TABLE_BLOAT, details)] if details else []
@@ -0,0 +1,195 @@
+"""
+Lock budgets for a whole deploy. Each migration may be fine on its own, while
+all migrations in a release together block a busy table for too long.
+Budgets are configured per table in pyproject.toml, with "*" applying to all
+tables without a budget of their own:
+
+    [tool.migration_checker.lock_budgets.orders_order]
+    max_seconds = 2.0
+    max_acquisitions = 3
+    # Lock modes counted, defaults to the modes that block writes
+    modes = ["AccessExclusiveLock"]
+"""
+
+import functools
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Iterable, Iterator, Sequence
+
+from .locks import WRITE_BLOCKING_MODES, predict_locks
+from .output import bold, red
+from .registry import load_config
+from .results import MigrationResult
+
+if TYPE_CHECKING:
+    from django.db.migrations import Migration
+
+
+@dataclass(frozen=True)
+class LockBudget:
+    max_seconds: float | None = None
+    max_acquisitions: int | None = None
+    modes: frozenset[str] = WRITE_BLOCKING_MODES
+
+
+@dataclass
+class LockTotal:
+    seconds: float = 0.0
+    acquisitions: int = 0
+
+
+def parse_budgets(section: dict[str, Any]) -> dict[str, LockBudget]:
+    return {
+        table: LockBudget(
+            max_seconds=budget.get("max_seconds"),
+            max_acquisitions=budget.get("max_acquisitions"),
+            modes=frozenset(budget.get("modes", WRITE_BLOCKING_MODES)),
+        )
+        for table, budget in section.items()
+    }
+
+
+@functools.lru_cache(maxsize=None)
+def get_lock_budgets() -> dict[str, LockBudget]:
+    """
+    Get the lock budgets configured by pyproject.toml in the current directory.
+    """
+
+    return parse_budgets(load_config().get("lock_budgets", {}))
+
+
+def get_lock_intervals(
+    result: MigrationResult,
+) -> Iterator[tuple[str, str, float, float]]:
+    """
+    Get when a migration took and released each lock, in seconds since it
+    started. Locks are held until the migration commits, and without a lock
+    timeline they are counted from the start of the migration. Locks predicted
+    for migrations applied outside of a transaction are only held by the
+    statements that take them.
+    """
+
+    if result.locks_predicted and len(result.timings) == len(result.queries):
+        for query, timing in zip(result.queries, result.timings):
+            for table, mode in predict_locks([query]):
+                yield table, mode, timing.start, timing.start + timing.duration
+        return
+
+    end = max(
+        (timing.start + timing.duration for timing in result.timings),
+        default=result.duration or 0.0,
+    )
+    taken: dict[tuple[str, str], float] = {}
+    for timing in result.timings:
+        for lock in timing.locks or ():
+            taken.setdefault(lock, timing.start)
+
+    for table, mode in result.locks or ():
+        yield table, mode, taken.get((table, mode), 0.0), end
+
+
+def get_held_locks(result: MigrationResult) -> Iterator[tuple[str, str, float]]:
+    """
+    Get how long each lock was held by a migration.
+    """
+
+    held: dict[tuple[str, str], float] = {}
+    for table, mode, start, end in get_lock_intervals(result):
+        held[(table, mode)] = held.get((table, mode), 0.0) + end - start
+    for (table, mode), seconds in held.items():
+        yield table, mode, seconds
+
+
+def get_locked_seconds(intervals: Iterable[tuple[float, float]]) -> float:
+    """
+    Get how long any of the intervals covers, counting overlaps once.
+    """
+
+    seconds = 0.0
+    covered_until = None
+    for start, end in sorted(intervals):
+        if covered_until is not None and start < covered_until:
+            start = covered_until
+        if end > start:
+            seconds += end - start
+        covered_until = end if covered_until is None else max(covered_until, end)
+    return seconds
+
+
+class LockBudgetOutput:
+    """
+    Add up the locks taken on each table across the plan, and check the
+    totals against the budgets once all migrations are checked.
+    """
+
+    def __init__(self, *, budgets: dict[str, LockBudget] | None = None) -> None:
+        self.budgets = get_lock_budgets() if budgets is None else budgets
+        self.totals: dict[tuple[str, str], LockTotal] = defaultdict(LockTotal)
+        # The locks of each migration, as locks in several modes on the same
+        # table by one migration block the table only once
+        self.intervals: list[list[tuple[str, str, float, float]]] = []
+        self.exceeded: list[str] = []
+
+    def no_migrations_to_apply(self) -> None:
+        pass
+
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        pass
+
+    def migration_result(self, migration: "Migration", result: MigrationResult) -> None:
+        # Rolling back is a separate deploy
+        if result.backwards:
+            return
+        for table, mode, seconds in get_held_locks(result):
+            total = self.totals[(table, mode)]
+            total.seconds += seconds
+            total.acquisitions += 1
+        self.intervals.append(list(get_lock_intervals(result)))
+
+    def get_exceeded(self) -> Iterator[str]:
+        tables = sorted({table for table, _ in self.totals})
+        for table in tables:
+            budget = self.budgets.get(table, self.budgets.get("*"))
+            if budget is None:
+                continue
+
+            seconds = 0.0
+            acquisitions = 0
+            for intervals in self.intervals:
+                locked = [
+                    (start, end)
+                    for locked_table, mode, start, end in intervals
+                    if locked_table == table and mode in budget.modes
+                ]
+                if locked:
+                    seconds += get_locked_seconds(locked)
+                    acquisitions += 1
+
+            if budget.max_seconds is not None and seconds > budget.max_seconds:
+                yield (
+                    f"{table} is locked for {seconds:.2f} s, "
+                    f"the budget is {budget.max_seconds:.2f} s"
+                )
+            if (
+                budget.max_acquisitions is not None
+                and acquisitions > budget.max_acquisitions
+            ):
+                yield (
+                    f"{table} is locked {acquisitions} times, "
+                    f"the budget is {budget.max_acquisitions}"
+                )
+
+    def done(self) -> None:
+        if not self.totals:
+            return
+
+        print(f"\n{bold('🔒 Locks across the plan')}")
+        for (table, mode), total in sorted(self.totals.items()):
+            print(
+                f"    {table} {mode}: {total.acquisitions} times, "
+                f"{total.seconds:.2f} s"
+            )
+
+        self.exceeded = list(self.get_exceeded())
+        for line in self.exceeded:
+            print(red(f"    ⛔ {line}"))
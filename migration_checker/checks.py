@@ -1,4 +1,4 @@
-from typing import Iterable, Protocol
+from typing import Iterable, Iterator, Protocol
 
 import django
 from django.contrib.postgres.operations import AddIndexConcurrently
@@ -10,30 +10,41 @@ from django.db.migrations import (
     AlterField,
     Migration,
     RemoveField,
+    RemoveIndex,
     RenameField,
     RenameModel,
     RunPython,
     RunSQL,
+    SeparateDatabaseAndState,
 )
+from django.db.migrations.operations.base import Operation
 from django.db.migrations.operations.fields import FieldOperation
 from django.db.migrations.operations.models import ModelOperation
 from django.db.migrations.state import ModelState, ProjectState
+from django.db.models import Field
 
+from .indexes import IndexStats, get_overlapping_indexes, load_snapshot
+from .operations import RunPythonInBatches
+from .rewrites import Column, ColumnChange, Impact, get_column_changes, get_warnings
 from .warnings import (
     ADD_INDEX_IN_SEPARATE_MIGRATION,
     ADDING_CONSTRAINT,
     ADDING_FIELD_WITH_CHECK,
     ADDING_NON_NULLABLE_FIELD,
-    ALTER_FIELD,
     ALTERING_MULTIPLE_MODELS,
     ATOMIC_DATA_MIGRATION,
+    BACKWARDS_REWRITE,
+    IRREVERSIBLE_MIGRATION,
+    OVERLAPPING_INDEX,
     REMOVING_FIELD,
+    REMOVING_USED_INDEX,
     RENAMING_FIELD,
     RENAMING_MODEL,
     SCHEMA_AND_DATA_CHANGES,
     USE_ADD_INDEX_CONCURRENTLY,
     VALIDATE_CONSTRAINT_SEPARATELY,
     Warning,
+    with_details,
 )
 
 
@@ -99,6 +110,10 @@ def check_data_and_schema_changes(
 ) -> Iterable[Warning]:
     data_migration, schema_migration = False, False
     for operation in migration.operations:
+        # Batches run after the schema changes committed, without holding
+        # their locks
+        if isinstance(operation, RunPythonInBatches):
+            continue
         if isinstance(operation, (RunPython, RunSQL)):
             data_migration = True
         else:
@@ -168,23 +183,148 @@ def check_validate_constraint(
         yield VALIDATE_CONSTRAINT_SEPARATELY
 
 
+def get_column(field: Field) -> Column:  # type: ignore[type-arg]
+    # The type of a relation depends on the related model, which is not
+    # resolved in the project state. Like the linter, only the class is used.
+    related = field.remote_field is not None
+    return Column(
+        db_type=f"<{type(field).__name__}>" if related else field.db_type(connection),
+        null=field.null,
+        unique=field.unique,
+        indexed=field.db_index,  # type: ignore[attr-defined]
+        check=(
+            connection.data_type_check_constraints.get(field.get_internal_type())
+            is not None
+        ),
+        foreign_key=related and getattr(field, "db_constraint", False),
+        collation=getattr(field, "db_collation", None),
+    )
+
+
+def get_alter_field_changes(
+    *, migration: Migration, state: ProjectState, backwards: bool = False
+) -> Iterator[ColumnChange]:
+    """
+    Get what Postgres has to do for each AlterField in the migration,
+    comparing the field before the migration with the new one, or the other
+    way around when unapplying it.
+    """
+
+    for operation in migration.operations:
+        if not isinstance(operation, AlterField):
+            continue
+        model: ModelState = state.models[(migration.app_label, operation.model_name)]
+        old_column = get_column(model.fields[operation.name])
+        new_column = get_column(operation.field)
+        if backwards:
+            old_column, new_column = new_column, old_column
+        yield from get_column_changes(old_column, new_column)
+
+
 def check_alter_field(
     *, migration: Migration, state: ProjectState
 ) -> Iterable[Warning]:
-    def changes_type(operation: AlterField) -> bool:
-        # Extract the old field
-        model: ModelState = state.models[(migration.app_label, operation.model_name)]
-        field = model.fields[operation.name]
-        # TODO: Also check other things that have changed
-        return type(field) is not type(operation.field)  # noqa: E721
+    return get_warnings(get_alter_field_changes(migration=migration, state=state))
 
-    alter_fields = [
-        operation
-        for operation in migration.operations
-        if isinstance(operation, AlterField)
-    ]
-    if any(changes_type(operation) for operation in alter_fields):
-        yield ALTER_FIELD
+
+def get_column_name(name: str, field: Field) -> str:  # type: ignore[type-arg]
+    if field.db_column:
+        return field.db_column
+    return f"{name}_id" if field.remote_field is not None else name
+
+
+def get_index_changes(
+    *, migration: Migration, state: ProjectState
+) -> Iterator[tuple[str, str, tuple[str, ...] | None, tuple[str, ...] | None]]:
+    """
+    Get the indexes removed and added by the migration as tuples of the
+    operation, the table, the columns of a removed index and the columns of
+    an added index. Removed indexes are identified by name when the columns
+    aren't known.
+    """
+
+    for operation in migration.operations:
+        if not isinstance(operation, (AddIndex, RemoveIndex, AlterField)):
+            continue
+        model = state.models.get((migration.app_label, operation.model_name_lower))
+        if model is None:
+            continue
+        table = model.options.get("db_table") or (
+            f"{migration.app_label}_{operation.model_name_lower}"
+        )
+
+        if isinstance(operation, RemoveIndex):
+            yield operation.name, table, None, None
+
+        elif isinstance(operation, AddIndex):
+            index = operation.index
+            if index.condition is not None or index.contains_expressions:
+                continue
+            columns = tuple(
+                get_column_name(name, model.fields[name])
+                for name in (field.lstrip("-") for field in index.fields)
+                if name in model.fields
+            )
+            yield index.name, table, None, columns
+
+        elif operation.name in model.fields:
+            old_field = model.fields[operation.name]
+            new_field = operation.field
+            old_indexed = old_field.db_index or old_field.unique
+            new_indexed = new_field.db_index or new_field.unique  # type: ignore
+            columns = (get_column_name(operation.name, new_field),)
+            if old_indexed and not new_indexed:
+                yield operation.name, table, columns, None
+            elif new_indexed and not old_indexed:
+                yield operation.name, table, None, columns
+
+
+def check_index_usage(
+    *,
+    migration: Migration,
+    state: ProjectState,
+    snapshot: str | None = None,
+    min_scans: int = 1,
+) -> Iterable[Warning]:
+    """
+    Check removed and added indexes against statistics exported from
+    production. Configured with the path of the snapshot:
+
+        [tool.migration_checker.checks.index_usage]
+        snapshot = "indexes.json"
+    """
+
+    if snapshot is None:
+        return
+
+    indexes = load_snapshot(snapshot)
+    used: list[IndexStats] = []
+    overlapping: list[str] = []
+    for name, table, removed, added in get_index_changes(
+        migration=migration, state=state
+    ):
+        if added is None:
+            used.extend(
+                index
+                for index in indexes
+                if index.table == table
+                and (index.columns == removed if removed else index.name == name)
+                and index.scans >= min_scans
+            )
+        else:
+            overlapping.extend(
+                f"{existing} {reason}"
+                for existing, reason in get_overlapping_indexes(
+                    indexes, table=table, columns=added
+                )
+            )
+
+    if used:
+        yield with_details(
+            REMOVING_USED_INDEX, [f"{index}: {index.scans} scans" for index in used]
+        )
+    if overlapping:
+        yield with_details(OVERLAPPING_INDEX, overlapping)
 
 
 ALL_CHECKS: list[Check] = [
@@ -200,6 +340,7 @@ ALL_CHECKS: list[Check] = [
     check_add_constraint,
     check_validate_constraint,
     check_alter_field,
+    check_index_usage,
 ]
 
 
@@ -209,3 +350,28 @@ def run_checks(migration: Migration, state: ProjectState) -> list[Warning]:
         for check in ALL_CHECKS
         for warning in check(migration=migration, state=state)
     ]
+
+
+def get_irreversible_operations(operations: Iterable[Operation]) -> Iterator[Operation]:
+    for operation in operations:
+        if not operation.reversible:
+            yield operation
+        elif isinstance(operation, SeparateDatabaseAndState):
+            yield from get_irreversible_operations(operation.database_operations)
+
+
+def get_backwards_warnings(
+    *, migration: Migration, state: ProjectState
+) -> list[Warning]:
+    """
+    Check what unapplying a migration would do. The state is the one before
+    the migration is applied.
+    """
+
+    if any(get_irreversible_operations(migration.operations)):
+        return [IRREVERSIBLE_MIGRATION]
+
+    changes = get_alter_field_changes(migration=migration, state=state, backwards=True)
+    if any(change.impact == Impact.REWRITE for change in changes):
+        return [BACKWARDS_REWRITE]
+    return []
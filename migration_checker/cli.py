@@ -1,14 +1,61 @@
 import argparse
+import contextlib
 import json
 import os
-from typing import Union
+import sys
+from typing import TYPE_CHECKING
 
-from .executor import Executor
 from .github import GithubClient
-from .output import ConsoleOutput, GithubCommentOutput
+from .profiling import Profiler
 
+if TYPE_CHECKING:
+    from .output import GithubCommentOutput
 
-def main() -> None:
+
+def parse_shard(value: str) -> tuple[int, int]:
+    try:
+        index, num_shards = (int(part) for part in value.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError("Shard must be given as i/N, e.g. 1/4")
+    if not 1 <= index <= num_shards:
+        raise argparse.ArgumentTypeError("Shard index must be between 1 and N")
+    return index, num_shards
+
+
+def get_github_output(
+    github_token: str | None, report_path: str | None = None
+) -> "GithubCommentOutput | None":
+    from .output import GithubCommentOutput
+
+    event_name = os.environ.get("GITHUB_EVENT_NAME", None)
+    event_path = os.environ.get("GITHUB_EVENT_PATH", None)
+    repository = os.environ.get("GITHUB_REPOSITORY", None)
+
+    event_data = {}
+    if event_path:
+        with open(event_path, "r") as f:
+            event_data = json.loads(f.read())
+            assert isinstance(event_data, dict)
+
+    if github_token and repository and event_name == "pull_request" and event_data:
+        pull_request = int(event_data["number"])
+        github_client = GithubClient(
+            token=github_token,
+            repo=repository,
+            pull_request=pull_request,
+        )
+        report_url = None
+        if report_path and (run_id := os.environ.get("GITHUB_RUN_ID")):
+            server_url = os.environ.get("GITHUB_SERVER_URL", "https://github.com")
+            report_url = f"{server_url}/{repository}/actions/runs/{run_id}"
+        return GithubCommentOutput(
+            client=github_client, report_path=report_path, report_url=report_url
+        )
+
+    return None
+
+
+def get_parser() -> argparse.ArgumentParser:
     parser = argparse.ArgumentParser(
         description="Check for unsafe or missing migrations"
     )
@@ -23,34 +70,356 @@ def main() -> None:
         action="store_true",
         help="Apply migrations. Without this only static checks are run.",
     )
+    parser.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help=(
+            "Apply independent migrations in parallel, each group of "
+            "migrations against its own clone of the database"
+        ),
+    )
+    parser.add_argument(
+        "--shard",
+        type=parse_shard,
+        help=(
+            "Only check shard i of N, e.g. 1/4. Migrations that depend on each "
+            "other are always checked in the same shard. Requires --results-file."
+        ),
+    )
+    parser.add_argument(
+        "--results-file",
+        type=str,
+        help="Write results to a file that can be combined using merge",
+    )
+    parser.add_argument(
+        "--progress",
+        action="store_true",
+        help=(
+            "Print a line per migration and the progress of the run, instead "
+            "of details for each migration. Durations from --metrics-db are "
+            "used to estimate the time left."
+        ),
+    )
+    parser.add_argument(
+        "--jsonl",
+        type=str,
+        help="Write a JSON record for each migration to a file as it is checked",
+    )
+    parser.add_argument(
+        "--sarif",
+        type=str,
+        help="Write warnings to a SARIF file for code scanning tools",
+    )
+    parser.add_argument(
+        "--backwards",
+        choices=["each", "plan"],
+        help=(
+            "Also unapply migrations and check the queries and locks of rolling "
+            "back: each migration right after applying it, or the whole plan "
+            "in reverse at the end. Requires --apply."
+        ),
+    )
+    parser.add_argument(
+        "--replay",
+        type=str,
+        help=(
+            "Corpus of queries recorded from the old code, replayed after each "
+            "migration to find queries that fail or get slower. Requires --apply."
+        ),
+    )
+    parser.add_argument(
+        "--replay-slowdown",
+        type=float,
+        default=5.0,
+        help="How many times slower a replayed query must get to be reported",
+    )
+    parser.add_argument(
+        "--bloat",
+        action="store_true",
+        help=(
+            "Measure the dead tuples and growth on disk of tables changed by "
+            "each migration. Requires --apply."
+        ),
+    )
+    parser.add_argument(
+        "--max-bloat",
+        type=float,
+        help=(
+            "Fraction of a table's rows left as dead tuples, or growth of its "
+            "size, above which a migration is reported. Defaults to the "
+            "fraction at which autovacuum starts cleaning up a table."
+        ),
+    )
+    parser.add_argument(
+        "--timeline",
+        type=str,
+        help=(
+            "Write an HTML timeline of the queries and locks of each migration. "
+            "Locks are checked after every query, which slows down applying."
+        ),
+    )
+    parser.add_argument(
+        "--lock-graph",
+        type=str,
+        help="Write a Graphviz graph of the tables each migration locks",
+    )
+    parser.add_argument(
+        "--metrics-db",
+        type=str,
+        help=(
+            "Append how long each migration took to a SQLite database, to "
+            "track trends using the report command"
+        ),
+    )
+    parser.add_argument(
+        "--report-file",
+        type=str,
+        help=(
+            "Write the full markdown report to a file. The Github comment links "
+            "to it, as details are left out of large comments."
+        ),
+    )
+    parser.add_argument(
+        "--timings",
+        type=str,
+        help="Write a JSON report of how long each phase of the run took",
+    )
+    parser.add_argument(
+        "--trace",
+        type=str,
+        help="Write timings as Chrome trace events, e.g. for ui.perfetto.dev",
+    )
+    parser.add_argument(
+        "--profile-imports",
+        action="store_true",
+        help="Include the time spent importing each module in the timings",
+    )
+
+    subparsers = parser.add_subparsers(dest="command")
+    merge_parser = subparsers.add_parser(
+        "merge", help="Combine result files and report them as a single run"
+    )
+    merge_parser.add_argument("paths", nargs="+", help="Result files to merge")
+    merge_parser.add_argument(
+        "--github-token",
+        type=str,
+        help="Access token to use to post comment on Github",
+        default=argparse.SUPPRESS,
+    )
+
+    report_parser = subparsers.add_parser(
+        "report",
+        help="Show how long migrations took over time, and which got slower",
+    )
+    report_parser.add_argument(
+        "--metrics-db",
+        type=str,
+        help="Database written using --metrics-db",
+        default=argparse.SUPPRESS,
+        required=True,
+    )
+    report_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.5,
+        help="Report migrations slower than this times their median duration",
+    )
+    report_parser.add_argument(
+        "--min-runs",
+        type=int,
+        default=3,
+        help="Number of earlier runs needed to detect a regression",
+    )
+    report_parser.add_argument(
+        "--max-runs",
+        type=int,
+        default=100,
+        help="Number of latest runs of each migration to include",
+    )
+
+    fix_parser = subparsers.add_parser(
+        "fix",
+        help=(
+            "Split a migration into migrations that hold locks for as short as "
+            "possible. Only use this on migrations that haven't been applied."
+        ),
+    )
+    fix_parser.add_argument("app_label", help="App of the migration")
+    fix_parser.add_argument("migration_name", help="Name, or prefix, of the migration")
+    fix_parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Print the new migrations instead of writing them",
+    )
+
+    watch_parser = subparsers.add_parser(
+        "watch",
+        help=(
+            "Keep Django loaded and re-run static checks when migration files "
+            "change. Query results using python -m migration_checker.client."
+        ),
+    )
+    watch_parser.add_argument(
+        "--socket",
+        type=str,
+        help="Socket to listen for queries on",
+        default=".migration-checker.sock",
+    )
+
+    return parser
+
+
+def main() -> None:
+    profiler = Profiler()
+
+    parser = get_parser()
     args = parser.parse_args()
 
-    event_name = os.environ.get("GITHUB_EVENT_NAME", None)
-    event_path = os.environ.get("GITHUB_EVENT_PATH", None)
-    repository = os.environ.get("GITHUB_REPOSITORY", None)
+    if args.shard and not args.results_file:
+        parser.error("--shard requires --results-file")
+    if args.backwards and not args.apply:
+        parser.error("--backwards requires --apply")
+    if args.replay and not args.apply:
+        parser.error("--replay requires --apply")
+    if args.bloat and not args.apply:
+        parser.error("--bloat requires --apply")
 
-    event_data = {}
-    if event_path:
-        with open(event_path, "r") as f:
-            event_data = json.loads(f.read())
-            assert isinstance(event_data, dict)
+    time_imports = (
+        profiler.time_imports() if args.profile_imports else contextlib.nullcontext()
+    )
 
-    outputs: list[Union[ConsoleOutput, GithubCommentOutput]] = [ConsoleOutput()]
+    try:
+        with time_imports:
+            run(args, profiler=profiler)
+    finally:
+        if args.timings:
+            profiler.write_report(args.timings)
+            print("\n🐢 Slowest checks")
+            for name, duration in profiler.get_slowest("check "):
+                print(f"    {name}: {duration * 1000:.1f} ms")
+        if args.trace:
+            profiler.write_trace(args.trace)
 
-    if args.github_token and repository and event_name == "pull_request" and event_data:
-        pull_request = int(event_data["number"])
-        github_client = GithubClient(
-            token=args.github_token,
-            repo=repository,
-            pull_request=pull_request,
+
+def run(args: argparse.Namespace, *, profiler: Profiler) -> None:
+    if args.command == "report":
+        from .metrics import print_report
+
+        regressions = print_report(
+            args.metrics_db,
+            threshold=args.threshold,
+            min_runs=args.min_runs,
+            max_runs=args.max_runs,
+        )
+        sys.exit(1 if regressions else 0)
+
+    # Imported here, so the time it takes to import Django is recorded
+    with profiler.phase("imports"):
+        from django.db import connections
+
+        from .bloat import DEFAULT_MAX_BLOAT
+        from .budgets import LockBudgetOutput, get_lock_budgets
+        from .executor import Executor
+        from .fix import fix_migration
+        from .lockorder import LockGraphOutput
+        from .metrics import MetricsOutput, get_expected_durations
+        from .output import (
+            ConsoleOutput,
+            JsonLinesOutput,
+            Output,
+            ProgressOutput,
+            ResultFileOutput,
+            SarifOutput,
+        )
+        from .replay import Replayer, read_corpus
+        from .shards import merge_results
+        from .timeline import TimelineOutput
+        from .watch import Watcher
+
+    if args.command == "fix":
+        fix_migration(
+            app_label=args.app_label, name=args.migration_name, dry_run=args.dry_run
+        )
+        return
+
+    if args.command == "watch":
+        Watcher(socket_path=args.socket).run()
+        return
+
+    outputs: list[Output] = []
+    if args.progress:
+        expected_durations = (
+            get_expected_durations(args.metrics_db)
+            if args.metrics_db and os.path.exists(args.metrics_db)
+            else None
         )
-        outputs.append(GithubCommentOutput(client=github_client))
+        outputs.append(ProgressOutput(expected_durations=expected_durations))
+    else:
+        outputs.append(ConsoleOutput())
+
+    # When sharding the comment is posted once the shards have been merged
+    github_output = (
+        None if args.shard else get_github_output(args.github_token, args.report_file)
+    )
+    if github_output:
+        outputs.append(github_output)
+
+    if args.results_file:
+        outputs.append(ResultFileOutput(path=args.results_file))
+
+    if args.jsonl:
+        outputs.append(JsonLinesOutput(path=args.jsonl))
+
+    if args.sarif:
+        outputs.append(SarifOutput(path=args.sarif))
+
+    if args.metrics_db:
+        outputs.append(MetricsOutput(path=args.metrics_db))
+
+    if args.timeline:
+        outputs.append(TimelineOutput(path=args.timeline))
+
+    if args.lock_graph:
+        outputs.append(LockGraphOutput(path=args.lock_graph))
+
+    # Added after the other outputs, so the totals are printed last
+    budget_output = LockBudgetOutput() if get_lock_budgets() else None
+    if budget_output:
+        outputs.append(budget_output)
+
+    if args.command == "merge":
+        merge_results(paths=args.paths, outputs=outputs)
+    else:
+        replayer = (
+            Replayer(
+                connection=connections[args.database],
+                queries=read_corpus(args.replay),
+                slowdown=args.replay_slowdown,
+            )
+            if args.replay
+            else None
+        )
+
+        max_bloat = None
+        if args.bloat:
+            max_bloat = DEFAULT_MAX_BLOAT if args.max_bloat is None else args.max_bloat
+
+        Executor(
+            database=args.database,
+            apply_migrations=args.apply,
+            outputs=outputs,
+            jobs=args.jobs,
+            shard=args.shard,
+            profiler=profiler,
+            lock_timeline=bool(args.timeline),
+            backwards=args.backwards,
+            replayer=replayer,
+            max_bloat=max_bloat,
+        ).run()
 
-    Executor(
-        database=args.database,
-        apply_migrations=args.apply,
-        outputs=outputs,
-    ).run()
+    if budget_output and budget_output.exceeded:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
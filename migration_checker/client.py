@@ -0,0 +1,63 @@
+"""
+A small client for the watch daemon. This does not import Django, so it is
+fast enough to run from editors and pre-commit hooks:
+
+    python -m migration_checker.client app/migrations/0002_foo.py
+"""
+
+import argparse
+import json
+import os
+import socket
+import sys
+
+from .results import MigrationResult
+
+
+class QueryError(Exception):
+    """
+    The daemon could not answer the query.
+    """
+
+
+def query(*, socket_path: str, paths: list[str]) -> list[MigrationResult]:
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as connection:
+        connection.connect(socket_path)
+        request = {"paths": [os.path.abspath(path) for path in paths]}
+        connection.sendall(json.dumps(request).encode() + b"\n")
+        response = json.loads(connection.makefile("r").readline())
+
+    assert isinstance(response, dict)
+    if "error" in response:
+        raise QueryError(response["error"])
+    return [MigrationResult.from_dict(result) for result in response["results"]]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Get results for migration files from a running watch daemon"
+    )
+    parser.add_argument(
+        "--socket",
+        type=str,
+        help="Socket the daemon listens on",
+        default=".migration-checker.sock",
+    )
+    parser.add_argument("paths", nargs="*", help="Migration files to check")
+    args = parser.parse_args()
+
+    try:
+        results = query(socket_path=args.socket, paths=args.paths)
+    except QueryError as e:
+        sys.exit(f"The watch daemon could not check the migrations: {e}")
+
+    for result in results:
+        for warning in result.warnings:
+            print(f"{result.app_label}.{result.name}: {warning}")
+
+    # Fail pre-commit hooks if there's anything to look at
+    sys.exit(1 if any(result.warnings for result in results) else 0)
+
+
+if __name__ == "__main__":
+    main()
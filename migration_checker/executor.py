@@ -2,27 +2,55 @@
 Helper to execute migrations and record results
 """
 
-from typing import Any, Callable, Sequence, Union, cast
+import contextlib
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Callable, Iterator, Sequence, cast
 
 import django
-import sqlparse  # type: ignore[import]
 from django.contrib.postgres.operations import NotInTransactionMixin
-from django.db import connections, transaction
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
 from django.db.migrations import Migration, RunSQL, SeparateDatabaseAndState
 from django.db.migrations.executor import MigrationExecutor
 from django.db.migrations.operations.base import Operation
 from django.db.migrations.recorder import MigrationRecorder
 from django.db.migrations.state import ProjectState
 
-from migration_checker.warnings import MULTIPLE_EXCLUSIVE_LOCKS
-
-from .checks import run_checks
-from .output import ConsoleOutput, GithubCommentOutput
+from migration_checker.warnings import (
+    BACKWARDS_EXCLUSIVE_LOCK,
+    MULTIPLE_EXCLUSIVE_LOCKS,
+)
+
+from .bloat import get_bloat_warnings, get_table_bloat, take_snapshot
+from .checks import get_backwards_warnings, get_irreversible_operations
+from .lockorder import get_lock_order_config, get_lock_order_warnings
+from .locks import predict_locks
+from .operations import observe_batches
+from .output import BackgroundOutputs, Output
+from .parallel import check_in_clone, partition_plan
+from .profiling import Profiler
+from .registry import get_registry
+from .replay import Replayer
+from .results import BatchTiming, MigrationResult, QueryTiming
+from .sql import must_be_non_atomic
 
 
 class QueryLogger:
-    def __init__(self) -> None:
+    def __init__(
+        self,
+        get_locks: Callable[[], list[tuple[str, str]]] | None = None,
+        *,
+        get_batch_locks: Callable[[], list[tuple[str, str]]] | None = None,
+    ) -> None:
         self.queries: list[str] = []
+        self.timings: list[QueryTiming] = []
+        self.batches: list[BatchTiming] = []
+        self.get_locks = get_locks
+        self.get_batch_locks = get_batch_locks
+        self.origin = time.perf_counter()
+        self.taking_snapshot = False
 
     def __call__(
         self,
@@ -32,6 +60,10 @@ class QueryLogger:
         many: bool,
         context: dict[str, Any],
     ) -> Any:
+        # Don't record the queries used to check locks
+        if self.taking_snapshot:
+            return execute(sql, params, many, context)
+
         cursor = context["cursor"]
         mogrify_result = cursor.mogrify(sql, params)
         rendered_sql: str = (
@@ -41,7 +73,41 @@ class QueryLogger:
         )
         self.queries.append(rendered_sql)
 
-        return execute(sql, params, many, context)
+        timing = QueryTiming(start=time.perf_counter() - self.origin)
+        self.timings.append(timing)
+        result = execute(sql, params, many, context)
+        timing.duration = time.perf_counter() - self.origin - timing.start
+
+        if self.get_locks:
+            self.taking_snapshot = True
+            try:
+                timing.locks = self.get_locks()
+            finally:
+                self.taking_snapshot = False
+
+        return result
+
+    @contextlib.contextmanager
+    def batch(self, rows: int) -> Iterator[None]:
+        """
+        Record the timing of a batch of a RunPythonInBatches operation, and
+        the locks its transaction holds before committing.
+        """
+
+        timing = BatchTiming(start=time.perf_counter() - self.origin, rows=rows)
+        self.batches.append(timing)
+        yield
+        timing.duration = time.perf_counter() - self.origin - timing.start
+
+        if self.get_batch_locks:
+            self.taking_snapshot = True
+            try:
+                timing.locks = self.get_batch_locks()
+            finally:
+                self.taking_snapshot = False
+
+
+BACKWARDS_MODES = ("each", "plan")
 
 
 class Executor:
@@ -50,122 +116,414 @@ class Executor:
         *,
         database: str,
         apply_migrations: bool,
-        outputs: list[Union[ConsoleOutput, GithubCommentOutput]],
+        outputs: list[Output],
+        jobs: int = 1,
+        shard: tuple[int, int] | None = None,
+        profiler: Profiler | None = None,
+        lock_timeline: bool = False,
+        backwards: str | None = None,
+        replayer: Replayer | None = None,
+        max_bloat: float | None = None,
     ) -> None:
+        if backwards not in (None, *BACKWARDS_MODES):
+            raise ValueError(f"Unknown backwards mode {backwards!r}")
+        if backwards and not apply_migrations:
+            raise ValueError("Migrations must be applied to check unapplying them")
+        if replayer and not apply_migrations:
+            raise ValueError("Migrations must be applied to replay queries")
+        if max_bloat is not None and not apply_migrations:
+            raise ValueError("Migrations must be applied to measure bloat")
+
         self.database = database
         self.apply_migrations = apply_migrations
         self.outputs = outputs
+        self.jobs = jobs
+        self.shard = shard
+        self.profiler = profiler or Profiler()
+        # Check which locks are held after every query, not just at the end
+        self.lock_timeline = lock_timeline
+        # Also unapply each migration right after applying it ("each"), or
+        # the whole plan in reverse after applying it ("plan")
+        self.backwards = backwards
+        # Replays queries from the old code after each migration
+        self.replayer = replayer
+        # Measures dead tuples and growth of tables, and warns when a
+        # migration adds more than this fraction of a table
+        self.max_bloat = max_bloat
         self.connection = connections[self.database]
         self.recorder = MigrationRecorder(self.connection)
 
     def run(self) -> None:
+        profiler = self.profiler
+
         # First we need to set up Django
-        django.setup()
+        with profiler.phase("django.setup"):
+            django.setup()
 
         connection = connections[self.database]
 
         # Hook for backends needing any database preparation
-        connection.prepare_database()
+        with profiler.phase("prepare database"):
+            connection.prepare_database()
 
-        executor = MigrationExecutor(connection)
+        with profiler.phase("load migrations"):
+            executor = MigrationExecutor(connection)
 
         # Raise an error if any migrations are applied before their dependencies.
-        executor.loader.check_consistent_history(connection)
-
-        targets: set[tuple[str, str]] = executor.loader.graph.leaf_nodes()
-        plan: list[tuple[Migration, bool]] = executor.migration_plan(targets)
+        with profiler.phase("check consistent history"):
+            executor.loader.check_consistent_history(connection)
 
-        if not plan:
-            for output in self.outputs:
-                output.no_migrations_to_apply()
-            return
+        # Leaf nodes are sorted, which keeps the plan stable between runs. That
+        # is required for shards to agree on how the plan is partitioned.
+        with profiler.phase("build plan"):
+            targets: list[tuple[str, str]] = executor.loader.graph.leaf_nodes()
+            plan: list[tuple[Migration, bool]] = executor.migration_plan(targets)
 
         assert not any(backwards for _migration, backwards in plan)
 
-        for output in self.outputs:
-            output.begin(num_migrations=len(plan))
+        migrations = [migration for migration, _ in plan]
+        if self.shard:
+            index, num_shards = self.shard
+            shards = partition_plan(executor.loader.graph, migrations, num_shards)
+            migrations = shards[index - 1] if index <= len(shards) else []
+
+        # Results are rendered and posted on a background thread, while the
+        # next migration is being applied.
+        outputs = BackgroundOutputs(self.outputs)
+        try:
+            if not migrations:
+                outputs.no_migrations_to_apply()
+                return
+
+            keys = [(migration.app_label, migration.name) for migration in migrations]
+            # Unapplying gives a second result for each migration
+            if self.backwards:
+                keys *= 2
+            outputs.begin(num_migrations=len(keys), keys=keys)
+
+            parts = partition_plan(executor.loader.graph, migrations, self.jobs)
+
+            if self.replayer:
+                with profiler.phase("replay baseline"):
+                    self.replayer.record_baseline()
+
+            # Unapplying and replaying have to follow the order of the whole plan
+            if (
+                self.apply_migrations
+                and not self.backwards
+                and not self.replayer
+                and len(parts) > 1
+            ):
+                results = self._check_parts_in_parallel(migrations, parts)
+            else:
+                results = self.check_migrations(
+                    [(migration.app_label, migration.name) for migration in migrations],
+                    executor=executor,
+                )
 
-        state = executor._create_project_state(  # type: ignore[attr-defined]
-            with_applied_migrations=True,
-        )
+            for result in results:
+                migration = executor.loader.graph.nodes[result.key]
+                with profiler.phase("outputs"):
+                    outputs.migration_result(migration=migration, result=result)
 
-        for migration, _ in plan:
-            # Run checkers on the migration
-            warnings = run_checks(migration, state)
+            with profiler.phase("outputs"):
+                outputs.done()
+        finally:
+            outputs.close()
 
-            if self.apply_migrations:
-                queries, locks = self._apply_migration(migration, state)
-            else:
-                queries, locks = [], None
+    def check_migrations(
+        self,
+        keys: list[tuple[str, str]],
+        executor: MigrationExecutor | None = None,
+    ) -> Iterator[MigrationResult]:
+        """
+        Check, and optionally apply, the given migrations in order.
+        """
 
-            num_exclusive_locks = sum(
-                1
-                for _, lock_type in locks or ()
-                if lock_type in ("AccessExclusiveLock", "ExclusiveLock")
+        if executor is None:
+            with self.profiler.phase("load migrations"):
+                executor = MigrationExecutor(self.connection)
+
+        with self.profiler.phase("project state"):
+            state = executor._create_project_state(  # type: ignore[attr-defined]
+                with_applied_migrations=True,
             )
-            if num_exclusive_locks > 1:
-                warnings.append(MULTIPLE_EXCLUSIVE_LOCKS)
 
-            for output in self.outputs:
-                output.migration_result(
-                    migration=migration, queries=queries, locks=locks, warnings=warnings
+        applied: list[tuple[Migration, ProjectState]] = []
+        for key in keys:
+            migration = executor.loader.graph.nodes[key]
+            # Unapplying a migration needs the state from before it
+            if self.backwards:
+                applied.append((migration, state.clone()))
+
+            start = time.perf_counter()
+            with self.profiler.phase(f"{migration.app_label}.{migration.name}"):
+                result = self._check_migration(migration, state)
+            result.duration = time.perf_counter() - start
+            yield result
+
+            if self.backwards == "each":
+                migration, before = applied.pop()
+                yield self._check_backwards(migration, before)
+                # Apply it again, as later migrations may depend on it
+                if not any(get_irreversible_operations(migration.operations)):
+                    with self.profiler.phase("reapply"):
+                        self._apply_migration(migration, before)
+
+        if self.backwards == "plan":
+            for migration, before in reversed(applied):
+                yield self._check_backwards(migration, before)
+                # Earlier migrations can't be unapplied past this one
+                if any(get_irreversible_operations(migration.operations)):
+                    break
+
+    def _check_backwards(
+        self, migration: Migration, state: ProjectState
+    ) -> MigrationResult:
+        """
+        Unapply a migration and check what it did. The state is the one from
+        before the migration was applied.
+        """
+
+        start = time.perf_counter()
+        warnings = get_backwards_warnings(migration=migration, state=state)
+        queries: list[str] = []
+        timings: list[QueryTiming] = []
+        batches: list[BatchTiming] = []
+        locks = None
+        locks_predicted = False
+
+        if not any(get_irreversible_operations(migration.operations)):
+            with self.profiler.phase(
+                f"{migration.app_label}.{migration.name} backwards"
+            ):
+                query_logger, locks = self._apply_migration(
+                    migration, state, backwards=True
                 )
+            queries, timings = query_logger.queries, query_logger.timings
+            batches = query_logger.batches
+            if locks is None:
+                locks, locks_predicted = predict_locks(queries), True
+
+        warnings.extend(get_lock_order_warnings(queries, get_lock_order_config()))
+
+        # Locks on dropped tables are gone from the database by the time locks
+        # are checked, so the locks predicted from the queries are used too.
+        if any(
+            lock_type in ("AccessExclusiveLock", "ExclusiveLock")
+            for _, lock_type in [*(locks or ()), *predict_locks(queries)]
+        ):
+            warnings.append(BACKWARDS_EXCLUSIVE_LOCK)
+
+        return MigrationResult(
+            app_label=migration.app_label,
+            name=migration.name,
+            queries=queries,
+            locks=locks,
+            warnings=warnings,
+            duration=time.perf_counter() - start,
+            timings=timings,
+            locks_predicted=locks_predicted,
+            backwards=True,
+            batches=batches,
+        )
+
+    def _check_migration(
+        self, migration: Migration, state: ProjectState
+    ) -> MigrationResult:
+        # Run checkers on the migration
+        with self.profiler.phase("checks"):
+            warnings = get_registry().run(migration, state, profiler=self.profiler)
+
+        wal_bytes = None
+        bloat = None
+        locks_predicted = False
+        if self.apply_migrations:
+            wal_position = self.get_wal_position()
+            if self.max_bloat is not None:
+                with self.profiler.phase("bloat"):
+                    table_stats = take_snapshot(self.connection)
+            with self.profiler.phase("apply"):
+                query_logger, locks = self._apply_migration(migration, state)
+            if wal_position is not None:
+                wal_bytes = self.get_wal_bytes(since=wal_position)
+            queries, timings = query_logger.queries, query_logger.timings
+            batches = query_logger.batches
+
+            if self.max_bloat is not None:
+                with self.profiler.phase("bloat"):
+                    bloat = get_table_bloat(table_stats, take_snapshot(self.connection))
+                warnings.extend(get_bloat_warnings(bloat, max_bloat=self.max_bloat))
+
+            if self.replayer:
+                with self.profiler.phase("replay"):
+                    warnings.extend(self.replayer.check())
+
+            # Locks can't be checked for migrations applied outside of a
+            # transaction, so predict them from the queries instead.
+            if locks is None:
+                locks, locks_predicted = predict_locks(queries), True
+        else:
+            with self.profiler.phase("collect sql"):
+                collected_sql = self._collect_sql(migration, state)
+            timings, batches = [], []
+            if collected_sql is None:
+                queries, locks = [], None
+            else:
+                queries = collected_sql
+                locks, locks_predicted = predict_locks(queries), True
 
-        for output in self.outputs:
-            output.done()
+        warnings.extend(get_lock_order_warnings(queries, get_lock_order_config()))
+
+        num_exclusive_locks = sum(
+            1
+            for _, lock_type in locks or ()
+            if lock_type in ("AccessExclusiveLock", "ExclusiveLock")
+        )
+        if num_exclusive_locks > 1:
+            warnings.append(MULTIPLE_EXCLUSIVE_LOCKS)
+
+        return MigrationResult(
+            app_label=migration.app_label,
+            name=migration.name,
+            queries=queries,
+            locks=locks,
+            warnings=warnings,
+            wal_bytes=wal_bytes,
+            timings=timings,
+            locks_predicted=locks_predicted,
+            batches=batches,
+            bloat=bloat,
+        )
+
+    def _check_parts_in_parallel(
+        self, migrations: list[Migration], parts: list[list[Migration]]
+    ) -> Iterator[MigrationResult]:
+        """
+        Apply independent parts of the plan in separate processes, each
+        against its own clone of the database. Results are returned in the
+        order of the original plan.
+        """
+
+        creation = self.connection.creation
+        suffixes = [f"migration_checker_{index}" for index in range(len(parts))]
+        clone_names = [
+            creation.get_test_db_clone_settings(suffix)["NAME"] for suffix in suffixes
+        ]
+
+        # Cloning closes the connection, as Postgres requires that nobody
+        # else is connected to the template database.
+        for suffix in suffixes:
+            creation._clone_test_db(  # type: ignore[attr-defined]
+                suffix, verbosity=0, keepdb=False
+            )
+
+        try:
+            with ProcessPoolExecutor(
+                max_workers=len(parts),
+                mp_context=multiprocessing.get_context("spawn"),
+            ) as pool:
+                futures = [
+                    pool.submit(
+                        check_in_clone,
+                        database=self.database,
+                        database_name=clone_name,
+                        keys=[
+                            (migration.app_label, migration.name) for migration in part
+                        ],
+                        lock_timeline=self.lock_timeline,
+                        max_bloat=self.max_bloat,
+                    )
+                    for part, clone_name in zip(parts, clone_names)
+                ]
+
+                results: dict[tuple[str, str], MigrationResult] = {}
+                pending = iter(futures)
+                for migration in migrations:
+                    key = (migration.app_label, migration.name)
+                    while key not in results:
+                        for result in next(pending).result():
+                            results[result.key] = result
+                    yield results.pop(key)
+        finally:
+            for clone_name in clone_names:
+                creation._destroy_test_db(  # type: ignore[attr-defined]
+                    clone_name, verbosity=0
+                )
 
     def _apply_migration(
-        self, migration: Migration, state: ProjectState
-    ) -> tuple[list[str], list[tuple[str, str]] | None]:
+        self, migration: Migration, state: ProjectState, *, backwards: bool = False
+    ) -> tuple[QueryLogger, list[tuple[str, str]] | None]:
         """
-        Apply a single migration, while recording queries and checking locks
-        held in the database afterwards.
+        Apply, or unapply, a single migration, while recording queries and
+        checking locks held in the database afterwards.
         """
 
         # Some operations, like AddIndexConcurrently, cannot be run in a
         # transaction, so for those special cases we skip recording locks
         # because we ahave no way of doing that.
         if self._must_be_non_atomic(migration.operations):
-            return self._apply_non_atomic_migration(migration, state), None
+            return (
+                self._apply_non_atomic_migration(migration, state, backwards=backwards),
+                None,
+            )
 
         # Apply the migration in the database and record queries and locks
-        query_logger = QueryLogger()
+        query_logger = QueryLogger(self.get_locks if self.lock_timeline else None)
         with transaction.atomic(using=self.database):
             with self.connection.execute_wrapper(query_logger):
                 with self.connection.schema_editor(atomic=False) as schema_editor:
-                    migration.apply(state, schema_editor)
+                    self._run_migration(migration, state, schema_editor, backwards)
 
             locks = self.get_locks()
-            self.recorder.record_applied(migration.app_label, migration.name)
+            self._record_migration(migration, backwards)
 
-        return query_logger.queries, locks
+        return query_logger, locks
 
-    def _must_be_non_atomic_query(self, query: str) -> bool:
+    def _collect_sql(
+        self, migration: Migration, state: ProjectState
+    ) -> list[str] | None:
         """
-        Try to detect if a raw query must be non-atomic.
+        Get the SQL for a migration without running it, like sqlmigrate, and
+        move the state forward as applying would have. Returns None if the
+        SQL can't be generated, e.g. when the schema editor has to introspect
+        tables created by earlier migrations that haven't been applied, or
+        for operations that don't reduce to SQL, like RunPython.
         """
 
-        patterns = [
-            [
-                (sqlparse.tokens.DDL, "CREATE"),
-                (sqlparse.tokens.Keyword, "INDEX"),
-                (sqlparse.tokens.Keyword, "CONCURRENTLY"),
-            ],
-            [
-                (sqlparse.tokens.DDL, "DROP"),
-                (sqlparse.tokens.Keyword, "INDEX"),
-                (sqlparse.tokens.Keyword, "CONCURRENTLY"),
-            ],
+        complete = True
+        # Nothing is executed, so there is no transaction to wrap it in
+        with self.connection.schema_editor(
+            collect_sql=True, atomic=False
+        ) as schema_editor:
+            for operation in migration.operations:
+                old_state = state.clone()
+                operation.state_forwards(migration.app_label, state)
+                # The locks taken by e.g. RunPython can't be predicted
+                if not operation.reduces_to_sql:
+                    complete = False
+                    continue
+                try:
+                    operation.database_forwards(
+                        migration.app_label, schema_editor, old_state, state
+                    )
+                except (DatabaseError, ValueError):
+                    complete = False
+
+        if not complete:
+            return None
+        return [
+            statement.rstrip(";")
+            for statement in schema_editor.collected_sql
+            if not statement.startswith("--")
         ]
 
-        for statement in sqlparse.parse(query):
-            for pattern in patterns:
-                if all(
-                    any(token.match(ttype, value) for token in statement.tokens)
-                    for ttype, value in pattern
-                ):
-                    return True
-        return False
+    def _must_be_non_atomic_query(self, query: str) -> bool:
+        """
+        Try to detect if a raw query must be non-atomic.
+        """
+
+        return must_be_non_atomic(query)
 
     def _must_be_non_atomic(self, operations: Sequence[Operation]) -> bool:
         """
@@ -193,23 +551,43 @@ class Executor:
         return False
 
     def _apply_non_atomic_migration(
-        self, migration: Migration, state: ProjectState
-    ) -> list[str]:
+        self, migration: Migration, state: ProjectState, *, backwards: bool = False
+    ) -> QueryLogger:
         """
         Apply a migration outside of a migration. This is needed for some
         operations that cannot be executed inside a transaction, like
         AddIndexConcurrently.
         """
 
-        # Apply the migration in the database and record queries and locks
-        query_logger = QueryLogger()
+        # Apply the migration in the database and record queries, and the
+        # locks held by each batch of RunPythonInBatches operations
+        query_logger = QueryLogger(get_batch_locks=self.get_locks)
         with self.connection.execute_wrapper(query_logger):
-            with self.connection.schema_editor(atomic=False) as schema_editor:
-                migration.apply(state, schema_editor)
+            with observe_batches(query_logger.batch):
+                with self.connection.schema_editor(atomic=False) as schema_editor:
+                    self._run_migration(migration, state, schema_editor, backwards)
 
-            self.recorder.record_applied(migration.app_label, migration.name)
+        self._record_migration(migration, backwards)
 
-        return query_logger.queries
+        return query_logger
+
+    def _run_migration(
+        self,
+        migration: Migration,
+        state: ProjectState,
+        schema_editor: BaseDatabaseSchemaEditor,
+        backwards: bool,
+    ) -> None:
+        if backwards:
+            migration.unapply(state, schema_editor)
+        else:
+            migration.apply(state, schema_editor)
+
+    def _record_migration(self, migration: Migration, backwards: bool) -> None:
+        if backwards:
+            self.recorder.record_unapplied(migration.app_label, migration.name)
+        else:
+            self.recorder.record_applied(migration.app_label, migration.name)
 
     def get_locks(self) -> list[tuple[str, str]]:
         """
@@ -235,3 +613,30 @@ class Executor:
                 """
             )
             return cast(list[tuple[str, str]], cursor.fetchall())
+
+    def get_wal_position(self) -> str | None:
+        """
+        Get the current write-ahead log position, or None if it is not
+        available, e.g. on a standby.
+        """
+
+        try:
+            with self.connection.cursor() as cursor:
+                cursor.execute("SELECT pg_current_wal_insert_lsn()::text")
+                return cast(str, cursor.fetchone()[0])
+        except DatabaseError:
+            return None
+
+    def get_wal_bytes(self, *, since: str) -> int:
+        """
+        Get the number of bytes written to the write-ahead log since the given
+        position. This includes writes by other connections, which is fine for
+        databases only used for checking migrations.
+        """
+
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT pg_wal_lsn_diff(pg_current_wal_insert_lsn(), %s)::bigint",
+                [since],
+            )
+            return cast(int, cursor.fetchone()[0])
@@ -0,0 +1,295 @@
+"""
+Rewrite a migration into a sequence of migrations that hold locks for as
+short as possible:
+
+- Indexes are added concurrently, in a separate non-atomic migration
+- Check constraints are added as NOT VALID, and validated in a separate
+  migration
+- Data migrations are separated from schema changes
+
+The last migration keeps the name of the original, so migrations depending on
+it don't have to change. Only migrations that haven't been applied anywhere
+yet should be rewritten.
+"""
+
+import os
+from dataclasses import dataclass, field
+
+from django.db.migrations import (
+    AddConstraint,
+    AddIndex,
+    AlterField,
+    CreateModel,
+    DeleteModel,
+    Migration,
+    RemoveConstraint,
+    RemoveField,
+    RemoveIndex,
+    RenameField,
+    RenameIndex,
+    RenameModel,
+    RunPython,
+    RunSQL,
+)
+from django.db.migrations.operations.base import Operation
+from django.db.migrations.writer import MigrationWriter
+from django.db.models import CheckConstraint
+
+# Operations that an index or a validation can't be moved past
+REMOVING_OPERATIONS = (
+    AlterField,
+    DeleteModel,
+    RemoveConstraint,
+    RemoveField,
+    RemoveIndex,
+    RenameField,
+    RenameIndex,
+    RenameModel,
+)
+
+
+@dataclass
+class Part:
+    operations: list[Operation] = field(default_factory=list)
+    atomic: bool = True
+
+
+def get_kind(operation: Operation) -> str:
+    return "data" if isinstance(operation, (RunPython, RunSQL)) else "schema"
+
+
+def split_operations(migration: Migration) -> list[Part]:
+    """
+    Split the operations of a migration into parts that are applied in order.
+    """
+
+    from django.contrib.postgres.operations import (
+        AddConstraintNotValid,
+        AddIndexConcurrently,
+        ValidateConstraint,
+    )
+
+    from .operations import RunPythonInBatches
+
+    parts: list[Part] = []
+    indexes: list[Operation] = []
+    validations: list[Operation] = []
+    created_models: set[str] = set()
+
+    for operation in migration.operations:
+        if isinstance(operation, CreateModel):
+            created_models.add(operation.name_lower)
+
+        if isinstance(operation, AddIndexConcurrently):
+            indexes.append(operation)
+            continue
+        # Indexes on new tables are built before there are any rows to lock
+        if (
+            isinstance(operation, AddIndex)
+            and operation.model_name_lower not in created_models
+        ):
+            indexes.append(
+                AddIndexConcurrently(
+                    model_name=operation.model_name, index=operation.index
+                )
+            )
+            continue
+
+        if isinstance(operation, ValidateConstraint):
+            validations.append(operation)
+            continue
+        if (
+            isinstance(operation, AddConstraint)
+            and not isinstance(operation, AddConstraintNotValid)
+            and isinstance(operation.constraint, CheckConstraint)
+            and operation.model_name_lower not in created_models
+        ):
+            operation = AddConstraintNotValid(
+                model_name=operation.model_name, constraint=operation.constraint
+            )
+            validations.append(
+                ValidateConstraint(
+                    model_name=operation.model_name, name=operation.constraint.name
+                )
+            )
+
+        # Batches commit on their own, so they can't run in a transaction
+        if isinstance(operation, RunPythonInBatches):
+            parts.append(Part(operations=[operation], atomic=False))
+            continue
+
+        if (
+            not parts
+            or not parts[-1].atomic
+            or get_kind(parts[-1].operations[-1]) != get_kind(operation)
+        ):
+            parts.append(Part())
+        parts[-1].operations.append(operation)
+
+    if indexes:
+        parts.append(Part(operations=indexes, atomic=False))
+    if validations:
+        parts.append(Part(operations=validations))
+    return parts
+
+
+def get_unsplittable_reason(migration: Migration) -> str | None:
+    """
+    Get why a migration can't be split safely, or None if it can.
+    """
+
+    from django.contrib.postgres.operations import (
+        AddConstraintNotValid,
+        AddIndexConcurrently,
+        ValidateConstraint,
+    )
+
+    # MigrationWriter can't write functions defined in the migration module,
+    # and the last part would overwrite the module
+    module = type(migration).__module__
+    for operation in migration.operations:
+        if isinstance(operation, RunPython) and any(
+            getattr(code, "__module__", None) == module
+            for code in (operation.code, operation.reverse_code)
+        ):
+            return "RunPython code is defined in the migration module"
+
+    created_models: set[str] = set()
+    moved: list[str] = []
+    for operation in migration.operations:
+        if isinstance(operation, CreateModel):
+            created_models.add(operation.name_lower)
+
+        for model_name in moved:
+            if isinstance(operation, REMOVING_OPERATIONS) and (
+                operation.references_model(model_name, migration.app_label)
+            ):
+                return (
+                    f"{operation.describe()} would run before an index or a "
+                    f"validation on {model_name} moved to the end"
+                )
+
+        if isinstance(operation, (AddIndexConcurrently, ValidateConstraint)) or (
+            isinstance(operation, AddIndex)
+            and operation.model_name_lower not in created_models
+        ):
+            moved.append(operation.model_name.lower())
+        elif (
+            isinstance(operation, AddConstraint)
+            and not isinstance(operation, AddConstraintNotValid)
+            and isinstance(operation.constraint, CheckConstraint)
+            and operation.model_name_lower not in created_models
+        ):
+            moved.append(operation.model_name_lower)
+
+    return None
+
+
+def split_migration(migration: Migration) -> list[Migration]:
+    """
+    Get the migrations to replace a migration with. The last one keeps the
+    name of the original, and each depends on the one before it.
+    """
+
+    if get_unsplittable_reason(migration):
+        return [migration]
+
+    parts = split_operations(migration)
+    if len(parts) <= 1 and all(
+        part.operations == migration.operations
+        and (part.atomic or not migration.atomic)
+        for part in parts
+    ):
+        return [migration]
+
+    migrations = []
+    dependencies = list(migration.dependencies)
+    for index, part in enumerate(parts, start=1):
+        name = migration.name if index == len(parts) else f"{migration.name}_{index}"
+        attributes = {
+            "dependencies": dependencies,
+            "operations": part.operations,
+            "atomic": part.atomic and migration.atomic,
+        }
+        if index == 1:
+            attributes["initial"] = migration.initial
+        if index == len(parts):
+            attributes["run_before"] = list(migration.run_before)
+
+        split = type("Migration", (Migration,), attributes)(name, migration.app_label)
+        migrations.append(split)
+        dependencies = [(migration.app_label, name)]
+
+    return migrations
+
+
+def write_migrations(migrations: list[Migration]) -> list[str]:
+    """
+    Write migrations to files in their app's migrations module, and return
+    the paths written.
+    """
+
+    paths = []
+    for migration in migrations:
+        writer = MigrationWriter(migration)
+        with open(writer.path, "w") as f:
+            f.write(get_source(migration, writer))
+        paths.append(os.path.relpath(writer.path))
+    return paths
+
+
+def get_source(migration: Migration, writer: MigrationWriter) -> str:
+    """
+    Get the source of a migration file, including the attributes that
+    MigrationWriter leaves out.
+    """
+
+    attributes = ""
+    if not migration.atomic:
+        attributes += "    atomic = False\n"
+    if migration.run_before:
+        attributes += f"    run_before = {list(migration.run_before)!r}\n"
+
+    source = writer.as_string()
+    if attributes:
+        header = "class Migration(migrations.Migration):\n"
+        source = source.replace(header, f"{header}{attributes}", 1)
+    return source
+
+
+def fix_migration(*, app_label: str, name: str, dry_run: bool = False) -> bool:
+    """
+    Split a migration and write the new migration files. Returns whether the
+    migration had to be split.
+    """
+
+    import django
+    from django.db.migrations.loader import MigrationLoader
+
+    django.setup()
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    migration = loader.get_migration_by_prefix(app_label, name)
+
+    if reason := get_unsplittable_reason(migration):
+        print(f"{app_label}.{migration.name} can't be split: {reason}")
+        return False
+
+    migrations = split_migration(migration)
+    # Migrations compare equal by name, so check for the same instance
+    if migrations[0] is migration:
+        print(f"{app_label}.{migration.name} doesn't need to be split")
+        return False
+
+    for split in migrations:
+        print(f"{app_label}.{split.name}:")
+        for operation in split.operations:
+            print(f"    {operation.describe()}")
+
+    if dry_run:
+        for split in migrations:
+            source = get_source(split, MigrationWriter(split))
+            print(f"\n# {app_label}.{split.name}\n{source}")
+    else:
+        for path in write_migrations(migrations):
+            print(f"✍️  Wrote {path}")
+    return True
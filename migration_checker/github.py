@@ -1,12 +1,26 @@
 """
 A super simple API client for the Github API.
 """
+import http.client
 import json
+import re
+import time
 from dataclasses import dataclass
-from http.client import HTTPResponse
-from typing import Any
-from urllib.parse import urljoin
-from urllib.request import Request, urlopen
+from typing import Any, Callable, Iterator
+from urllib.parse import urlencode, urljoin, urlsplit
+
+# Status codes Github uses when hitting secondary rate limits
+RATE_LIMIT_STATUSES = (403, 429)
+MAX_RETRY_DELAY = 60
+# Requests that can be sent again when the connection drops, without risking
+# doing the same thing twice, like posting duplicate comments
+IDEMPOTENT_METHODS = ("GET", "PATCH", "DELETE")
+
+
+class GithubError(Exception):
+    def __init__(self, status: int, body: bytes) -> None:
+        super().__init__(f"Github API returned {status}: {body[:200]!r}")
+        self.status = status
 
 
 @dataclass
@@ -16,24 +30,68 @@ class Comment:
     body: str
 
 
+@dataclass
+class Response:
+    status: int
+    headers: http.client.HTTPMessage
+    data: Any
+
+
 class GithubClient:
-    def __init__(self, *, token: str, repo: str, pull_request: int) -> None:
+    def __init__(
+        self,
+        *,
+        token: str,
+        repo: str,
+        pull_request: int,
+        base_url: str = "https://api.github.com",
+        max_retries: int = 5,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
         self.token = token
         self.repo = repo
         self.pull_request = pull_request
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.sleep = sleep
+        self.connection: http.client.HTTPConnection | None = None
+        # Responses by URL, so unchanged pages can be revalidated using
+        # If-None-Match. Those requests don't count against the rate limit.
+        self.cache: dict[str, tuple[str, Any]] = {}
+
+    def iter_comments(self) -> Iterator[Comment]:
+        """
+        Iterate over comments on the pull request, fetching one page at a time.
+        """
+
+        url: str | None = (
+            f"/repos/{self.repo}/issues/{self.pull_request}/comments?"
+            + urlencode({"per_page": 100})
+        )
+        while url:
+            response = self.get(url)
+            assert isinstance(response.data, list)
+            for comment in response.data:
+                yield Comment(
+                    id=comment["id"],
+                    author=comment["user"]["login"],
+                    body=comment["body"],
+                )
+            url = get_next_url(response.headers.get("link", ""))
 
     def get_comments(self) -> list[Comment]:
-        comments = self.request(
-            "GET",
-            f"/repos/{self.repo}/issues/{self.pull_request}/comments",
+        return list(self.iter_comments())
+
+    def find_comment(self, *, marker: str) -> Comment | None:
+        """
+        Find the first comment containing the marker, without fetching more
+        pages than needed.
+        """
+
+        return next(
+            (comment for comment in self.iter_comments() if marker in comment.body),
+            None,
         )
-        assert isinstance(comments, list)
-        return [
-            Comment(
-                id=comment["id"], author=comment["user"]["login"], body=comment["body"]
-            )
-            for comment in comments
-        ]
 
     def create_comment(self, *, body: str) -> None:
         self.request(
@@ -49,22 +107,138 @@ class GithubClient:
             data={"body": body},
         )
 
+    def delete_comment(self, *, comment_id: int) -> None:
+        self.request("DELETE", f"/repos/{self.repo}/issues/comments/{comment_id}")
+
+    def get(self, path: str) -> Response:
+        """
+        Make a GET request, using the cached response if it has not changed.
+        """
+
+        cached = self.cache.get(path)
+        headers = {"If-None-Match": cached[0]} if cached else {}
+        response = self._request("GET", path, headers=headers)
+
+        if response.status == 304 and cached:
+            response.data = cached[1]
+        elif etag := response.headers.get("etag"):
+            self.cache[path] = (etag, response.data)
+
+        return response
+
     def request(self, method: str, path: str, data: Any = None) -> Any:
-        url = urljoin("https://api.github.com", path)
+        return self._request(method, path, data=data).data
+
+    def _request(
+        self,
+        method: str,
+        path: str,
+        data: Any = None,
+        headers: dict[str, str] | None = None,
+    ) -> Response:
+        url = urlsplit(urljoin(self.base_url, path))
+        target = f"{url.path}?{url.query}" if url.query else url.path
         headers = {
             "Accept": "application/vnd.github.v3+json",
             "User-agent": "https://github.com/kolonialno/django-migrations-checker",
             "Authorization": f"Bearer {self.token}",
             "Content-type": "application/json; charset=UTF-8",
+            **(headers or {}),
         }
-        req = Request(
-            url,
-            method=method,
-            headers=headers,
-            data=json.dumps(data).encode("utf-8") if data else None,
-        )
+        body = json.dumps(data).encode("utf-8") if data else None
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                status, response_headers, response_body = self._send(
+                    method, target, body=body, headers=headers
+                )
+            except (http.client.HTTPException, ConnectionError):
+                # The server may have closed the kept-alive connection
+                self.close()
+                if attempt == self.max_retries or method not in IDEMPOTENT_METHODS:
+                    raise
+                continue
+
+            if status in RATE_LIMIT_STATUSES and attempt < self.max_retries:
+                delay = get_retry_delay(
+                    status, response_headers, response_body, attempt=attempt
+                )
+                if delay is not None:
+                    self.sleep(delay)
+                    continue
+
+            if status >= 400:
+                raise GithubError(status, response_body)
+
+            content_type = response_headers.get("content-type", "")
+            return Response(
+                status=status,
+                headers=response_headers,
+                data=(
+                    json.loads(response_body)
+                    if response_body and "json" in content_type
+                    else None
+                ),
+            )
+
+        raise AssertionError("unreachable")
+
+    def _send(
+        self, method: str, target: str, *, body: bytes | None, headers: dict[str, str]
+    ) -> tuple[int, http.client.HTTPMessage, bytes]:
+        if self.connection is None:
+            url = urlsplit(self.base_url)
+            connection_class = (
+                http.client.HTTPSConnection
+                if url.scheme == "https"
+                else http.client.HTTPConnection
+            )
+            assert url.hostname
+            self.connection = connection_class(url.hostname, url.port, timeout=30)
+
+        self.connection.request(method, target, body=body, headers=headers)
+        response = self.connection.getresponse()
+        # The body must be read before the connection can be reused
+        response_body = response.read()
+        if response.will_close:
+            self.close()
+        return response.status, response.headers, response_body
+
+    def close(self) -> None:
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+
+def get_next_url(link_header: str) -> str | None:
+    """
+    Get the URL of the next page from a Link header
+    """
+
+    for match in re.finditer(r'<([^>]+)>;\s*rel="([^"]+)"', link_header):
+        if "next" in match.group(2).split():
+            return match.group(1)
+    return None
+
+
+def get_retry_delay(
+    status: int, headers: http.client.HTTPMessage, body: bytes, *, attempt: int
+) -> float | None:
+    """
+    Get how long to wait before retrying a rate limited request, or None if
+    the response is not caused by rate limiting.
+    """
+
+    if retry_after := headers.get("retry-after"):
+        return min(float(retry_after), MAX_RETRY_DELAY)
+
+    if headers.get("x-ratelimit-remaining") == "0":
+        reset = float(headers.get("x-ratelimit-reset", 0))
+        return min(max(reset - time.time(), 1), MAX_RETRY_DELAY)
+
+    # Secondary rate limits don't always include any headers, so back off
+    # exponentially.
+    if status == 429 or b"rate limit" in body.lower():
+        return float(min(2**attempt, MAX_RETRY_DELAY))
 
-        with urlopen(req) as response:
-            assert isinstance(response, HTTPResponse)
-            assert "json" in response.getheader("content-type", "")
-            return json.loads(response.read())
+    return None
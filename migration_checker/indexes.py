@@ -0,0 +1,86 @@
+"""
+Index statistics exported from a production database, used to warn about
+removing indexes that are in use, and adding indexes that overlap existing
+ones. Export a snapshot with:
+
+    psql -XAtc "$(python -c 'from migration_checker.indexes import \
+SNAPSHOT_QUERY; print(SNAPSHOT_QUERY)')" > indexes.json
+
+Scan counts are since statistics were last reset, so take the snapshot from
+a database that has been running for a while.
+"""
+
+import functools
+import json
+import os
+from dataclasses import dataclass
+
+SNAPSHOT_QUERY = """\
+SELECT coalesce(json_agg(json_build_object(
+    'table', s.relname,
+    'name', s.indexrelname,
+    'scans', s.idx_scan,
+    'unique', i.indisunique,
+    'columns', ARRAY(
+        SELECT a.attname
+        FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, position)
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+        ORDER BY k.position
+    )
+)), '[]')
+FROM pg_stat_user_indexes s
+JOIN pg_index i ON i.indexrelid = s.indexrelid
+-- Partial and expression indexes can't be compared by their columns
+WHERE i.indpred IS NULL AND i.indexprs IS NULL
+"""
+
+
+@dataclass(frozen=True)
+class IndexStats:
+    table: str
+    name: str
+    columns: tuple[str, ...]
+    scans: int
+    unique: bool = False
+
+    def __str__(self) -> str:
+        return f"{self.name} on {self.table} ({', '.join(self.columns)})"
+
+
+def load_snapshot(path: str) -> list[IndexStats]:
+    return _load_snapshot(path, os.path.getmtime(path))
+
+
+@functools.lru_cache(maxsize=None)
+def _load_snapshot(path: str, mtime: float) -> list[IndexStats]:
+    with open(path) as f:
+        data = json.load(f)
+    return [
+        IndexStats(
+            table=index["table"],
+            name=index["name"],
+            columns=tuple(index["columns"]),
+            scans=index["scans"],
+            unique=index.get("unique", False),
+        )
+        for index in data
+    ]
+
+
+def get_overlapping_indexes(
+    snapshot: list[IndexStats], *, table: str, columns: tuple[str, ...]
+) -> list[tuple[IndexStats, str]]:
+    """
+    Find existing indexes that make a new index on the columns redundant, or
+    that the new index makes redundant.
+    """
+
+    overlapping = []
+    for index in snapshot:
+        if index.table != table or not index.columns:
+            continue
+        if index.columns[: len(columns)] == columns:
+            overlapping.append((index, "already covers these columns"))
+        elif columns[: len(index.columns)] == index.columns and not index.unique:
+            overlapping.append((index, "is covered by the new index"))
+    return overlapping
@@ -0,0 +1,436 @@
+"""
+Static checks that work on the syntax tree of migration files alone. This
+never imports Django or the project, so it is fast enough for pre-commit
+hooks:
+
+    python -m migration_checker.lint app/migrations/*.py
+
+The checks mirror the ones in migration_checker.checks, as far as that is
+possible without loading the project.
+"""
+
+import argparse
+import ast
+import functools
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator
+
+from .rewrites import Column, ColumnChange, get_column_changes, get_warnings
+from .warnings import (
+    ADD_INDEX_IN_SEPARATE_MIGRATION,
+    ADDING_CONSTRAINT,
+    ADDING_FIELD_WITH_CHECK,
+    ADDING_NON_NULLABLE_FIELD,
+    ALTERING_MULTIPLE_MODELS,
+    ATOMIC_DATA_MIGRATION,
+    REMOVING_FIELD,
+    RENAMING_FIELD,
+    RENAMING_MODEL,
+    SCHEMA_AND_DATA_CHANGES,
+    USE_ADD_INDEX_CONCURRENTLY,
+    VALIDATE_CONSTRAINT_SEPARATELY,
+    Warning,
+)
+
+# Starting a process pool costs more than linting a few files
+MIN_FILES_FOR_POOL = 200
+
+# Positional arguments of the operations we look at
+ARGUMENTS = {
+    "AddField": ["model_name", "name", "field"],
+    "AlterField": ["model_name", "name", "field"],
+    "RemoveField": ["model_name", "name"],
+    "RenameField": ["model_name", "old_name", "new_name"],
+    "CreateModel": ["name", "fields"],
+    "DeleteModel": ["name"],
+    "RenameModel": ["old_name", "new_name"],
+    "AlterModelTable": ["name"],
+    "AlterModelTableComment": ["name"],
+    "AlterUniqueTogether": ["name"],
+    "AlterIndexTogether": ["name"],
+    "AlterOrderWithRespectTo": ["name"],
+    "AlterModelOptions": ["name"],
+    "AlterModelManagers": ["name"],
+}
+
+FIELD_OPERATIONS = {"AddField", "AlterField", "RemoveField", "RenameField"}
+MODEL_OPERATIONS = {
+    "CreateModel",
+    "DeleteModel",
+    "RenameModel",
+    "AlterModelTable",
+    "AlterModelTableComment",
+    "AlterUniqueTogether",
+    "AlterIndexTogether",
+    "AlterOrderWithRespectTo",
+    "AlterModelOptions",
+    "AlterModelManagers",
+}
+DATA_OPERATIONS = {"RunPython", "RunSQL"}
+# Data operations that run in transactions of their own
+BATCHED_OPERATIONS = {"RunPythonInBatches"}
+ADD_CONSTRAINT_OPERATIONS = {"AddConstraint", "AddConstraintNotValid"}
+
+# Column types of Django's fields on Postgres
+FIELD_DB_TYPES = {
+    "AutoField": "integer",
+    "BigAutoField": "bigint",
+    "SmallAutoField": "smallint",
+    "IntegerField": "integer",
+    "BigIntegerField": "bigint",
+    "SmallIntegerField": "smallint",
+    "PositiveIntegerField": "integer",
+    "PositiveBigIntegerField": "bigint",
+    "PositiveSmallIntegerField": "smallint",
+    "BooleanField": "boolean",
+    "NullBooleanField": "boolean",
+    "CharField": "varchar(%(max_length)s)",
+    "SlugField": "varchar(%(max_length)s)",
+    "EmailField": "varchar(%(max_length)s)",
+    "URLField": "varchar(%(max_length)s)",
+    "FileField": "varchar(%(max_length)s)",
+    "ImageField": "varchar(%(max_length)s)",
+    "FilePathField": "varchar(%(max_length)s)",
+    "TextField": "text",
+    "DecimalField": "numeric(%(max_digits)s, %(decimal_places)s)",
+    "FloatField": "double precision",
+    "DateField": "date",
+    "DateTimeField": "timestamp with time zone",
+    "TimeField": "time",
+    "DurationField": "interval",
+    "UUIDField": "uuid",
+    "JSONField": "jsonb",
+    "BinaryField": "bytea",
+    "GenericIPAddressField": "inet",
+}
+FIELD_DEFAULTS: dict[str, dict[str, object]] = {
+    "SlugField": {"max_length": 50},
+    "EmailField": {"max_length": 254},
+    "URLField": {"max_length": 200},
+    "FileField": {"max_length": 100},
+    "ImageField": {"max_length": 100},
+    "FilePathField": {"max_length": 100},
+}
+FOREIGN_KEY_FIELDS = {"ForeignKey", "OneToOneField"}
+
+# Fields that Postgres adds check constraints for
+FIELDS_WITH_CHECK = {
+    "PositiveBigIntegerField",
+    "PositiveIntegerField",
+    "PositiveSmallIntegerField",
+}
+
+
+@dataclass
+class Operation:
+    name: str
+    call: ast.Call
+
+    def argument(self, name: str) -> ast.expr | None:
+        for keyword in self.call.keywords:
+            if keyword.arg == name:
+                return keyword.value
+        positions = ARGUMENTS.get(self.name, [])
+        if name in positions and positions.index(name) < len(self.call.args):
+            return self.call.args[positions.index(name)]
+        return None
+
+    def constant(self, name: str) -> object:
+        value = self.argument(name)
+        return value.value if isinstance(value, ast.Constant) else None
+
+
+@dataclass
+class MigrationFile:
+    path: str
+    line: int
+    atomic: bool = True
+    initial: bool = False
+    operations: list[Operation] = field(default_factory=list)
+
+
+@dataclass
+class LintResult:
+    path: str
+    line: int = 1
+    warnings: list[Warning] = field(default_factory=list)
+    error: str | None = None
+
+
+def get_name(node: ast.expr) -> str | None:
+    """
+    Get the name of a class or function, e.g. AddField for migrations.AddField
+    """
+
+    if isinstance(node, ast.Attribute):
+        return node.attr
+    if isinstance(node, ast.Name):
+        return node.id
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def parse_migration(path: str) -> MigrationFile | None:
+    with open(path, "rb") as f:
+        tree = ast.parse(f.read(), filename=path)
+
+    migration_class = next(
+        (
+            node
+            for node in tree.body
+            if isinstance(node, ast.ClassDef) and node.name == "Migration"
+        ),
+        None,
+    )
+    if migration_class is None:
+        return None
+
+    migration = MigrationFile(path=path, line=migration_class.lineno)
+    for statement in migration_class.body:
+        if not isinstance(statement, ast.Assign) or len(statement.targets) != 1:
+            continue
+        target = get_name(statement.targets[0])
+        value = statement.value
+        if target in ("atomic", "initial") and isinstance(value, ast.Constant):
+            setattr(migration, target, bool(value.value))
+        elif target == "operations" and isinstance(value, (ast.List, ast.Tuple)):
+            migration.operations = [
+                Operation(name=name, call=element)
+                for element in value.elts
+                if isinstance(element, ast.Call)
+                and (name := get_name(element.func)) is not None
+            ]
+    return migration
+
+
+def get_field_type(value: ast.expr | None) -> str | None:
+    if isinstance(value, ast.Call):
+        return get_name(value.func)
+    return None
+
+
+def get_previous_field(
+    migration: MigrationFile, model_name: str, field_name: str
+) -> ast.expr | None:
+    """
+    Find the definition of a field before the given migration, by looking at
+    the migrations before it in the same app. Migrations are assumed to be
+    applied in the order of their names, which holds for generated migrations.
+    """
+
+    directory, filename = os.path.split(migration.path)
+    previous = sorted(
+        name
+        for name in os.listdir(directory)
+        if name.endswith(".py") and name[0] not in "_~" and name < filename
+    )
+
+    field = None
+    for name in previous:
+        try:
+            previous_migration = parse_migration(os.path.join(directory, name))
+        except SyntaxError:
+            continue
+        for operation in previous_migration.operations if previous_migration else ():
+            if operation.name in ("AddField", "AlterField"):
+                if (
+                    str(operation.constant("model_name")).lower() == model_name
+                    and operation.constant("name") == field_name
+                ):
+                    field = operation.argument("field")
+            elif operation.name == "CreateModel":
+                fields = operation.argument("fields")
+                if str(operation.constant("name")).lower() != model_name or not (
+                    isinstance(fields, (ast.List, ast.Tuple))
+                ):
+                    continue
+                for element in fields.elts:
+                    if (
+                        isinstance(element, ast.Tuple)
+                        and len(element.elts) == 2
+                        and isinstance(element.elts[0], ast.Constant)
+                        and element.elts[0].value == field_name
+                    ):
+                        field = element.elts[1]
+    return field
+
+
+def get_column(value: ast.expr | None) -> Column | None:
+    """
+    Get the column for a field definition, like Django would for Postgres.
+    """
+
+    name = get_field_type(value)
+    if name is None:
+        return None
+    assert isinstance(value, ast.Call)
+
+    kwargs = {
+        keyword.arg: keyword.value.value
+        for keyword in value.keywords
+        if keyword.arg and isinstance(keyword.value, ast.Constant)
+    }
+    try:
+        db_type = FIELD_DB_TYPES[name] % {**FIELD_DEFAULTS.get(name, {}), **kwargs}
+    except KeyError:
+        # The type depends on other models or on values we can't evaluate
+        db_type = f"<{name}>"
+
+    foreign_key = name in FOREIGN_KEY_FIELDS
+    return Column(
+        db_type=db_type,
+        null=kwargs.get("null") is True,
+        unique=bool(
+            kwargs.get("unique") or kwargs.get("primary_key") or name == "OneToOneField"
+        ),
+        indexed=bool(kwargs.get("db_index", foreign_key)),
+        check=name in FIELDS_WITH_CHECK,
+        foreign_key=foreign_key and kwargs.get("db_constraint", True) is not False,
+        collation=(str(kwargs["db_collation"]) if kwargs.get("db_collation") else None),
+    )
+
+
+def is_nullable(value: ast.expr | None) -> bool:
+    return isinstance(value, ast.Call) and any(
+        keyword.arg == "null"
+        and isinstance(keyword.value, ast.Constant)
+        and keyword.value.value is True
+        for keyword in value.keywords
+    )
+
+
+def check_migration(migration: MigrationFile) -> Iterator[Warning]:
+    operations = migration.operations
+    names = [operation.name for operation in operations]
+
+    if "AddIndex" in names:
+        yield USE_ADD_INDEX_CONCURRENTLY
+        if not migration.initial and len(operations) > 1:
+            yield ADD_INDEX_IN_SEPARATE_MIGRATION
+
+    if any(
+        operation.name == "AddField" and not is_nullable(operation.argument("field"))
+        for operation in operations
+    ):
+        yield ADDING_NON_NULLABLE_FIELD
+
+    altered_models = set()
+    if migration.atomic and not migration.initial:
+        for operation in operations:
+            if operation.name in FIELD_OPERATIONS:
+                altered_models.add(operation.constant("model_name"))
+            elif operation.name == "RenameModel":
+                altered_models.add(operation.constant("old_name"))
+            elif operation.name in MODEL_OPERATIONS:
+                altered_models.add(operation.constant("name"))
+    if len(altered_models) > 1:
+        yield ALTERING_MULTIPLE_MODELS
+
+    # Like in checks, RunSQL isn't counted, and batches can't run in a
+    # transaction at all
+    if migration.atomic and any(
+        name in {"RunPython"} | BATCHED_OPERATIONS for name in names
+    ):
+        yield ATOMIC_DATA_MIGRATION
+
+    data_migration = any(name in DATA_OPERATIONS for name in names)
+    schema_migration = any(
+        name not in DATA_OPERATIONS | BATCHED_OPERATIONS for name in names
+    )
+    if data_migration and schema_migration:
+        yield SCHEMA_AND_DATA_CHANGES
+
+    if "RemoveField" in names:
+        yield REMOVING_FIELD
+    if "RenameField" in names:
+        yield RENAMING_FIELD
+    if "RenameModel" in names:
+        yield RENAMING_MODEL
+
+    if any(
+        operation.name == "AddField"
+        and get_field_type(operation.argument("field")) in FIELDS_WITH_CHECK
+        for operation in operations
+    ):
+        yield ADDING_FIELD_WITH_CHECK
+
+    if any(name in ADD_CONSTRAINT_OPERATIONS for name in names):
+        yield ADDING_CONSTRAINT
+
+    if "ValidateConstraint" in names and any(
+        name != "ValidateConstraint" for name in names
+    ):
+        yield VALIDATE_CONSTRAINT_SEPARATELY
+
+    changes: list[ColumnChange] = []
+    for operation in operations:
+        if operation.name != "AlterField":
+            continue
+        old_column = get_column(
+            get_previous_field(
+                migration,
+                str(operation.constant("model_name")).lower(),
+                str(operation.constant("name")),
+            )
+        )
+        new_column = get_column(operation.argument("field"))
+        if old_column and new_column:
+            changes.extend(get_column_changes(old_column, new_column))
+    yield from get_warnings(changes)
+
+
+def lint_file(path: str) -> LintResult:
+    try:
+        migration = parse_migration(path)
+    except (OSError, SyntaxError, ValueError) as e:
+        return LintResult(path=path, error=str(e))
+
+    if migration is None:
+        return LintResult(path=path)
+
+    return LintResult(
+        path=path, line=migration.line, warnings=list(check_migration(migration))
+    )
+
+
+def lint_files(paths: list[str], jobs: int | None = None) -> Iterable[LintResult]:
+    """
+    Lint migration files, using a process pool when there are many of them.
+    """
+
+    if len(paths) < MIN_FILES_FOR_POOL or jobs == 1:
+        return map(lint_file, paths)
+
+    jobs = jobs or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        chunksize = max(1, len(paths) // (jobs * 4))
+        return list(pool.map(lint_file, paths, chunksize=chunksize))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Check migration files without loading the Django project"
+    )
+    parser.add_argument(
+        "--jobs", type=int, help="Number of processes to use for many files"
+    )
+    parser.add_argument("paths", nargs="+", help="Migration files to check")
+    args = parser.parse_args()
+
+    failed = False
+    for result in lint_files(args.paths, jobs=args.jobs):
+        if result.error:
+            print(f"{result.path}: ❌ {result.error}")
+            failed = True
+        for warning in result.warnings:
+            print(f"{result.path}:{result.line}: {warning}")
+            failed = True
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+Analysis of the order migrations lock tables in. A migration holds its locks
+until it commits, so if it locks table B and then waits for table A, while a
+busy transaction holds a row lock on A and waits for B, they deadlock. The
+order the busiest transactions write to tables is configured in
+pyproject.toml:
+
+    [tool.migration_checker.lock_order]
+    hot_path = ["tests_order", "tests_orderline"]
+    # Tables that should not be locked as a side effect, defaults to hot_path
+    busy_tables = ["tests_order", "tests_orderline", "auth_user"]
+"""
+
+import functools
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterable, Sequence, TextIO
+
+from .locks import WRITE_BLOCKING_MODES, get_lock_sequence
+from .registry import load_config
+from .results import MigrationResult
+from .warnings import LOCK_FAN_OUT, LOCK_ORDER_INVERSION, Warning, with_details
+
+if TYPE_CHECKING:
+    from django.db.migrations import Migration
+
+
+@dataclass(frozen=True)
+class LockOrderConfig:
+    # Tables in the order hot transactions write to them
+    hot_path: tuple[str, ...] = ()
+    busy_tables: frozenset[str] = frozenset()
+
+
+@functools.lru_cache(maxsize=None)
+def get_lock_order_config() -> LockOrderConfig:
+    """
+    Get the lock order configured by pyproject.toml in the current directory.
+    """
+
+    section = load_config().get("lock_order", {})
+    hot_path = tuple(section.get("hot_path", ()))
+    return LockOrderConfig(
+        hot_path=hot_path,
+        busy_tables=frozenset(section.get("busy_tables", hot_path)),
+    )
+
+
+def get_blocking_tables(queries: Iterable[str]) -> list[str]:
+    """
+    Get the tables the queries lock in a mode that blocks writes, in the order
+    those locks are taken.
+    """
+
+    tables: list[str] = []
+    for table, mode in get_lock_sequence(queries):
+        if mode in WRITE_BLOCKING_MODES and table not in tables:
+            tables.append(table)
+    return tables
+
+
+def find_inversions(
+    tables: list[str], hot_path: tuple[str, ...]
+) -> list[tuple[str, str]]:
+    """
+    Find pairs of tables locked in the opposite order of the hot path.
+    """
+
+    positions = {table: index for index, table in enumerate(hot_path)}
+    hot_tables = [table for table in tables if table in positions]
+    return [
+        (first, second)
+        for index, first in enumerate(hot_tables)
+        for second in hot_tables[index + 1 :]
+        if positions[first] > positions[second]
+    ]
+
+
+def get_lock_order_warnings(
+    queries: list[str], config: LockOrderConfig
+) -> list[Warning]:
+    if not config.hot_path and not config.busy_tables:
+        return []
+
+    tables = get_blocking_tables(queries)
+    warnings = []
+
+    if inversions := find_inversions(tables, config.hot_path):
+        warnings.append(
+            with_details(
+                LOCK_ORDER_INVERSION,
+                [f"{second} is locked after {first}" for first, second in inversions],
+            )
+        )
+
+    busy = [table for table in tables if table in config.busy_tables]
+    if len(tables) > 1 and busy:
+        warnings.append(
+            with_details(
+                LOCK_FAN_OUT,
+                [f"Locks {len(tables)} tables, including {', '.join(busy)}"],
+            )
+        )
+
+    return warnings
+
+
+class LockGraphOutput:
+    """
+    Write a Graphviz graph of the tables each migration locks, with edges
+    numbered in the order the locks are taken.
+    """
+
+    def __init__(self, *, path: str, config: LockOrderConfig | None = None) -> None:
+        self.path = path
+        self.config = config or get_lock_order_config()
+        self.file: TextIO | None = None
+        self.tables: set[str] = set()
+
+    def no_migrations_to_apply(self) -> None:
+        self.begin(0)
+        self.done()
+
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        self.file = open(self.path, "w")
+        self.file.write("digraph locks {\n    rankdir=LR;\n")
+
+    def migration_result(self, migration: "Migration", result: MigrationResult) -> None:
+        assert self.file, "begin must be called first"
+        self.file.write(f'    "{result.title}" [shape=box];\n')
+        for index, (table, mode) in enumerate(get_lock_sequence(result.queries)):
+            self.tables.add(table)
+            style = "bold" if mode in WRITE_BLOCKING_MODES else "dashed"
+            self.file.write(
+                f'    "{result.title}" -> "{table}" '
+                f'[label="{index + 1}. {mode}", style={style}];\n'
+            )
+
+    def done(self) -> None:
+        if not self.file:
+            return
+        for table in sorted(self.tables & self.config.busy_tables):
+            self.file.write(f'    "{table}" [color=red];\n')
+        self.file.write("}\n")
+        self.file.close()
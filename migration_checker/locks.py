@@ -0,0 +1,194 @@
+"""
+Predict which locks statements take, without running them. This gives lock
+information for migrations that are not applied, and for migrations that
+can't be applied in a transaction, where locks can't be checked afterwards.
+
+The lock levels follow the Postgres documentation for each command:
+https://www.postgresql.org/docs/current/explicit-locking.html
+"""
+
+import re
+from typing import Iterable, Iterator
+
+from .sql import split_statements
+
+# Lock modes from weakest to strongest
+LOCK_MODES = [
+    "AccessShareLock",
+    "RowShareLock",
+    "RowExclusiveLock",
+    "ShareUpdateExclusiveLock",
+    "ShareLock",
+    "ShareRowExclusiveLock",
+    "ExclusiveLock",
+    "AccessExclusiveLock",
+]
+
+# Lock modes that conflict with the RowExclusiveLock taken by writes
+WRITE_BLOCKING_MODES = frozenset(
+    {"ShareLock", "ShareRowExclusiveLock", "ExclusiveLock", "AccessExclusiveLock"}
+)
+
+IDENTIFIER = r'(?:"(?:[^"]|"")+"|[\w$]+)(?:\.(?:"(?:[^"]|"")+"|[\w$]+))?'
+
+ALTER_TABLE = re.compile(
+    rf"^ALTER TABLE (?:IF EXISTS )?(?:ONLY )?({IDENTIFIER}) (.*)$", re.IGNORECASE
+)
+CREATE_INDEX = re.compile(
+    r"^CREATE (?:UNIQUE )?INDEX (CONCURRENTLY )?(?:IF NOT EXISTS )?"
+    rf"(?:{IDENTIFIER} )?ON (?:ONLY )?({IDENTIFIER})",
+    re.IGNORECASE,
+)
+DROP_INDEX = re.compile(
+    rf"^DROP INDEX (CONCURRENTLY )?(?:IF EXISTS )?({IDENTIFIER})", re.IGNORECASE
+)
+ALTER_INDEX = re.compile(
+    rf"^ALTER INDEX (?:IF EXISTS )?({IDENTIFIER}) RENAME", re.IGNORECASE
+)
+CREATE_TABLE = re.compile(
+    rf"^CREATE TABLE (?:IF NOT EXISTS )?({IDENTIFIER})", re.IGNORECASE
+)
+DROP_TABLE = re.compile(
+    r"^(?:DROP TABLE (?:IF EXISTS )?|TRUNCATE (?:TABLE )?(?:ONLY )?)(.*?)"
+    r"(?: CASCADE| RESTRICT)?$",
+    re.IGNORECASE,
+)
+WRITE = re.compile(
+    rf"^(?:UPDATE (?:ONLY )?|DELETE FROM (?:ONLY )?|INSERT INTO )({IDENTIFIER})",
+    re.IGNORECASE,
+)
+CREATE_TRIGGER = re.compile(
+    rf"^CREATE (?:OR REPLACE )?(?:CONSTRAINT )?TRIGGER .*? ON ({IDENTIFIER})",
+    re.IGNORECASE,
+)
+REFERENCES = re.compile(rf"\bREFERENCES ({IDENTIFIER})", re.IGNORECASE)
+
+# ALTER TABLE subcommands that take a weaker lock than AccessExclusiveLock
+SHARE_UPDATE_EXCLUSIVE_SUBCOMMANDS = re.compile(
+    r"^(?:VALIDATE CONSTRAINT|SET STATISTICS|ALTER (?:COLUMN )?\S+ SET STATISTICS"
+    r"|SET \(|RESET \(|CLUSTER ON|SET WITHOUT CLUSTER|ATTACH PARTITION)",
+    re.IGNORECASE,
+)
+FOREIGN_KEY_SUBCOMMAND = re.compile(
+    rf"^ADD (?:CONSTRAINT {IDENTIFIER} )?FOREIGN KEY", re.IGNORECASE
+)
+
+
+def get_name(identifier: str) -> str:
+    """
+    Get the unquoted name of a relation, without its schema.
+    """
+
+    quoted, unquoted = re.findall(r'"((?:[^"]|"")+)"|([\w$]+)', identifier)[-1]
+    return str(quoted).replace('""', '"') if quoted else str(unquoted).lower()
+
+
+def split_subcommands(actions: str) -> list[str]:
+    """
+    Split the actions of an ALTER TABLE statement on commas outside of
+    parentheses and quotes.
+    """
+
+    subcommands = []
+    depth = 0
+    quote = None
+    start = 0
+    for index, char in enumerate(actions):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in "'\"":
+            quote = char
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "," and depth == 0:
+            subcommands.append(actions[start:index].strip())
+            start = index + 1
+    subcommands.append(actions[start:].strip())
+    return subcommands
+
+
+def get_statement_locks(statement: str) -> Iterator[tuple[str, str]]:
+    """
+    Get the relations a single statement locks, and the lock modes.
+    """
+
+    sql = " ".join(statement.split()).rstrip(";").strip()
+
+    if match := ALTER_TABLE.match(sql):
+        table = get_name(match.group(1))
+        for subcommand in split_subcommands(match.group(2)):
+            if SHARE_UPDATE_EXCLUSIVE_SUBCOMMANDS.match(subcommand):
+                yield table, "ShareUpdateExclusiveLock"
+            elif FOREIGN_KEY_SUBCOMMAND.match(subcommand):
+                # Both tables are locked while existing rows are checked
+                yield table, "ShareRowExclusiveLock"
+                for reference in REFERENCES.findall(subcommand):
+                    yield get_name(reference), "ShareRowExclusiveLock"
+            else:
+                yield table, "AccessExclusiveLock"
+                for reference in REFERENCES.findall(subcommand):
+                    yield get_name(reference), "ShareRowExclusiveLock"
+
+    elif match := CREATE_INDEX.match(sql):
+        mode = "ShareUpdateExclusiveLock" if match.group(1) else "ShareLock"
+        yield get_name(match.group(2)), mode
+
+    elif match := DROP_INDEX.match(sql):
+        # The table of the index is locked too, but can't be known from the
+        # statement alone.
+        mode = "ShareUpdateExclusiveLock" if match.group(1) else "AccessExclusiveLock"
+        yield get_name(match.group(2)), mode
+
+    elif match := ALTER_INDEX.match(sql):
+        yield get_name(match.group(1)), "ShareUpdateExclusiveLock"
+
+    elif match := CREATE_TABLE.match(sql):
+        yield get_name(match.group(1)), "AccessExclusiveLock"
+        for reference in REFERENCES.findall(sql):
+            yield get_name(reference), "ShareRowExclusiveLock"
+
+    elif match := DROP_TABLE.match(sql):
+        for name in split_subcommands(match.group(1)):
+            yield get_name(name), "AccessExclusiveLock"
+
+    elif match := WRITE.match(sql):
+        yield get_name(match.group(1)), "RowExclusiveLock"
+
+    elif match := CREATE_TRIGGER.match(sql):
+        yield get_name(match.group(1)), "ShareRowExclusiveLock"
+
+
+def is_stronger(mode: str, other: str) -> bool:
+    return LOCK_MODES.index(mode) > LOCK_MODES.index(other)
+
+
+def get_lock_sequence(queries: Iterable[str]) -> list[tuple[str, str]]:
+    """
+    Get each lock in the order the queries take them. A lock on a relation
+    is only included the first time, or when a stronger one is taken.
+    """
+
+    sequence: list[tuple[str, str]] = []
+    strongest: dict[str, str] = {}
+    for query in queries:
+        for statement in split_statements(query):
+            for relation, mode in get_statement_locks(statement):
+                current = strongest.get(relation)
+                if current is None or is_stronger(mode, current):
+                    strongest[relation] = mode
+                    sequence.append((relation, mode))
+    return sequence
+
+
+def predict_locks(queries: Iterable[str]) -> list[tuple[str, str]]:
+    """
+    Predict the strongest lock taken on each relation by the queries, in
+    the same order as locks checked in the database.
+    """
+
+    # Later locks in the sequence are stronger
+    locks = dict(get_lock_sequence(queries))
+    return sorted(locks.items(), key=lambda lock: (lock[1], lock[0]))
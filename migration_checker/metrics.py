@@ -0,0 +1,248 @@
+"""
+A local SQLite store of how long migrations take to apply over time, to catch
+migrations that get slower from release to release, like data migrations on
+growing tables.
+"""
+
+import itertools
+import os
+import sqlite3
+import subprocess
+import time
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Iterator, Sequence
+
+from .results import MigrationResult
+
+if TYPE_CHECKING:
+    from django.db.migrations import Migration
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY,
+    commit_sha TEXT NOT NULL,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_commit_sha ON runs (commit_sha);
+
+CREATE TABLE IF NOT EXISTS migrations (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    app_label TEXT NOT NULL,
+    name TEXT NOT NULL,
+    duration REAL,
+    wal_bytes INTEGER,
+    num_queries INTEGER NOT NULL,
+    lock_modes TEXT
+);
+-- Covers looking up the latest runs of each migration
+CREATE INDEX IF NOT EXISTS migrations_key_run
+ON migrations (app_label, name, run_id DESC);
+"""
+
+
+@dataclass
+class MigrationHistory:
+    app_label: str
+    name: str
+    # Oldest first
+    durations: list[float]
+    wal_bytes: list[int]
+
+    @property
+    def latest(self) -> float:
+        return self.durations[-1]
+
+    def percentile(self, percent: float) -> float:
+        """
+        Get a percentile of the durations, using the nearest rank method.
+        """
+
+        durations = sorted(self.durations)
+        index = max(
+            0, min(len(durations) - 1, round(percent / 100 * len(durations)) - 1)
+        )
+        return durations[index]
+
+    def is_regression(self, *, threshold: float, min_runs: int) -> bool:
+        """
+        Check if the latest run is slower than the median of earlier runs by
+        more than the threshold.
+        """
+
+        previous = sorted(self.durations[:-1])
+        if len(previous) < min_runs:
+            return False
+        median = previous[len(previous) // 2]
+        return self.latest > median * threshold
+
+
+def connect(path: str) -> sqlite3.Connection:
+    connection = sqlite3.connect(path)
+    # Concurrent CI jobs on the same machine may append at the same time
+    connection.execute("PRAGMA journal_mode=WAL")
+    connection.execute("PRAGMA busy_timeout=5000")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+def get_commit() -> str:
+    if commit := os.environ.get("GITHUB_SHA"):
+        return commit
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+class MetricsOutput:
+    """
+    Append the results of a run to a metrics database.
+    """
+
+    def __init__(self, *, path: str, commit: str | None = None) -> None:
+        self.path = path
+        self.commit = commit or get_commit()
+        self.connection: sqlite3.Connection | None = None
+        self.run_id: int | None = None
+
+    def no_migrations_to_apply(self) -> None:
+        pass
+
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        self.connection = connect(self.path)
+        cursor = self.connection.execute(
+            "INSERT INTO runs (commit_sha, created_at) VALUES (?, ?)",
+            (self.commit, time.time()),
+        )
+        self.run_id = cursor.lastrowid
+
+    def migration_result(self, migration: "Migration", result: MigrationResult) -> None:
+        assert self.connection, "begin must be called first"
+        # Only applying migrations is tracked, so durations are comparable
+        if result.backwards:
+            return
+        self.connection.execute(
+            """
+            INSERT INTO migrations (
+                run_id, app_label, name, duration, wal_bytes, num_queries, lock_modes
+            ) VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (
+                self.run_id,
+                result.app_label,
+                result.name,
+                result.duration,
+                result.wal_bytes,
+                len(result.queries),
+                (
+                    ",".join(sorted({mode for _, mode in result.locks}))
+                    if result.locks is not None
+                    else None
+                ),
+            ),
+        )
+
+    def done(self) -> None:
+        if self.connection:
+            # Everything is written in one transaction, so failed runs don't
+            # leave partial results behind.
+            self.connection.commit()
+            self.connection.close()
+
+
+def get_histories(path: str, *, max_runs: int) -> Iterator[MigrationHistory]:
+    """
+    Get the durations of the latest runs of each migration.
+    """
+
+    connection = connect(path)
+    try:
+        rows = connection.execute(
+            """
+            SELECT app_label, name, duration, wal_bytes FROM (
+                SELECT
+                    *,
+                    ROW_NUMBER() OVER (
+                        PARTITION BY app_label, name ORDER BY run_id DESC
+                    ) AS run_number
+                FROM migrations
+                WHERE duration IS NOT NULL
+            )
+            WHERE run_number <= ?
+            ORDER BY app_label, name, run_id
+            """,
+            (max_runs,),
+        )
+
+        for (app_label, name), group in itertools.groupby(
+            rows, key=lambda row: (row[0], row[1])
+        ):
+            runs = list(group)
+            yield MigrationHistory(
+                app_label=app_label,
+                name=name,
+                durations=[duration for _, _, duration, _ in runs],
+                wal_bytes=[
+                    wal_bytes for _, _, _, wal_bytes in runs if wal_bytes is not None
+                ],
+            )
+    finally:
+        connection.close()
+
+
+def get_expected_durations(
+    path: str, *, max_runs: int = 10
+) -> dict[tuple[str, str], float]:
+    """
+    Get the median duration of the latest runs of each migration.
+    """
+
+    return {
+        (history.app_label, history.name): history.percentile(50)
+        for history in get_histories(path, max_runs=max_runs)
+    }
+
+
+def print_report(path: str, *, threshold: float, min_runs: int, max_runs: int) -> bool:
+    """
+    Print percentiles of how long each migration took, and return whether
+    any migrations got slower.
+    """
+
+    regressions = False
+    print(
+        f"{'Migration':<50} {'Runs':>5} {'p50':>9} {'p90':>9} {'p99':>9} "
+        f"{'Latest':>9} {'WAL':>10}"
+    )
+    for history in get_histories(path, max_runs=max_runs):
+        regression = history.is_regression(threshold=threshold, min_runs=min_runs)
+        regressions = regressions or regression
+        wal = format_bytes(history.wal_bytes[-1]) if history.wal_bytes else "-"
+        print(
+            f"{history.app_label + '.' + history.name:<50} "
+            f"{len(history.durations):>5} "
+            f"{format_duration(history.percentile(50)):>9} "
+            f"{format_duration(history.percentile(90)):>9} "
+            f"{format_duration(history.percentile(99)):>9} "
+            f"{format_duration(history.latest):>9} "
+            f"{wal:>10}" + (" 🐌 slower than usual" if regression else "")
+        )
+    return regressions
+
+
+def format_duration(seconds: float) -> str:
+    return f"{seconds * 1000:.0f} ms" if seconds < 1 else f"{seconds:.2f} s"
+
+
+def format_bytes(num_bytes: int) -> str:
+    size = float(num_bytes)
+    for unit in ("B", "kB", "MB", "GB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}"
+        size /= 1024
+    return f"{size:.0f} TB"
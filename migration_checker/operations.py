@@ -0,0 +1,201 @@
+"""
+Migration operations to use in projects checked by migration_checker.
+
+RunPythonInBatches is a data migration that updates a table in batches, each
+in a short transaction of its own, instead of locking every row it touches
+until the whole migration commits:
+
+    from migration_checker.operations import RunPythonInBatches
+
+    def fill_total(apps, schema_editor, queryset):
+        queryset.update(total=F("price") * F("quantity"))
+
+    class Migration(migrations.Migration):
+        atomic = False
+
+        operations = [
+            RunPythonInBatches(
+                "orderline",
+                fill_total,
+                RunPythonInBatches.noop,
+                condition=Q(total__isnull=True),
+                batch_size=1000,
+            ),
+        ]
+
+Rows are paginated by primary key. Batches that finished are committed, so
+when a condition selects the rows that are left to update, running the
+migration again after a failure resumes where it stopped.
+"""
+
+import contextlib
+import time
+from contextvars import ContextVar
+from typing import Any, Callable, ContextManager, Iterator
+
+from django.contrib.postgres.operations import NotInTransactionMixin
+from django.db import router, transaction
+from django.db.backends.base.schema import BaseDatabaseSchemaEditor
+from django.db.migrations import RunPython
+from django.db.migrations.state import ProjectState, StateApps
+from django.db.models import Q, QuerySet
+
+# Called with the number of rows around the code of each batch, inside the
+# transaction of the batch
+BatchObserver = Callable[[int], ContextManager[None]]
+
+_batch_observer: ContextVar[BatchObserver | None] = ContextVar(
+    "batch_observer", default=None
+)
+
+
+@contextlib.contextmanager
+def observe_batches(observer: BatchObserver) -> Iterator[None]:
+    """
+    Observe the batches run by RunPythonInBatches operations.
+    """
+
+    token = _batch_observer.set(observer)
+    try:
+        yield
+    finally:
+        _batch_observer.reset(token)
+
+
+class RunPythonInBatches(NotInTransactionMixin, RunPython):
+    """
+    Run code on batches of the rows of a model, each batch in a separate
+    transaction. The code is called like the code of RunPython, with a
+    queryset of the batch as an extra argument.
+    """
+
+    # Arguments can't be keyword-only, as MigrationWriter leaves those out
+    def __init__(
+        self,
+        model_name: str,
+        code: Callable[[StateApps, BaseDatabaseSchemaEditor, QuerySet[Any]], Any],
+        reverse_code: Callable[..., Any] | None = None,
+        condition: Q | None = None,
+        batch_size: int = 1000,
+        sleep: float = 0.0,
+        hints: dict[str, Any] | None = None,
+        elidable: bool = False,
+    ) -> None:
+        super().__init__(
+            code,  # type: ignore[arg-type]
+            reverse_code,
+            atomic=False,
+            hints=hints,
+            elidable=elidable,
+        )
+        self.model_name = model_name
+        # Rows to run the code on, e.g. the ones that haven't been updated yet
+        self.condition = condition
+        self.batch_size = batch_size
+        # Seconds to wait between batches, to leave room for other writes
+        self.sleep = sleep
+
+    def deconstruct(self) -> tuple[str, list[Any], dict[str, Any]]:
+        kwargs: dict[str, Any] = {
+            "model_name": self.model_name,
+            "code": self.code,
+        }
+        if self.reverse_code is not None:
+            kwargs["reverse_code"] = self.reverse_code
+        if self.condition is not None:
+            kwargs["condition"] = self.condition
+        if self.batch_size != 1000:
+            kwargs["batch_size"] = self.batch_size
+        if self.sleep:
+            kwargs["sleep"] = self.sleep
+        if self.hints:
+            kwargs["hints"] = self.hints
+        if self.elidable:
+            kwargs["elidable"] = self.elidable
+        return self.__class__.__name__, [], kwargs
+
+    @staticmethod
+    def noop(
+        apps: StateApps,
+        schema_editor: BaseDatabaseSchemaEditor,
+        queryset: QuerySet[Any] | None = None,
+    ) -> None:
+        return None
+
+    def describe(self) -> str:
+        return f"Run Python in batches of {self.batch_size} on {self.model_name}"
+
+    def database_forwards(
+        self,
+        app_label: str,
+        schema_editor: BaseDatabaseSchemaEditor,
+        from_state: ProjectState,
+        to_state: ProjectState,
+    ) -> None:
+        self._ensure_not_in_transaction(schema_editor)
+        if router.allow_migrate(
+            schema_editor.connection.alias, app_label, **self.hints
+        ):
+            self.run_batches(
+                from_state.apps, app_label, schema_editor, self.code, self.condition
+            )
+
+    def database_backwards(
+        self,
+        app_label: str,
+        schema_editor: BaseDatabaseSchemaEditor,
+        from_state: ProjectState,
+        to_state: ProjectState,
+    ) -> None:
+        if self.reverse_code is None:
+            raise NotImplementedError("You cannot reverse this operation")
+        if self.reverse_code in (RunPython.noop, RunPythonInBatches.noop):
+            return
+        self._ensure_not_in_transaction(schema_editor)
+        if router.allow_migrate(
+            schema_editor.connection.alias, app_label, **self.hints
+        ):
+            self.run_batches(
+                from_state.apps, app_label, schema_editor, self.reverse_code, None
+            )
+
+    def run_batches(
+        self,
+        apps: StateApps,
+        app_label: str,
+        schema_editor: BaseDatabaseSchemaEditor,
+        code: Callable[..., Any],
+        condition: Q | None,
+    ) -> None:
+        model = apps.get_model(app_label, self.model_name)
+        alias = schema_editor.connection.alias
+        queryset = model._default_manager.using(alias).all()
+        if condition is not None:
+            queryset = queryset.filter(condition)
+        observer = _batch_observer.get()
+
+        for first, last, rows in self.iter_batches(queryset):
+            with transaction.atomic(using=alias):
+                with observer(rows) if observer else contextlib.nullcontext():
+                    code(apps, schema_editor, queryset.filter(pk__range=(first, last)))
+            if self.sleep:
+                time.sleep(self.sleep)
+
+    def iter_batches(self, queryset: QuerySet[Any]) -> Iterator[tuple[Any, Any, int]]:
+        """
+        Get the first and last primary key and the number of rows of each
+        batch. The next batch starts after the last key of the batch before
+        it, so rows aren't skipped or counted twice when the code changes
+        which rows match the condition.
+        """
+
+        last = None
+        while True:
+            page = queryset if last is None else queryset.filter(pk__gt=last)
+            keys = list(
+                page.order_by("pk").values_list("pk", flat=True)[: self.batch_size]
+            )
+            if not keys:
+                return
+            yield keys[0], keys[-1], len(keys)
+            last = keys[-1]
@@ -2,36 +2,154 @@
 Helpers to build the Github comment output
 """
 
+import ast
 import functools
+import hashlib
 import inspect
-import io
+import itertools
+import json
+import os
+import queue
+import re
+import sys
 import textwrap
+import threading
+import time
+import tokenize
+import traceback
+from collections import Counter
+from dataclasses import asdict
+from typing import Callable, Iterator, Protocol, Sequence, TextIO
 
 from django.db.migrations import Migration
 
-from .github import GithubClient
-from .warnings import Warning
+from .github import Comment, GithubClient
+from .metrics import format_bytes
+from .results import MigrationResult, get_query_fingerprint, write_results
+from .warnings import Level, Warning
+
+MARKER = "ADDED BY django-migrations-checker"
+PARTS_PATTERN = re.compile(re.escape(MARKER) + r" \(part \d+ of (\d+)\)")
+
+# Github rejects comments longer than 65536 characters. Leave some room for
+# the footer and notes about what was left out.
+COMMENT_BUDGET = 60000
+MAX_COMMENTS = 10
+# Migrations listed by name when they don't fit in the comments, so the list
+# fits in the room left by COMMENT_BUDGET
+MAX_LISTED_OMITTED = 10
+
+# Limits for queries in comments. The full queries are in the report.
+MAX_QUERY_LENGTH = 1000
+MAX_SQL_LENGTH = 10000
+
+SARIF_LEVELS = {
+    Level.DANGER: "error",
+    Level.WARNING: "warning",
+    Level.NOTICE: "note",
+}
+
+
+class Output(Protocol):
+    def no_migrations_to_apply(self) -> None:
+        ...
+
+    # The keys of the migrations in the order their results will be
+    # delivered, when known
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        ...
+
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        ...
+
+    def done(self) -> None:
+        ...
+
+
+class BackgroundOutputs:
+    """
+    Deliver results to outputs on a background thread, so rendering and
+    posting results overlaps with applying the next migration. When the
+    outputs fall behind, submitting blocks until they catch up.
+    """
+
+    def __init__(self, outputs: list[Output], *, max_pending: int = 16) -> None:
+        self.outputs = outputs
+        self.queue: queue.Queue[Callable[[Output], None] | None] = queue.Queue(
+            maxsize=max_pending
+        )
+        self.error: BaseException | None = None
+        self.thread = threading.Thread(
+            target=self._run, name="migration-checker-outputs", daemon=True
+        )
+        self.thread.start()
+
+    def _run(self) -> None:
+        while (task := self.queue.get()) is not None:
+            # Skip remaining work after a failure, but keep draining the queue
+            # so the executor is never blocked.
+            if self.error is not None:
+                continue
+            try:
+                for output in self.outputs:
+                    task(output)
+            except BaseException as e:
+                self.error = e
+
+    def _submit(self, task: Callable[[Output], None]) -> None:
+        if self.error is not None:
+            raise self.error
+        self.queue.put(task)
+
+    def close(self) -> None:
+        """
+        Wait for all results to be delivered, and raise any error that
+        happened in the meantime. When closing because of another error, the
+        output error is printed instead, so it doesn't hide the other one.
+        """
+
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+        if self.error is None:
+            return
+        if sys.exc_info()[1] is None:
+            raise self.error
+        print("Error in outputs while handling another error:", file=sys.stderr)
+        traceback.print_exception(self.error, file=sys.stderr)
+
+    def no_migrations_to_apply(self) -> None:
+        self._submit(lambda output: output.no_migrations_to_apply())
+        self.close()
+
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        self._submit(
+            lambda output: output.begin(num_migrations=num_migrations, keys=keys)
+        )
+
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        self._submit(
+            lambda output: output.migration_result(migration=migration, result=result)
+        )
+
+    def done(self) -> None:
+        self._submit(lambda output: output.done())
+        self.close()
 
 
 class ConsoleOutput:
     def no_migrations_to_apply(self) -> None:
         print("No migrations to apply")
 
-    def begin(self, num_migrations: int) -> None:
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
         print(f"🔍 Applying and checking {num_migrations} migrations")
 
-    def migration_result(
-        self,
-        migration: Migration,
-        queries: list[str],
-        locks: list[tuple[str, str]] | None,
-        warnings: list[Warning],
-    ) -> None:
-        print(cyan(f"\n{migration.app_label}.{migration.name}"))
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        print(cyan(f"\n{result.title}"))
         for operation in migration.operations:
             print(f"    {operation.describe()}")
 
-        for warning in warnings:
+        for warning in result.warnings:
             print(f"\n    {warning.level.emoji} {bold(warning.title)}")
             print(
                 textwrap.fill(
@@ -41,17 +159,161 @@ class ConsoleOutput:
                 )
             )
 
-        if locks:
+        if result.locks:
             print()
-            for table_name, lock_type in locks:
+            if result.locks_predicted:
+                print(f"    {yellow('Locks predicted from the SQL')}")
+            for table_name, lock_type in result.locks:
                 print(f"    🔒 {red(lock_type)} on {bold(table_name)}")
         else:
             print(f"    🔒 {yellow('Locks not checked')}")
 
+        if result.batches:
+            rows = sum(batch.rows for batch in result.batches)
+            longest = max(result.batches, key=lambda batch: batch.duration)
+            print(
+                f"    📦 {len(result.batches)} batches of {rows} rows, the longest "
+                f"held its locks for {longest.duration:.2f} s"
+            )
+            for table_name, lock_type in longest.locks or ():
+                print(f"        🔒 {lock_type} on {bold(table_name)}")
+
+        for table in result.bloat or ():
+            print(
+                f"    🗑️  {bold(table.table)}: {table.dead_tuples} dead tuples, "
+                f"{table.updated_tuples} updated, {format_bytes(table.size_before)} "
+                f"-> {format_bytes(table.size_after)}"
+            )
+
     def done(self) -> None:
         pass
 
 
+class ProgressOutput:
+    """
+    Print a single line per migration and the progress of the run, for plans
+    with too many migrations to read the full output of. On a terminal the
+    progress is kept on the last line, otherwise it is printed periodically.
+    """
+
+    def __init__(
+        self,
+        *,
+        expected_durations: dict[tuple[str, str], float] | None = None,
+        stream: TextIO | None = None,
+        interval: float = 5.0,
+    ) -> None:
+        self.expected_durations = expected_durations or {}
+        self.stream = stream or sys.stdout
+        self.interactive = self.stream.isatty()
+        self.interval = interval
+        self.total = 0
+        self.completed = 0
+        # Durations of completed migrations with a known expected duration
+        self.actual_time = 0.0
+        self.expected_time = 0.0
+        # Migrations left in the plan, if known
+        self.remaining: Counter[tuple[str, str]] = Counter()
+
+    def no_migrations_to_apply(self) -> None:
+        self.stream.write("No migrations to apply\n")
+
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        self.total = num_migrations
+        self.remaining = Counter(keys)
+        self.start = self.last_status = time.perf_counter()
+        self.stream.write(f"🔍 Applying and checking {num_migrations} migrations\n")
+
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        self.completed += 1
+        self.remaining[result.key] -= 1
+        expected = self.expected_durations.get(result.key)
+        if expected is not None and result.duration is not None:
+            self.actual_time += result.duration
+            self.expected_time += expected
+
+        line = get_compact_line(result)
+        now = time.perf_counter()
+        if self.interactive:
+            self.stream.write(f"\r\033[K{line}\n{self.get_status(now)}")
+        elif now - self.last_status >= self.interval:
+            self.last_status = now
+            self.stream.write(f"{line}\n{self.get_status(now)}\n")
+        else:
+            self.stream.write(f"{line}\n")
+
+    def done(self) -> None:
+        status = self.get_status(time.perf_counter())
+        self.stream.write(f"\r\033[K{status}\n" if self.interactive else f"{status}\n")
+        self.stream.flush()
+
+    def get_status(self, now: float) -> str:
+        elapsed = now - self.start
+        rate = self.completed / elapsed if elapsed else 0.0
+        eta = self.get_eta(elapsed)
+        return (
+            f"⏳ {self.completed}/{self.total} migrations, {rate:.1f}/s, "
+            f"elapsed {format_seconds(elapsed)}, "
+            f"ETA {format_seconds(eta) if eta is not None else '?'}"
+        )
+
+    def get_eta(self, elapsed: float) -> float | None:
+        """
+        Estimate the time left. With historical durations, the expected
+        durations of the migrations left are scaled by how fast this run is
+        compared to earlier runs. Migrations without history, or all of them
+        when the plan isn't known, count as the mean of earlier runs.
+        Otherwise the average so far is used.
+        """
+
+        remaining = self.total - self.completed
+        if self.expected_time and self.expected_durations:
+            speed = self.actual_time / self.expected_time
+            typical = sum(self.expected_durations.values()) / len(
+                self.expected_durations
+            )
+            expected = 0.0
+            for key, count in self.remaining.items():
+                if count > 0 and key in self.expected_durations:
+                    expected += self.expected_durations[key] * count
+                    remaining -= count
+            return (expected + remaining * typical) * speed
+        if self.completed:
+            return remaining * elapsed / self.completed
+        return None
+
+
+def get_compact_line(result: MigrationResult) -> str:
+    levels = {warning.level for warning in result.warnings}
+    emoji = next(
+        (level.emoji for level in Level if level in levels),
+        "✅",
+    )
+    line = f"{emoji} {result.title}"
+    if result.duration is not None:
+        line += gray(f" ({result.duration * 1000:.0f} ms)")
+    if result.warnings:
+        line += ": " + "; ".join(warning.title for warning in result.warnings)
+    exclusive_locks = [
+        f"{lock_type} on {table_name}"
+        for table_name, lock_type in result.locks or ()
+        if lock_type in ("AccessExclusiveLock", "ExclusiveLock")
+    ]
+    if exclusive_locks:
+        line += red(" 🔒 " + ", ".join(exclusive_locks))
+    return line
+
+
+def format_seconds(seconds: float) -> str:
+    minutes, seconds = divmod(round(seconds), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return f"{hours}h{minutes:02}m"
+    if minutes:
+        return f"{minutes}m{seconds:02}s"
+    return f"{seconds}s"
+
+
 def _color(value: str, *, color_code: str) -> str:
     return f"\033[{color_code}m{value}\033[0m"
 
@@ -66,64 +328,323 @@ bold = functools.partial(_color, color_code="1")
 
 
 class GithubCommentOutput:
-    def __init__(self, *, client: GithubClient) -> None:
-        self.output = io.StringIO()
+    """
+    Post results as comments on the pull request. Comments are kept within
+    Github's size limit by leaving out details, like source code and long
+    queries, and by splitting results over multiple comments when needed. The
+    full details are written to a report file, which the comments link to.
+    """
+
+    def __init__(
+        self,
+        *,
+        client: GithubClient,
+        report_path: str | None = None,
+        report_url: str | None = None,
+    ) -> None:
         self.client = client
+        self.report_path = report_path
+        self.report_url = report_url
+        self.report: TextIO | None = None
+        self.parts: list[list[str]] = []
+        self.part_length = 0
+        self.omitted: list[str] = []
+
+    def find_comments(self) -> list[Comment]:
+        """
+        Find comments posted by earlier runs. The first comment says how many
+        parts there are, so we can stop looking once all have been found.
+        """
+
+        comments: list[Comment] = []
+        num_parts = 1
+        for comment in self.client.iter_comments():
+            if MARKER not in comment.body:
+                continue
+            comments.append(comment)
+            if match := PARTS_PATTERN.search(comment.body):
+                num_parts = int(match.group(1))
+            if len(comments) >= num_parts:
+                break
+        return comments
+
+    def post_comments(self, bodies: list[str]) -> None:
+        comments = sorted(self.find_comments(), key=lambda comment: comment.id)
+
+        for body, comment in itertools.zip_longest(bodies, comments):
+            if comment is None:
+                self.client.create_comment(body=body)
+            elif body is None:
+                self.client.delete_comment(comment_id=comment.id)
+            else:
+                self.client.update_comment(comment_id=comment.id, body=body)
 
-    def post_comment(self) -> None:
-        comment = next(
-            (
-                comment
-                for comment in self.client.get_comments()
-                if "ADDED BY django-migrations-checker" in comment.body
-            ),
-            None,
-        )
+    def no_migrations_to_apply(self) -> None:
+        if self.find_comments():
+            self.post_comments(
+                [
+                    "Looks like this pull request no longer contains any "
+                    f"migrations.\n<!-- {MARKER} -->"
+                ]
+            )
 
-        body = self.output.getvalue()
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        if self.report_path:
+            self.report = open(self.report_path, "w")
+            self.report.write(get_header_md())
+
+        self.parts = [[get_header_md()]]
+        self.part_length = len(self.parts[0][0])
+
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        if self.report:
+            self.report.writelines(
+                iter_migration_md(
+                    migration=migration,
+                    queries=result.queries,
+                    locks=result.locks,
+                    warnings=result.warnings,
+                    locks_predicted=result.locks_predicted,
+                    backwards=result.backwards,
+                )
+            )
+
+        if self._add_section(migration, result):
+            return
+
+        if len(self.parts) < MAX_COMMENTS:
+            self.parts.append([])
+            self.part_length = 0
+            if self._add_section(migration, result):
+                return
+
+        self.omitted.append(result.title)
+
+    def _add_section(self, migration: Migration, result: MigrationResult) -> bool:
+        """
+        Add the most detailed section for the migration that fits in the
+        current comment. Warnings are always included, while source code and
+        queries are the first to go.
+        """
+
+        budget = COMMENT_BUDGET - self.part_length
+        for section in iter_migration_sections(
+            migration=migration, result=result, budget=budget
+        ):
+            if len(section) <= budget:
+                self.parts[-1].append(section)
+                self.part_length += len(section)
+                return True
+        return False
+
+    def done(self) -> None:
+        if self.report:
+            self.report.write(get_footer_md())
+            self.report.close()
+
+        notes = []
+        if self.omitted:
+            listed = ", ".join(
+                f"`{name}`" for name in self.omitted[:MAX_LISTED_OMITTED]
+            )
+            if len(self.omitted) > MAX_LISTED_OMITTED:
+                listed += f" and {len(self.omitted) - MAX_LISTED_OMITTED} more"
+            notes.append(
+                f"{len(self.omitted)} migrations did not fit in these comments: "
+                + listed
+            )
+        if self.report_url and self.report_path:
+            artifact = os.path.splitext(os.path.basename(self.report_path))[0]
+            notes.append(
+                "The full report, including all source code and queries, is "
+                f"uploaded as the `{artifact}` artifact of "
+                f"[the workflow run]({self.report_url})."
+            )
+        elif self.report_path:
+            notes.append(f"The full report was written to `{self.report_path}`.")
+
+        bodies = []
+        for index, part in enumerate(self.parts, start=1):
+            if index > 1:
+                part.insert(0, f"_Continued, part {index} of {len(self.parts)}_\n")
+            if index == len(self.parts):
+                part.extend(f"\n{note}\n" for note in notes)
+            part.append(get_footer_md(part=index, num_parts=len(self.parts)))
+            bodies.append("".join(part))
+
+        self.post_comments(bodies)
 
-        if comment:
-            self.client.update_comment(comment_id=comment.id, body=body)
-        else:
-            self.client.create_comment(body=body)
+
+class ResultFileOutput:
+    """
+    Write results to a file, so results from multiple runs can be merged.
+    """
+
+    def __init__(self, *, path: str) -> None:
+        self.path = path
+        self.results: list[MigrationResult] = []
 
     def no_migrations_to_apply(self) -> None:
-        comment = next(
-            (
-                comment
-                for comment in self.client.get_comments()
-                if "ADDED BY django-migrations-checker" in comment.body
-            ),
-            None,
-        )
+        write_results(self.path, [])
 
-        if comment:
-            self.client.update_comment(
-                comment_id=comment.id,
-                body="Looks like this pull request no longer contains any migrations.",
-            )
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        pass
 
-    def begin(self, num_migrations: int) -> None:
-        print(get_header_md(), file=self.output)
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        self.results.append(result)
 
-    def migration_result(
-        self,
-        migration: Migration,
-        queries: list[str],
-        locks: list[tuple[str, str]] | None,
-        warnings: list[Warning],
-    ) -> None:
-        print(
-            get_migration_md(
-                migration=migration, queries=queries, locks=locks, warnings=warnings
-            ),
-            file=self.output,
-        )
+    def done(self) -> None:
+        write_results(self.path, self.results)
+
+
+class JsonLinesOutput:
+    """
+    Write a JSON record for each migration as soon as it has been checked, so
+    results can be collected from many projects without parsing markdown.
+    """
+
+    def __init__(self, *, path: str) -> None:
+        self.path = path
+        self.file: TextIO | None = None
+
+    def no_migrations_to_apply(self) -> None:
+        open(self.path, "w").close()
+
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        self.file = open(self.path, "w")
+
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        assert self.file, "begin must be called first"
+        self.file.write(json.dumps(get_result_record(migration, result)) + "\n")
+        self.file.flush()
 
     def done(self) -> None:
-        print(get_footer_md(), file=self.output)
+        if self.file:
+            self.file.close()
 
-        self.post_comment()
+
+class SarifOutput:
+    """
+    Write warnings in the SARIF format, pointing at the migration files, so
+    they can be shown by code scanning tools.
+    """
+
+    def __init__(self, *, path: str) -> None:
+        self.path = path
+        self.rules: dict[str, Warning] = {}
+        self.results: list[dict[str, object]] = []
+
+    def no_migrations_to_apply(self) -> None:
+        self.done()
+
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        pass
+
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        path, line = get_source_location(migration)
+        location = {
+            "physicalLocation": {
+                "artifactLocation": {
+                    "uri": get_relative_uri(path),
+                    "uriBaseId": "%SRCROOT%",
+                },
+                "region": {"startLine": line},
+            }
+        }
+        for warning in result.warnings:
+            rule_id = get_rule_id(warning)
+            self.rules.setdefault(rule_id, warning)
+            self.results.append(
+                {
+                    "ruleId": rule_id,
+                    "level": SARIF_LEVELS[warning.level],
+                    "message": {"text": f"{result.title}: {warning.title}"},
+                    "locations": [location] if path else [],
+                }
+            )
+
+    def done(self) -> None:
+        rules = [
+            {
+                "id": rule_id,
+                "name": warning.title,
+                "shortDescription": {"text": warning.title},
+                "fullDescription": {"text": warning.description},
+                "defaultConfiguration": {"level": SARIF_LEVELS[warning.level]},
+            }
+            for rule_id, warning in self.rules.items()
+        ]
+        sarif = {
+            "$schema": "https://json.schemastore.org/sarif-2.1.0.json",
+            "version": "2.1.0",
+            "runs": [
+                {
+                    "tool": {
+                        "driver": {
+                            "name": "django-migrations-checker",
+                            "informationUri": (
+                                "https://github.com/kolonialno/"
+                                "django-migrations-checker"
+                            ),
+                            "rules": rules,
+                        }
+                    },
+                    "results": self.results,
+                }
+            ],
+        }
+        with open(self.path, "w") as f:
+            json.dump(sarif, f, indent=2)
+
+
+def get_rule_id(warning: Warning) -> str:
+    return re.sub(r"[^a-z0-9]+", "-", warning.title.lower()).strip("-")
+
+
+def get_relative_uri(path: str | None) -> str | None:
+    if path is None:
+        return None
+    return os.path.relpath(path).replace(os.sep, "/")
+
+
+def get_result_record(
+    migration: Migration, result: MigrationResult
+) -> dict[str, object]:
+    path, line = get_source_location(migration)
+    return {
+        "app_label": result.app_label,
+        "name": result.name,
+        "file": get_relative_uri(path),
+        "line": line,
+        "backwards": result.backwards,
+        "duration": result.duration,
+        "warnings": [
+            {
+                "rule": get_rule_id(warning),
+                "level": warning.level.value,
+                "title": warning.title,
+            }
+            for warning in result.warnings
+        ],
+        "locks": (
+            [{"table": table, "mode": mode} for table, mode in result.locks]
+            if result.locks is not None
+            else None
+        ),
+        "locks_predicted": result.locks_predicted,
+        "batches": [
+            {"rows": batch.rows, "duration": batch.duration} for batch in result.batches
+        ],
+        "bloat": (
+            [asdict(table) for table in result.bloat]
+            if result.bloat is not None
+            else None
+        ),
+        "num_queries": len(result.queries),
+        "query_fingerprints": [
+            get_query_fingerprint(query) for query in result.queries
+        ],
+    }
 
 
 def get_header_md() -> str:
@@ -136,8 +657,8 @@ an extra look at especially the locks taken by the migrations.
 """
 
 
-def get_footer_md() -> str:
-    return """
+def get_footer_md(part: int = 1, num_parts: int = 1) -> str:
+    return f"""
 ---
 
 <details>
@@ -147,33 +668,99 @@ def get_footer_md() -> str:
 This message is posted by a GitHub Action that checks migrations.
 
 </details>
-<!-- ADDED BY django-migrations-checker -->
+<!-- {MARKER} (part {part} of {num_parts}) -->
 """
 
 
+def iter_migration_sections(
+    *, migration: Migration, result: MigrationResult, budget: int
+) -> Iterator[str]:
+    """
+    Get markdown for a migration with decreasing levels of detail. Source code
+    is only looked up when there is room for it within the budget.
+    """
+
+    def render(include_source: bool, max_sql_length: int) -> str:
+        return get_migration_md(
+            migration=migration,
+            queries=result.queries,
+            locks=result.locks,
+            warnings=result.warnings,
+            locks_predicted=result.locks_predicted,
+            backwards=result.backwards,
+            include_source=include_source,
+            max_sql_length=max_sql_length,
+        )
+
+    compact = render(False, MAX_SQL_LENGTH)
+    if len(compact) < budget and len(compact) + len(get_source(migration)) < budget:
+        yield render(True, MAX_SQL_LENGTH)
+    yield compact
+    yield render(False, 0)
+    yield get_migration_summary_md(
+        migration=migration, warnings=result.warnings, backwards=result.backwards
+    )
+
+
 def get_migration_md(
     *,
     migration: Migration,
     queries: list[str],
     locks: list[tuple[str, str]] | None,
     warnings: list[Warning],
+    locks_predicted: bool = False,
+    backwards: bool = False,
+    include_source: bool = True,
+    max_sql_length: int | None = None,
 ) -> str:
     """
     Get markdown containing details for a single migration.
     """
 
-    source_code = inspect.getsource(migration.__class__)
+    return "".join(
+        iter_migration_md(
+            migration=migration,
+            queries=queries,
+            locks=locks,
+            warnings=warnings,
+            locks_predicted=locks_predicted,
+            backwards=backwards,
+            include_source=include_source,
+            max_sql_length=max_sql_length,
+        )
+    )
+
+
+def iter_migration_md(
+    *,
+    migration: Migration,
+    queries: list[str],
+    locks: list[tuple[str, str]] | None,
+    warnings: list[Warning],
+    locks_predicted: bool = False,
+    backwards: bool = False,
+    include_source: bool = True,
+    max_sql_length: int | None = None,
+) -> Iterator[str]:
+    """
+    Get markdown for a single migration in chunks, so large migrations can be
+    written to a file without building the whole text in memory.
+    """
+
     if locks:
-        locks_details = "### Locks\n" + "\n".join(
-            get_lock_details(table, lock) for table, lock in locks
+        heading = (
+            "### Locks (predicted from the SQL)" if locks_predicted else "### Locks"
+        )
+        locks_details = (
+            heading
+            + "\n"
+            + "\n".join(get_lock_details(table, lock) for table, lock in locks)
         )
     elif locks is None:
         locks_details = "❓ Not checked"
     else:
         locks_details = "This migration does not take any locks"
 
-    sql = "\n".join(queries) if queries else "-- No queries"
-
     warnings_text = "\n\n".join(
         textwrap.indent(
             f"#### {warning.level.emoji} {warning.title}\n{warning.description}",
@@ -183,11 +770,12 @@ def get_migration_md(
         for warning in warnings
     )
 
-    md = f"""
-## {migration.app_label}.{migration.name}
-
-{warnings_text}
+    title = get_title_md(migration, backwards=backwards)
+    yield f"\n## {title}\n\n{warnings_text}\n\n"
 
+    if include_source:
+        source_code = get_source(migration)
+        yield f"""\
 <details>
 <summary>Source code</summary>
 
@@ -197,19 +785,129 @@ def get_migration_md(
 
 </details>
 
-<details>
-<summary>Queries</summary>
+"""
 
-```sql
-{sql}
-```
+    yield "<details>\n<summary>Queries</summary>\n\n```sql\n"
+    yield from iter_sql(queries, max_length=max_sql_length)
+    yield f"\n```\n\n</details>\n\n{locks_details}\n"
 
-</details>
 
-{locks_details}
-"""
+def iter_sql(queries: list[str], *, max_length: int | None = None) -> Iterator[str]:
+    """
+    Get queries separated by newlines. With a max length, long queries are
+    truncated and queries beyond the limit are left out.
+    """
+
+    if not queries:
+        yield "-- No queries"
+        return
+
+    length = 0
+    for index, query in enumerate(queries):
+        if max_length is not None:
+            if len(query) > MAX_QUERY_LENGTH:
+                digest = hashlib.sha1(query.encode()).hexdigest()[:12]
+                query = (
+                    f"{query[:MAX_QUERY_LENGTH]}\n"
+                    f"-- Truncated {len(query)} characters, sha1 {digest}"
+                )
+            if length + len(query) > max_length:
+                query = f"-- {len(queries) - index} more queries, see the full report"
+                yield f"\n{query}" if index else query
+                return
+            length += len(query) + 1
+
+        yield f"\n{query}" if index else query
+
+
+def get_title_md(migration: Migration, *, backwards: bool = False) -> str:
+    title = f"{migration.app_label}.{migration.name}"
+    return f"{title} (backwards)" if backwards else title
+
+
+def get_migration_summary_md(
+    *, migration: Migration, warnings: list[Warning], backwards: bool = False
+) -> str:
+    """
+    Get a short summary of a migration, for when there is no room for details.
+    """
+
+    warnings_text = "".join(f"\n- {warning}" for warning in warnings)
+    return (
+        f"\n## {get_title_md(migration, backwards=backwards)}\n{warnings_text}\n\n"
+        "Details left out to keep this comment short, see the full report.\n"
+    )
+
+
+def get_source(migration: Migration) -> str:
+    """
+    Get the source code of a migration class.
+    """
 
-    return md
+    cls = migration.__class__
+    if (class_source := get_class_source(cls)) is not None:
+        return class_source[2]
+    return inspect.getsource(cls)
+
+
+def get_source_location(migration: Migration) -> tuple[str | None, int]:
+    """
+    Get the file and line a migration class is defined at.
+    """
+
+    cls = migration.__class__
+    if (class_source := get_class_source(cls)) is not None:
+        return class_source[0], class_source[1]
+    try:
+        return inspect.getsourcefile(cls), 1
+    except TypeError:
+        return None, 1
+
+
+def get_class_source(cls: type) -> tuple[str, int, str] | None:
+    """
+    Get the file, line and source code of a top level class.
+    """
+
+    path = getattr(sys.modules.get(cls.__module__), "__file__", None)
+    if not path or not path.endswith(".py"):
+        return None
+
+    try:
+        # Include the modification time, so edited files are read again
+        sources = get_class_sources(path, os.stat(path).st_mtime_ns)
+    except (OSError, SyntaxError, UnicodeDecodeError):
+        return None
+
+    if cls.__qualname__ not in sources:
+        return None
+    line, source = sources[cls.__qualname__]
+    return path, line, source
+
+
+@functools.lru_cache(maxsize=None)
+def get_class_sources(path: str, mtime: int) -> dict[str, tuple[int, str]]:
+    """
+    Get the line and source code of the top level classes in a file, reading
+    and parsing the file only once. inspect.getsource re-reads and tokenizes
+    the whole file for every class it is called for.
+    """
+
+    with tokenize.open(path) as f:
+        source = f.read()
+
+    lines = source.splitlines(keepends=True)
+    sources = {}
+    for node in ast.parse(source, filename=path).body:
+        if isinstance(node, ast.ClassDef):
+            start = min(
+                [node.lineno] + [decorator.lineno for decorator in node.decorator_list]
+            )
+            sources[node.name] = (
+                node.lineno,
+                "".join(lines[start - 1 : node.end_lineno]),
+            )
+    return sources
 
 
 def get_lock_details(table_name: str, lock_type: str) -> str:
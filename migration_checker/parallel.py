@@ -0,0 +1,96 @@
+"""
+Helpers to split a migration plan into independent parts that can be applied
+in parallel, each against its own clone of the database.
+"""
+
+from django.db import connections
+from django.db.migrations import Migration
+from django.db.migrations.graph import MigrationGraph
+
+from .results import MigrationResult
+
+
+def split_plan(graph: MigrationGraph, plan: list[Migration]) -> list[list[Migration]]:
+    """
+    Split a plan into groups of migrations that do not depend on each other.
+    Migrations in different groups can be applied in any order, while each
+    group keeps the order of the original plan.
+    """
+
+    keys = [(migration.app_label, migration.name) for migration in plan]
+    roots = {key: key for key in keys}
+
+    def find(key: tuple[str, str]) -> tuple[str, str]:
+        while roots[key] != key:
+            roots[key] = roots[roots[key]]
+            key = roots[key]
+        return key
+
+    for key in keys:
+        for parent in graph.node_map[key].parents:
+            # Dependencies that are not part of the plan are already applied
+            if parent.key in roots:
+                roots[find(parent.key)] = find(key)
+
+    groups: dict[tuple[str, str], list[Migration]] = {}
+    for key, migration in zip(keys, plan):
+        groups.setdefault(find(key), []).append(migration)
+    return list(groups.values())
+
+
+def partition_plan(
+    graph: MigrationGraph, plan: list[Migration], num_parts: int
+) -> list[list[Migration]]:
+    """
+    Partition a plan into at most num_parts parts of roughly equal size,
+    without splitting any group of dependent migrations.
+    """
+
+    parts: list[list[Migration]] = [[] for _ in range(num_parts)]
+    groups = sorted(split_plan(graph, plan), key=len, reverse=True)
+    for group in groups:
+        min(parts, key=len).extend(group)
+
+    # Keep migrations within each part in plan order
+    position = {id(migration): index for index, migration in enumerate(plan)}
+    return [
+        sorted(part, key=lambda migration: position[id(migration)])
+        for part in parts
+        if part
+    ]
+
+
+def check_in_clone(
+    *,
+    database: str,
+    database_name: str,
+    keys: list[tuple[str, str]],
+    lock_timeline: bool = False,
+    max_bloat: float | None = None,
+) -> list[MigrationResult]:
+    """
+    Entrypoint for worker processes. Check and apply the given migrations in
+    a cloned database.
+    """
+
+    import django
+    from django.conf import settings
+
+    from .executor import Executor
+
+    django.setup()
+
+    settings.DATABASES[database]["NAME"] = database_name
+    connections[database].settings_dict["NAME"] = database_name
+
+    executor = Executor(
+        database=database,
+        apply_migrations=True,
+        outputs=[],
+        lock_timeline=lock_timeline,
+        max_bloat=max_bloat,
+    )
+    try:
+        return list(executor.check_migrations(keys))
+    finally:
+        connections[database].close()
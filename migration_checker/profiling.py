@@ -0,0 +1,204 @@
+"""
+Helpers to time where the checker spends its time, like setting up Django,
+loading migrations and importing modules.
+"""
+
+import contextlib
+import importlib.abc
+import json
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass
+from importlib.machinery import ModuleSpec
+from types import ModuleType
+from typing import Any, Iterator, Sequence
+
+
+@dataclass
+class Timing:
+    name: str
+    category: str
+    start: float
+    duration: float = 0.0
+    depth: int = 0
+
+
+@dataclass
+class ImportTiming:
+    module: str
+    start: float
+    cumulative: float = 0.0
+    self_time: float = 0.0
+    depth: int = 0
+
+
+class Profiler:
+    """
+    Record how long each phase of a run takes. Phases can be nested.
+    """
+
+    def __init__(self) -> None:
+        self.origin = time.perf_counter()
+        self.phases: list[Timing] = []
+        self.imports: list[ImportTiming] = []
+        # Total time of things done many times, like running each check
+        self.totals: dict[str, float] = {}
+        self.depth = 0
+
+    @contextlib.contextmanager
+    def phase(self, name: str, category: str = "phase") -> Iterator[None]:
+        timing = Timing(
+            name=name,
+            category=category,
+            start=time.perf_counter() - self.origin,
+            depth=self.depth,
+        )
+        self.phases.append(timing)
+        self.depth += 1
+        try:
+            yield
+        finally:
+            self.depth -= 1
+            timing.duration = time.perf_counter() - self.origin - timing.start
+
+    def add_total(self, name: str, duration: float) -> None:
+        self.totals[name] = self.totals.get(name, 0.0) + duration
+
+    def get_slowest(self, prefix: str, count: int = 5) -> list[tuple[str, float]]:
+        return sorted(
+            (
+                (name.removeprefix(prefix), duration)
+                for name, duration in self.totals.items()
+                if name.startswith(prefix)
+            ),
+            key=lambda item: -item[1],
+        )[:count]
+
+    @contextlib.contextmanager
+    def time_imports(self) -> Iterator[None]:
+        """
+        Record the time spent executing each module imported in the block,
+        like python -X importtime does.
+        """
+
+        timer = ImportTimer(self)
+        sys.meta_path.insert(0, timer)
+        try:
+            yield
+        finally:
+            sys.meta_path.remove(timer)
+
+    def get_report(self) -> dict[str, Any]:
+        return {
+            "phases": [asdict(timing) for timing in self.phases],
+            "imports": [asdict(timing) for timing in self.imports],
+            "totals": dict(
+                sorted(self.totals.items(), key=lambda item: -item[1]),
+            ),
+        }
+
+    def get_trace_events(self) -> dict[str, Any]:
+        """
+        Get timings in the Chrome trace event format, which can be opened in
+        chrome://tracing or https://ui.perfetto.dev.
+        """
+
+        pid = os.getpid()
+        events = [
+            {
+                "name": timing.name,
+                "cat": timing.category,
+                "ph": "X",
+                "ts": timing.start * 1_000_000,
+                "dur": timing.duration * 1_000_000,
+                "pid": pid,
+                "tid": 0,
+            }
+            for timing in self.phases
+        ] + [
+            {
+                "name": timing.module,
+                "cat": "import",
+                "ph": "X",
+                "ts": timing.start * 1_000_000,
+                "dur": timing.cumulative * 1_000_000,
+                "pid": pid,
+                "tid": 0,
+                "args": {"self_us": timing.self_time * 1_000_000},
+            }
+            for timing in self.imports
+        ]
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_report(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.get_report(), f, indent=2)
+
+    def write_trace(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.get_trace_events(), f)
+
+
+class ImportTimer(importlib.abc.MetaPathFinder):
+    """
+    Meta path finder that wraps the loaders found by the other finders, to
+    time how long it takes to execute each module.
+    """
+
+    def __init__(self, profiler: Profiler) -> None:
+        self.profiler = profiler
+        self.stack: list[ImportTiming] = []
+
+    def find_spec(
+        self,
+        fullname: str,
+        path: Sequence[str] | None,
+        target: ModuleType | None = None,
+    ) -> ModuleSpec | None:
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = TimedLoader(spec.loader, timer=self)
+                return spec
+        return None
+
+    @contextlib.contextmanager
+    def time_module(self, name: str) -> Iterator[None]:
+        profiler = self.profiler
+        timing = ImportTiming(
+            module=name,
+            start=time.perf_counter() - profiler.origin,
+            depth=len(self.stack),
+        )
+        profiler.imports.append(timing)
+        self.stack.append(timing)
+        try:
+            yield
+        finally:
+            self.stack.pop()
+            timing.cumulative = time.perf_counter() - profiler.origin - timing.start
+            timing.self_time += timing.cumulative
+            if self.stack:
+                self.stack[-1].self_time -= timing.cumulative
+
+
+class TimedLoader(importlib.abc.Loader):
+    def __init__(self, loader: Any, *, timer: ImportTimer) -> None:
+        self.loader = loader
+        self.timer = timer
+
+    def create_module(self, spec: ModuleSpec) -> ModuleType | None:
+        module: ModuleType | None = self.loader.create_module(spec)
+        return module
+
+    def exec_module(self, module: ModuleType) -> None:
+        # Hide the wrapper from the module, so nothing else depends on it
+        module.__loader__ = self.loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self.loader
+        with self.timer.time_module(module.__name__):
+            self.loader.exec_module(module)
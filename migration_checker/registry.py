@@ -0,0 +1,145 @@
+"""
+Registry of the checks to run. Besides the built-in checks, other packages can
+provide checks using the "migration_checker.checks" entry point group:
+
+    [project.entry-points."migration_checker.checks"]
+    my_check = "my_package.checks:check_something"
+
+Checks are enabled, disabled and configured in pyproject.toml:
+
+    [tool.migration_checker]
+    disable = ["remove_field"]
+
+    [tool.migration_checker.checks.my_check]
+    max_rows = 1000
+
+Options for a check are passed to it as extra keyword arguments.
+"""
+
+import functools
+import os
+import sys
+import time
+from importlib.metadata import EntryPoint, entry_points
+from typing import Any
+
+from django.db.migrations import Migration
+from django.db.migrations.state import ProjectState
+
+from .checks import ALL_CHECKS, Check
+from .profiling import Profiler
+from .warnings import Warning
+
+if sys.version_info >= (3, 11):
+    import tomllib
+else:
+    try:
+        import tomli as tomllib
+    except ImportError:
+        tomllib = None
+
+ENTRY_POINT_GROUP = "migration_checker.checks"
+
+BUILTIN_CHECKS: dict[str, Check] = {
+    check.__name__.removeprefix("check_"): check  # type: ignore[attr-defined]
+    for check in ALL_CHECKS
+}
+
+
+class CheckRegistry:
+    def __init__(
+        self,
+        *,
+        enable: list[str] | None = None,
+        disable: list[str] | None = None,
+        options: dict[str, dict[str, Any]] | None = None,
+    ) -> None:
+        # Entry points are only listed here, the checks are imported when
+        # they are first used.
+        self.entry_points: dict[str, EntryPoint] = {
+            entry_point.name: entry_point
+            for entry_point in entry_points(group=ENTRY_POINT_GROUP)
+        }
+        self.options = options or {}
+
+        names = list(BUILTIN_CHECKS) + [
+            name for name in self.entry_points if name not in BUILTIN_CHECKS
+        ]
+        for name in [*(enable or ()), *(disable or ()), *self.options]:
+            if name not in names:
+                raise ValueError(f"Unknown check {name!r}, available: {names}")
+
+        self.enabled = [
+            name
+            for name in names
+            if (enable is None or name in enable) and name not in (disable or ())
+        ]
+        self.loaded: dict[str, Check] = {}
+
+    def get_check(self, name: str) -> Check:
+        if name not in self.loaded:
+            check = (
+                BUILTIN_CHECKS[name]
+                if name in BUILTIN_CHECKS
+                else self.entry_points[name].load()
+            )
+            if options := self.options.get(name):
+                check = functools.partial(check, **options)
+            self.loaded[name] = check
+        return self.loaded[name]
+
+    def run(
+        self,
+        migration: Migration,
+        state: ProjectState,
+        *,
+        profiler: Profiler | None = None,
+    ) -> list[Warning]:
+        warnings: list[Warning] = []
+        for name in self.enabled:
+            check = self.get_check(name)
+            start = time.perf_counter()
+            warnings.extend(check(migration=migration, state=state))
+            if profiler:
+                profiler.add_total(f"check {name}", time.perf_counter() - start)
+        return warnings
+
+
+def load_config(path: str = "pyproject.toml") -> dict[str, Any]:
+    """
+    Get the [tool.migration_checker] section of pyproject.toml.
+    """
+
+    if not os.path.exists(path):
+        return {}
+
+    with open(path, "rb") as f:
+        content = f.read()
+    if tomllib is None:
+        # Without a parser, only projects that look configured are told
+        if b"migration_checker" in content:
+            print(
+                f"Ignoring the configuration in {path}, "
+                "reading it requires tomli on Python < 3.11",
+                file=sys.stderr,
+            )
+        return {}
+
+    config = tomllib.loads(content.decode())
+    section = config.get("tool", {}).get("migration_checker", {})
+    assert isinstance(section, dict)
+    return section
+
+
+@functools.lru_cache(maxsize=None)
+def get_registry() -> CheckRegistry:
+    """
+    Get the registry configured by pyproject.toml in the current directory.
+    """
+
+    config = load_config()
+    return CheckRegistry(
+        enable=config.get("enable"),
+        disable=config.get("disable"),
+        options=config.get("checks"),
+    )
@@ -0,0 +1,193 @@
+"""
+Check that code from before the migrations keeps working against the new
+schema, as it does during a rolling deploy. Queries issued by the old code are
+recorded to a corpus, e.g. while the test suite of the base branch runs:
+
+    @pytest.fixture(autouse=True, scope="session")
+    def record_queries(django_db_setup):
+        with record_corpus("queries.jsonl"):
+            yield
+
+After each migration is applied, the corpus is replayed in a transaction that
+is rolled back, and queries that start failing or get much slower are
+reported.
+"""
+
+import contextlib
+import dataclasses
+import json
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Iterator
+
+from django.db import DatabaseError, connections, transaction
+from django.db.backends.base.base import BaseDatabaseWrapper
+
+from .results import get_query_fingerprint
+from .warnings import OLD_QUERIES_FAIL, OLD_QUERIES_SLOWER, Warning
+
+# Only queries reading and writing data are replayed
+REPLAYED_STATEMENTS = ("SELECT", "INSERT", "UPDATE", "DELETE", "WITH")
+
+# Queries listed in a warning, to keep it readable
+MAX_LISTED_QUERIES = 10
+
+
+class CorpusRecorder:
+    """
+    Execute wrapper appending each distinct query to a corpus file.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.fingerprints = {
+            get_query_fingerprint(query) for query in read_corpus(path)
+        }
+
+    def __call__(
+        self,
+        execute: Callable[[str, list[Any], bool, dict[str, Any]], Any],
+        sql: str,
+        params: list[Any],
+        many: bool,
+        context: dict[str, Any],
+    ) -> Any:
+        result = execute(sql, params, many, context)
+        if many or not sql.lstrip().upper().startswith(REPLAYED_STATEMENTS):
+            return result
+
+        mogrify_result = context["cursor"].mogrify(sql, params)
+        query: str = (
+            mogrify_result
+            if isinstance(mogrify_result, str)
+            else mogrify_result.decode()
+        )
+        fingerprint = get_query_fingerprint(query)
+        if fingerprint not in self.fingerprints:
+            self.fingerprints.add(fingerprint)
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"sql": query}) + "\n")
+        return result
+
+
+@contextlib.contextmanager
+def record_corpus(path: str, *, database: str = "default") -> Iterator[None]:
+    """
+    Record queries run on the database connection to a corpus file.
+    """
+
+    with connections[database].execute_wrapper(CorpusRecorder(path)):
+        yield
+
+
+def read_corpus(path: str) -> list[str]:
+    try:
+        with open(path) as f:
+            return [json.loads(line)["sql"] for line in f if line.strip()]
+    except FileNotFoundError:
+        return []
+
+
+@dataclass
+class ReplayResult:
+    error: str | None
+    duration: float
+
+
+class Replayer:
+    """
+    Replay a corpus of queries and compare the results with the first replay,
+    made before any migrations are applied.
+    """
+
+    def __init__(
+        self,
+        *,
+        connection: BaseDatabaseWrapper,
+        queries: list[str],
+        slowdown: float = 5.0,
+        min_slowdown: float = 0.05,
+        timeout: float = 5.0,
+    ) -> None:
+        self.connection = connection
+        self.queries = queries
+        # Queries are only reported as slower if they take both this many
+        # times longer and this many more seconds than before.
+        self.slowdown = slowdown
+        self.min_slowdown = min_slowdown
+        self.timeout = timeout
+        self.baseline: list[ReplayResult] | None = None
+        # Queries that already failed are not reported again
+        self.failed: set[int] = set()
+
+    def replay(self) -> list[ReplayResult]:
+        results = []
+        with transaction.atomic(using=self.connection.alias):
+            with self.connection.cursor() as cursor:
+                cursor.execute(
+                    f"SET LOCAL statement_timeout = {int(self.timeout * 1000)}"
+                )
+                for query in self.queries:
+                    start = time.perf_counter()
+                    try:
+                        with transaction.atomic(using=self.connection.alias):
+                            cursor.execute(query)
+                            # Undo writes, while keeping the transaction usable
+                            transaction.set_rollback(True, using=self.connection.alias)
+                        error = None
+                    except DatabaseError as e:
+                        error = str(e).strip()
+                    results.append(
+                        ReplayResult(error=error, duration=time.perf_counter() - start)
+                    )
+            transaction.set_rollback(True, using=self.connection.alias)
+        return results
+
+    def record_baseline(self) -> None:
+        self.baseline = self.replay()
+        self.failed = {
+            index for index, result in enumerate(self.baseline) if result.error
+        }
+
+    def check(self) -> list[Warning]:
+        """
+        Replay the queries, and get warnings for queries that started failing
+        or got slower since the baseline.
+        """
+
+        assert self.baseline is not None, "record_baseline must be called first"
+
+        failures = []
+        slower = []
+        for index, (query, before, after) in enumerate(
+            zip(self.queries, self.baseline, self.replay())
+        ):
+            if index in self.failed:
+                continue
+            if after.error:
+                self.failed.add(index)
+                failures.append(f"{query}\n-- {after.error}")
+            elif (
+                after.duration > before.duration * self.slowdown
+                and after.duration - before.duration > self.min_slowdown
+            ):
+                slower.append(
+                    f"{query}\n-- {before.duration * 1000:.0f} ms -> "
+                    f"{after.duration * 1000:.0f} ms"
+                )
+
+        warnings = []
+        if failures:
+            warnings.append(get_warning(OLD_QUERIES_FAIL, failures))
+        if slower:
+            warnings.append(get_warning(OLD_QUERIES_SLOWER, slower))
+        return warnings
+
+
+def get_warning(warning: Warning, queries: list[str]) -> Warning:
+    listed = "\n\n".join(queries[:MAX_LISTED_QUERIES])
+    if len(queries) > MAX_LISTED_QUERIES:
+        listed += f"\n\n-- {len(queries) - MAX_LISTED_QUERIES} more queries"
+    return dataclasses.replace(
+        warning, description=f"{warning.description}\n\n```sql\n{listed}\n```"
+    )
@@ -0,0 +1,161 @@
+"""
+Results recorded for each checked migration
+"""
+
+import hashlib
+import json
+import re
+from dataclasses import asdict, dataclass, field
+from typing import Any
+
+from .warnings import Level, Warning
+
+
+@dataclass
+class QueryTiming:
+    # Seconds since the migration started being applied
+    start: float
+    duration: float = 0.0
+    # Locks held after the query, if locks were checked after each query
+    locks: list[tuple[str, str]] | None = None
+
+
+@dataclass
+class BatchTiming:
+    # Seconds since the migration started being applied
+    start: float
+    rows: int
+    # Seconds the transaction of the batch held its locks
+    duration: float = 0.0
+    # Locks held by the batch before it committed
+    locks: list[tuple[str, str]] | None = None
+
+
+@dataclass
+class TableBloat:
+    table: str
+    # Live tuples before the migration
+    live_tuples: int
+    dead_tuples: int
+    updated_tuples: int
+    # Bytes on disk, including indexes and TOAST, before and after
+    size_before: int
+    size_after: int
+    # Bytes on disk of the table and its TOAST table, without indexes
+    table_size_before: int = 0
+    table_size_after: int = 0
+
+
+@dataclass
+class MigrationResult:
+    app_label: str
+    name: str
+    queries: list[str] = field(default_factory=list)
+    locks: list[tuple[str, str]] | None = None
+    warnings: list[Warning] = field(default_factory=list)
+    # Seconds spent checking, and applying, the migration
+    duration: float | None = None
+    # Bytes written to the write-ahead log while applying the migration
+    wal_bytes: int | None = None
+    # Timing of each query, in the same order as the queries
+    timings: list[QueryTiming] = field(default_factory=list)
+    # Whether the locks were predicted from the SQL instead of checked in the
+    # database
+    locks_predicted: bool = False
+    # Whether this is the result of unapplying the migration
+    backwards: bool = False
+    # Timing of each batch of RunPythonInBatches operations
+    batches: list[BatchTiming] = field(default_factory=list)
+    # Dead tuples and growth of tables changed by the migration, if measured
+    bloat: list[TableBloat] | None = None
+
+    @property
+    def key(self) -> tuple[str, str]:
+        return self.app_label, self.name
+
+    @property
+    def title(self) -> str:
+        title = f"{self.app_label}.{self.name}"
+        return f"{title} (backwards)" if self.backwards else title
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "MigrationResult":
+        return cls(
+            app_label=data["app_label"],
+            name=data["name"],
+            queries=data["queries"],
+            locks=(
+                [(table, lock) for table, lock in data["locks"]]
+                if data["locks"] is not None
+                else None
+            ),
+            warnings=[
+                Warning(
+                    level=Level(warning["level"]),  # type: ignore[call-arg]
+                    title=warning["title"],
+                    description=warning["description"],
+                )
+                for warning in data["warnings"]
+            ],
+            duration=data.get("duration"),
+            wal_bytes=data.get("wal_bytes"),
+            timings=[
+                QueryTiming(
+                    start=timing["start"],
+                    duration=timing["duration"],
+                    locks=(
+                        [(table, lock) for table, lock in timing["locks"]]
+                        if timing["locks"] is not None
+                        else None
+                    ),
+                )
+                for timing in data.get("timings", [])
+            ],
+            locks_predicted=data.get("locks_predicted", False),
+            backwards=data.get("backwards", False),
+            batches=[
+                BatchTiming(
+                    start=batch["start"],
+                    rows=batch["rows"],
+                    duration=batch["duration"],
+                    locks=(
+                        [(table, lock) for table, lock in batch["locks"]]
+                        if batch["locks"] is not None
+                        else None
+                    ),
+                )
+                for batch in data.get("batches", [])
+            ],
+            bloat=(
+                [TableBloat(**table) for table in data["bloat"]]
+                if data.get("bloat") is not None
+                else None
+            ),
+        )
+
+
+def get_query_fingerprint(query: str) -> str:
+    """
+    Get a short hash of a query with literals replaced, so the same statement
+    can be recognized across runs and projects.
+    """
+
+    normalized = re.sub(r"'(?:[^']|'')*'", "?", query)
+    normalized = re.sub(r"\b\d+(?:\.\d+)?\b", "?", normalized)
+    normalized = " ".join(normalized.split())
+    return hashlib.sha1(normalized.encode()).hexdigest()[:16]
+
+
+def write_results(path: str, results: list[MigrationResult]) -> None:
+    with open(path, "w") as f:
+        json.dump({"results": [result.to_dict() for result in results]}, f)
+
+
+def read_results(path: str) -> list[MigrationResult]:
+    with open(path, "r") as f:
+        data = json.load(f)
+    assert isinstance(data, dict)
+    return [MigrationResult.from_dict(result) for result in data["results"]]
@@ -0,0 +1,213 @@
+"""
+Rules for what Postgres has to do when a column is altered. Some changes only
+update the catalog, while others build an index, scan the table to validate
+it, or rewrite the whole table.
+
+This module does not depend on Django, so the same rules are used by the
+checks and by the linter.
+"""
+
+import re
+from dataclasses import dataclass
+from enum import Enum
+from typing import Iterable, Iterator
+
+from .warnings import (
+    ALTER_FIELD,
+    ALTER_FIELD_ADDS_INDEX,
+    ALTER_FIELD_VALIDATES_TABLE,
+    Warning,
+    with_details,
+)
+
+
+class Impact(str, Enum):
+    # Only the catalog is updated, which is fast
+    METADATA = "metadata"
+    # An index is built, which reads the whole table
+    INDEX_BUILD = "index build"
+    # The table is scanned to check that all rows are valid
+    VALIDATION_SCAN = "validation scan"
+    # The table and its indexes are rewritten
+    REWRITE = "rewrite"
+
+
+IMPACT_WARNINGS = {
+    Impact.INDEX_BUILD: ALTER_FIELD_ADDS_INDEX,
+    Impact.VALIDATION_SCAN: ALTER_FIELD_VALIDATES_TABLE,
+    Impact.REWRITE: ALTER_FIELD,
+}
+
+
+@dataclass(frozen=True)
+class Column:
+    """
+    The parts of a field that matter to the database.
+    """
+
+    db_type: str | None
+    null: bool = False
+    unique: bool = False
+    indexed: bool = False
+    check: bool = False
+    foreign_key: bool = False
+    collation: str | None = None
+
+
+@dataclass(frozen=True)
+class ColumnChange:
+    description: str
+    impact: Impact
+    lock: str
+
+
+TYPE_PATTERN = re.compile(r"^([a-z ]+?)\s*(?:\((\d+)(?:,\s*(\d+))?\))?$")
+
+TYPE_ALIASES = {
+    "character varying": "varchar",
+    "decimal": "numeric",
+}
+
+
+def parse_type(db_type: str) -> tuple[str, list[int]]:
+    """
+    Split a type into its name and modifiers, e.g. varchar(10) into
+    ("varchar", [10]).
+    """
+
+    match = TYPE_PATTERN.match(db_type.lower().strip())
+    if not match:
+        return db_type, []
+    name = TYPE_ALIASES.get(match.group(1), match.group(1))
+    return name, [int(value) for value in match.group(2, 3) if value is not None]
+
+
+def get_type_change_impact(old_type: str, new_type: str) -> Impact:
+    """
+    Changing the type of a column rewrites the table, unless the old type is
+    binary coercible to the new one and all existing values still fit.
+    """
+
+    old_name, old_modifiers = parse_type(old_type)
+    new_name, new_modifiers = parse_type(new_type)
+
+    if (old_name, old_modifiers) == (new_name, new_modifiers):
+        return Impact.METADATA
+
+    # Increasing the length of a varchar, or removing the limit
+    if old_name in ("varchar", "text") and (
+        new_name == "text" or (new_name == "varchar" and not new_modifiers)
+    ):
+        return Impact.METADATA
+    if old_name == new_name == "varchar" and old_modifiers:
+        return (
+            Impact.METADATA if new_modifiers[0] >= old_modifiers[0] else Impact.REWRITE
+        )
+
+    # Increasing the precision of a numeric with the same scale
+    if old_name == new_name == "numeric":
+        if not new_modifiers:
+            return Impact.METADATA
+        if (
+            len(old_modifiers) == len(new_modifiers) == 2
+            and new_modifiers[0] >= old_modifiers[0]
+            and new_modifiers[1] == old_modifiers[1]
+        ):
+            return Impact.METADATA
+
+    return Impact.REWRITE
+
+
+def get_column_changes(old: Column, new: Column) -> Iterator[ColumnChange]:
+    if old.db_type != new.db_type and old.db_type and new.db_type:
+        yield ColumnChange(
+            description=f"Changing type from {old.db_type} to {new.db_type}",
+            impact=get_type_change_impact(old.db_type, new.db_type),
+            lock="AccessExclusiveLock",
+        )
+
+    if old.collation != new.collation:
+        # Indexes on the column have to be rebuilt for the new collation
+        yield ColumnChange(
+            description="Changing collation",
+            impact=(
+                Impact.INDEX_BUILD if old.indexed or old.unique else Impact.METADATA
+            ),
+            lock="AccessExclusiveLock",
+        )
+
+    if old.null and not new.null:
+        yield ColumnChange(
+            description="Setting NOT NULL",
+            impact=Impact.VALIDATION_SCAN,
+            lock="AccessExclusiveLock",
+        )
+    elif new.null and not old.null:
+        yield ColumnChange(
+            description="Dropping NOT NULL",
+            impact=Impact.METADATA,
+            lock="AccessExclusiveLock",
+        )
+
+    if new.check and not old.check:
+        yield ColumnChange(
+            description="Adding check constraint",
+            impact=Impact.VALIDATION_SCAN,
+            lock="AccessExclusiveLock",
+        )
+
+    if new.unique and not old.unique:
+        yield ColumnChange(
+            description="Adding unique constraint",
+            impact=Impact.INDEX_BUILD,
+            lock="AccessExclusiveLock",
+        )
+
+    if new.indexed and not old.indexed:
+        yield ColumnChange(
+            description="Adding index",
+            impact=Impact.INDEX_BUILD,
+            lock="ShareLock",
+        )
+
+    if new.foreign_key and not old.foreign_key:
+        yield ColumnChange(
+            description="Adding foreign key constraint",
+            impact=Impact.VALIDATION_SCAN,
+            lock="ShareRowExclusiveLock",
+        )
+
+    removed = [
+        description
+        for description, was_set, is_set in (
+            ("check constraint", old.check, new.check),
+            ("unique constraint", old.unique, new.unique),
+            ("index", old.indexed, new.indexed),
+            ("foreign key constraint", old.foreign_key, new.foreign_key),
+        )
+        if was_set and not is_set
+    ]
+    for description in removed:
+        yield ColumnChange(
+            description=f"Dropping {description}",
+            impact=Impact.METADATA,
+            lock="AccessExclusiveLock",
+        )
+
+
+def get_warnings(changes: Iterable[ColumnChange]) -> list[Warning]:
+    """
+    Get a warning for each kind of impact, listing the changes that have it
+    and the lock each one takes.
+    """
+
+    details: dict[Impact, list[str]] = {}
+    for change in changes:
+        details.setdefault(change.impact, []).append(
+            f"{change.description} ({change.lock})"
+        )
+    return [
+        with_details(warning, details[impact])
+        for impact, warning in IMPACT_WARNINGS.items()
+        if impact in details
+    ]
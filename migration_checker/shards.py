@@ -0,0 +1,60 @@
+"""
+Helpers to merge results from checks that have been split across shards
+"""
+
+import django
+from django.db.migrations.graph import MigrationGraph
+from django.db.migrations.loader import MigrationLoader
+
+from .output import Output
+from .results import MigrationResult, read_results
+
+
+def get_plan_order(graph: MigrationGraph) -> dict[tuple[str, str], int]:
+    """
+    Get the position of each migration in the plan used on a fresh database.
+    Plans on databases with some migrations applied keep the same relative
+    order, so this can be used to order results from any of them.
+    """
+
+    order: dict[tuple[str, str], int] = {}
+    for target in graph.leaf_nodes():
+        for key in graph.forwards_plan(target):
+            order.setdefault(key, len(order))
+    return order
+
+
+def merge_results(*, paths: list[str], outputs: list[Output]) -> None:
+    """
+    Merge result files written by sharded runs and report them as if they
+    were checked in a single run.
+    """
+
+    django.setup()
+
+    # The migration files are all we need, so don't connect to the database
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    order = get_plan_order(loader.graph)
+
+    results: list[MigrationResult] = [
+        result for path in paths for result in read_results(path)
+    ]
+    results.sort(key=lambda result: order.get(result.key, len(order)))
+
+    if not results:
+        for output in outputs:
+            output.no_migrations_to_apply()
+        return
+
+    for output in outputs:
+        output.begin(
+            num_migrations=len(results), keys=[result.key for result in results]
+        )
+
+    for result in results:
+        migration = loader.graph.nodes[result.key]
+        for output in outputs:
+            output.migration_result(migration=migration, result=result)
+
+    for output in outputs:
+        output.done()
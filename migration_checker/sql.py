@@ -0,0 +1,171 @@
+"""
+A fast scanner for the keywords of SQL statements, used to find statements
+that can't run in a transaction and to split queries into statements.
+Migrations may load SQL files of several megabytes, which sqlparse takes
+seconds to parse, so this only finds the keywords outside of comments, strings
+and parentheses in a single pass.
+"""
+
+import hashlib
+import re
+from typing import Iterator
+
+import sqlparse
+
+TOKEN_PATTERN = re.compile(
+    r"""
+    (?P<comment>--[^\n]*|/\*.*?\*/)
+    | (?P<string>[eE]'(?:[^'\\]|\\.|'')*'|'(?:[^']|'')*'|"(?:[^"]|"")*")
+    | (?P<dollar>\$(?P<tag>(?:[A-Za-z_]\w*)?)\$.*?\$(?P=tag)\$)
+    | (?P<word>[A-Za-z_][\w$]*)
+    | (?P<punctuation>[;()])
+    | (?P<unterminated>/\*|['"]|\$(?:[A-Za-z_][\w]*)?\$)
+    """,
+    re.DOTALL | re.VERBOSE,
+)
+
+# Only these keywords are needed to tell if a statement must be non-atomic
+KEYWORDS = frozenset(
+    {
+        "ADD",
+        "ALTER",
+        "CONCURRENTLY",
+        "CREATE",
+        "DROP",
+        "INDEX",
+        "REINDEX",
+        "TYPE",
+        "VACUUM",
+        "VALUE",
+    }
+)
+
+
+class UnterminatedError(ValueError):
+    pass
+
+
+def iter_statement_keywords(sql: str) -> Iterator[tuple[str, set[str]]]:
+    """
+    Get the first word of each statement, and the keywords of interest found
+    outside of parentheses in it.
+    """
+
+    first_word = ""
+    keywords: set[str] = set()
+    depth = 0
+    for match in TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        if kind == "word":
+            if depth:
+                continue
+            word = match.group().upper()
+            if not first_word:
+                first_word = word
+            if word in KEYWORDS:
+                keywords.add(word)
+        elif kind == "punctuation":
+            char = match.group()
+            if char == "(":
+                depth += 1
+            elif char == ")":
+                depth = max(depth - 1, 0)
+            else:
+                if first_word:
+                    yield first_word, keywords
+                first_word, keywords, depth = "", set(), 0
+        elif kind == "unterminated":
+            raise UnterminatedError(f"Unterminated {match.group()!r} in SQL")
+
+    if first_word:
+        yield first_word, keywords
+
+
+def split_statements(sql: str) -> list[str]:
+    """
+    Split a query into statements, without the comments before each one.
+    Falls back to sqlparse for SQL the scanner can't tokenize.
+    """
+
+    statements = []
+    start = None
+    for match in TOKEN_PATTERN.finditer(sql):
+        kind = match.lastgroup
+        if kind == "comment":
+            continue
+        if kind == "unterminated":
+            return [str(statement) for statement in sqlparse.split(sql)]
+        if kind == "punctuation" and match.group() == ";":
+            if start is not None:
+                statements.append(sql[start : match.end()])
+            start = None
+        elif start is None:
+            start = match.start()
+
+    if start is not None:
+        statements.append(sql[start:].strip())
+    return statements
+
+
+def is_non_atomic_statement(first_word: str, keywords: set[str]) -> bool:
+    if "CONCURRENTLY" in keywords and (
+        {"CREATE", "INDEX"} <= keywords
+        or {"DROP", "INDEX"} <= keywords
+        or first_word == "REINDEX"
+    ):
+        return True
+    if first_word == "VACUUM":
+        return True
+    # New enum values can't be used in the transaction that adds them
+    return first_word == "ALTER" and {"TYPE", "ADD", "VALUE"} <= keywords
+
+
+def must_be_non_atomic_sqlparse(sql: str) -> bool:
+    """
+    Check if a query must be non-atomic using sqlparse, which is slow on large
+    queries but copes with SQL the scanner can't.
+    """
+
+    patterns = [
+        [
+            (sqlparse.tokens.DDL, "CREATE"),
+            (sqlparse.tokens.Keyword, "INDEX"),
+            (sqlparse.tokens.Keyword, "CONCURRENTLY"),
+        ],
+        [
+            (sqlparse.tokens.DDL, "DROP"),
+            (sqlparse.tokens.Keyword, "INDEX"),
+            (sqlparse.tokens.Keyword, "CONCURRENTLY"),
+        ],
+    ]
+
+    for statement in sqlparse.parse(sql):
+        for pattern in patterns:
+            if all(
+                any(token.match(ttype, value) for token in statement.tokens)
+                for ttype, value in pattern
+            ):
+                return True
+    return False
+
+
+# Results by the hash of the SQL, so large queries aren't kept in memory
+_cache: dict[bytes, bool] = {}
+
+
+def must_be_non_atomic(sql: str) -> bool:
+    """
+    Check if any statement in a query can't run in a transaction, like
+    CREATE INDEX CONCURRENTLY.
+    """
+
+    key = hashlib.sha1(sql.encode()).digest()
+    if key not in _cache:
+        try:
+            _cache[key] = any(
+                is_non_atomic_statement(first_word, keywords)
+                for first_word, keywords in iter_statement_keywords(sql)
+            )
+        except UnterminatedError:
+            _cache[key] = must_be_non_atomic_sqlparse(sql)
+    return _cache[key]
@@ -0,0 +1,170 @@
+"""
+Output a self-contained HTML timeline of the queries run by each migration and
+the locks they take, to show where long exclusive locks overlap slow queries.
+"""
+
+import html
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Sequence, TextIO
+
+from .output import MAX_QUERY_LENGTH
+from .results import MigrationResult
+
+if TYPE_CHECKING:
+    from django.db.migrations import Migration
+
+# Lock modes from weakest to strongest. Stronger locks conflict with more
+# queries, so they are shown in more alarming colors.
+LOCK_COLORS = {
+    "AccessShareLock": "#9e9e9e",
+    "RowShareLock": "#9e9e9e",
+    "RowExclusiveLock": "#fbc02d",
+    "ShareUpdateExclusiveLock": "#fbc02d",
+    "ShareLock": "#f57c00",
+    "ShareRowExclusiveLock": "#f57c00",
+    "ExclusiveLock": "#d32f2f",
+    "AccessExclusiveLock": "#b71c1c",
+}
+
+STYLE = """
+body { font-family: sans-serif; margin: 2em; }
+section { margin-bottom: 2em; }
+.row { display: flex; align-items: center; height: 1.4em; }
+.label {
+    width: 30em; flex-shrink: 0; overflow: hidden; white-space: nowrap;
+    text-overflow: ellipsis; font-family: monospace; font-size: 0.8em;
+}
+.track { position: relative; flex-grow: 1; height: 1em; background: #f5f5f5; }
+.bar { position: absolute; height: 100%; min-width: 1px; }
+.query { background: #1976d2; }
+.unknown { opacity: 0.4; }
+"""
+
+
+@dataclass
+class Bar:
+    label: str
+    title: str
+    start: float
+    end: float
+    css_class: str
+    color: str | None = None
+
+
+class TimelineOutput:
+    """
+    Write an HTML timeline with a section for each migration.
+    """
+
+    def __init__(self, *, path: str) -> None:
+        self.path = path
+        self.file: TextIO | None = None
+
+    def no_migrations_to_apply(self) -> None:
+        self.begin(0)
+        self.done()
+
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        self.file = open(self.path, "w")
+        self.file.write(
+            "<!DOCTYPE html>\n<html>\n<head>\n<meta charset='utf-8'>\n"
+            f"<title>Migration timeline</title>\n<style>{STYLE}</style>\n"
+            "</head>\n<body>\n<h1>Migration timeline</h1>\n"
+        )
+
+    def migration_result(self, migration: "Migration", result: MigrationResult) -> None:
+        assert self.file, "begin must be called first"
+        self.file.write(get_migration_html(result))
+        self.file.flush()
+
+    def done(self) -> None:
+        if self.file:
+            self.file.write("</body>\n</html>\n")
+            self.file.close()
+
+
+def get_bars(result: MigrationResult) -> list[Bar]:
+    """
+    Get a bar for each query, and for each lock from the query that took it
+    until the end of the migration, as locks are held until the transaction
+    commits.
+    """
+
+    end = max((timing.start + timing.duration for timing in result.timings), default=0)
+    bars = [
+        Bar(
+            label=query[:100],
+            title=query[:MAX_QUERY_LENGTH],
+            start=timing.start,
+            end=timing.start + timing.duration,
+            css_class="query",
+        )
+        for query, timing in zip(result.queries, result.timings)
+    ]
+
+    taken: dict[tuple[str, str], float] = {}
+    for timing in result.timings:
+        for lock in timing.locks or ():
+            taken.setdefault(lock, timing.start)
+
+    for (table, mode), start in taken.items():
+        bars.append(
+            Bar(
+                label=f"🔒 {table} {mode}",
+                title=f"{mode} on {table}",
+                start=start,
+                end=end,
+                css_class="lock",
+                color=LOCK_COLORS.get(mode),
+            )
+        )
+
+    # Without a lock timeline we only know which locks were held at the end
+    if not taken:
+        for table, mode in result.locks or ():
+            bars.append(
+                Bar(
+                    label=f"🔒 {table} {mode}",
+                    title=f"{mode} on {table}, taken at an unknown time",
+                    start=0,
+                    end=end,
+                    css_class="lock unknown",
+                    color=LOCK_COLORS.get(mode),
+                )
+            )
+
+    return bars
+
+
+def get_migration_html(result: MigrationResult) -> str:
+    bars = get_bars(result)
+    end = max((bar.end for bar in bars), default=0) or 1
+
+    rows = []
+    for bar in bars:
+        left = bar.start / end * 100
+        width = (bar.end - bar.start) / end * 100
+        color = f" background: {bar.color};" if bar.color else ""
+        milliseconds = (bar.end - bar.start) * 1000
+        rows.append(
+            "<div class='row'>"
+            f"<div class='label' title='{html.escape(bar.title)}'>"
+            f"{html.escape(bar.label)}</div>"
+            "<div class='track'>"
+            f"<div class='bar {bar.css_class}' "
+            f"style='left: {left:.3f}%; width: {width:.3f}%;{color}' "
+            f"title='{html.escape(bar.title)} ({milliseconds:.1f} ms)'></div>"
+            "</div></div>"
+        )
+
+    duration = f"{result.duration * 1000:.0f} ms" if result.duration else "?"
+    summary = (
+        f"{len(result.queries)} queries, {duration}"
+        if result.timings
+        else "Not applied"
+    )
+    return (
+        f"<section>\n<h2>{html.escape(result.title)}</h2>\n<p>{summary}</p>\n"
+        + "\n".join(rows)
+        + "\n</section>\n"
+    )
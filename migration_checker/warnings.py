@@ -1,3 +1,4 @@
+import dataclasses
 from dataclasses import dataclass
 from enum import Enum
 
@@ -172,3 +173,139 @@ ALTER_FIELD = Warning(
         "writes from old code."
     ),
 )
+
+ALTER_FIELD_ADDS_INDEX = Warning(
+    level=Level.WARNING,
+    title="Adding an index to an existing column",
+    description=(
+        "This migration adds an index or a unique constraint to an existing "
+        "column. Writes to the table are blocked while the index is built, "
+        "which can take a long time if the table is large. Consider adding "
+        "the index concurrently in a separate migration instead."
+    ),
+)
+
+ALTER_FIELD_VALIDATES_TABLE = Warning(
+    level=Level.WARNING,
+    title="Altering a column requires validating the table",
+    description=(
+        "This migration adds a NOT NULL, check or foreign key constraint to an "
+        "existing column. Postgres will check all rows in the table while "
+        "holding a lock, which can take a long time if the table is large."
+    ),
+)
+
+IRREVERSIBLE_MIGRATION = Warning(
+    level=Level.DANGER,
+    title="Migration can't be unapplied",
+    description=(
+        "This migration contains operations that can't be reversed, so a "
+        "deploy including it can't be rolled back by unapplying migrations. "
+        "Consider adding reverse_code or reverse_sql, or RunPython.noop if "
+        "nothing has to be done to unapply it."
+    ),
+)
+
+BACKWARDS_EXCLUSIVE_LOCK = Warning(
+    level=Level.WARNING,
+    title="Unapplying takes an exclusive lock",
+    description=(
+        "Unapplying this migration takes an exclusive lock on a table, which "
+        "blocks queries while rolling back a deploy."
+    ),
+)
+
+BACKWARDS_REWRITE = Warning(
+    level=Level.WARNING,
+    title="Unapplying rewrites a table",
+    description=(
+        "Unapplying this migration changes a column in a way that rewrites "
+        "the whole table while holding an exclusive lock, which can take a "
+        "long time if the table is large."
+    ),
+)
+
+OLD_QUERIES_FAIL = Warning(
+    level=Level.DANGER,
+    title="Queries from the old code fail",
+    description=(
+        "Queries recorded from the code before this change fail after this "
+        "migration is applied. Until the new code is rolled out everywhere, "
+        "these queries will fail in production."
+    ),
+)
+
+OLD_QUERIES_SLOWER = Warning(
+    level=Level.WARNING,
+    title="Queries from the old code are slower",
+    description=(
+        "Queries recorded from the code before this change are much slower "
+        "after this migration is applied, e.g. because an index they use was "
+        "removed."
+    ),
+)
+
+REMOVING_USED_INDEX = Warning(
+    level=Level.DANGER,
+    title="Removing an index that is in use",
+    description=(
+        "This migration removes an index that production queries have used, "
+        "according to the index statistics snapshot. Queries using it may get "
+        "much slower once it is gone."
+    ),
+)
+
+OVERLAPPING_INDEX = Warning(
+    level=Level.WARNING,
+    title="Adding an index that overlaps an existing one",
+    description=(
+        "This migration adds an index on columns that an existing index "
+        "starts with, or the other way around. An index can be used for "
+        "queries on any prefix of its columns, so one of them is likely "
+        "redundant and only slows down writes."
+    ),
+)
+
+LOCK_ORDER_INVERSION = Warning(
+    level=Level.DANGER,
+    title="Locking tables in the opposite order of hot transactions",
+    description=(
+        "This migration locks tables in the opposite order of the configured "
+        "hot path. A transaction holding a row lock on the first table while "
+        "waiting for the second can deadlock with this migration."
+    ),
+)
+
+LOCK_FAN_OUT = Warning(
+    level=Level.WARNING,
+    title="Locking busy tables",
+    description=(
+        "This migration blocks writes to several tables, including busy ones, "
+        "e.g. referenced tables locked when adding a foreign key. Writes to "
+        "all of them wait until the migration commits."
+    ),
+)
+
+TABLE_BLOAT = Warning(
+    level=Level.WARNING,
+    title="Bloating a table",
+    description=(
+        "This migration leaves many dead tuples behind, or grows a table on "
+        "disk. Updating every row writes a new version of each row, which can "
+        "double the size of a large table and leave autovacuum with hours of "
+        "work. Consider updating in batches with RunPythonInBatches, giving "
+        "autovacuum time to keep up."
+    ),
+)
+
+
+def with_details(warning: Warning, details: list[str]) -> Warning:
+    """
+    Get a copy of a warning with details about this occurrence listed.
+    """
+
+    return dataclasses.replace(
+        warning,
+        description=warning.description
+        + "".join(f"\n- {detail}" for detail in details),
+    )
@@ -0,0 +1,328 @@
+"""
+A long-lived process that keeps Django loaded and re-runs the static checks
+whenever a migration file changes. Editors and pre-commit hooks can query it
+using migration_checker.client.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import selectors
+import socket
+import struct
+import sys
+import time
+from importlib import import_module
+from pathlib import Path
+from typing import Iterable
+
+import django
+from django.apps import apps
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.state import ProjectState
+
+from .output import ConsoleOutput
+from .registry import get_registry
+from .results import MigrationResult
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+
+WATCH_MASK = (
+    IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+)
+
+# Wait this long after a change for more events, as editors often write a
+# file in several steps.
+DEBOUNCE_SECONDS = 0.05
+POLL_INTERVAL_SECONDS = 0.5
+# Clients that don't send a request in time are dropped, so they can't block
+# the daemon
+QUERY_TIMEOUT_SECONDS = 5.0
+
+
+class Inotify:
+    """
+    Minimal inotify bindings, only available on Linux.
+    """
+
+    def __init__(self, directories: Iterable[str]) -> None:
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        self.directories: dict[int, str] = {}
+        for directory in directories:
+            wd = libc.inotify_add_watch(self.fd, directory.encode(), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"Could not watch {directory}")
+            self.directories[wd] = directory
+
+    def read(self) -> set[str]:
+        """
+        Read pending events and return the paths of files that changed.
+        """
+
+        changed: set[str] = set()
+        header = struct.Struct("iIII")
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, _mask, _cookie, length = header.unpack_from(data, offset)
+                offset += header.size
+                name = data[offset : offset + length].rstrip(b"\0").decode()
+                offset += length
+                if wd in self.directories and name:
+                    changed.add(os.path.join(self.directories[wd], name))
+
+
+class Poller:
+    """
+    Fallback for platforms without inotify. Compares modification times.
+    """
+
+    def __init__(self, directories: Iterable[str]) -> None:
+        self.directories = list(directories)
+        self.mtimes = self._scan()
+
+    def _scan(self) -> dict[str, float]:
+        return {
+            str(path): path.stat().st_mtime
+            for directory in self.directories
+            for path in Path(directory).glob("*.py")
+        }
+
+    def read(self) -> set[str]:
+        mtimes = self._scan()
+        changed = {
+            path
+            for path in mtimes.keys() | self.mtimes.keys()
+            if mtimes.get(path) != self.mtimes.get(path)
+        }
+        self.mtimes = mtimes
+        return changed
+
+
+class Watcher:
+    def __init__(self, *, socket_path: str) -> None:
+        self.socket_path = socket_path
+        self.output = ConsoleOutput()
+        self.results: dict[tuple[str, str], MigrationResult] = {}
+        # The state before each migration, keyed by the migration and its
+        # parents, as the state only depends on the migrations before it.
+        self.states: dict[tuple[tuple[str, str], frozenset[str]], ProjectState] = {}
+
+    def run(self) -> None:
+        django.setup()
+
+        # Only the files on disk are checked, so no database is needed
+        self.loader = MigrationLoader(None, ignore_no_migrations=True)
+        self.modules = self._get_migrations_modules()
+
+        try:
+            watcher: Inotify | Poller = Inotify(self.modules)
+        except (OSError, AttributeError):
+            watcher = Poller(self.modules)
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen()
+
+        selector = selectors.DefaultSelector()
+        selector.register(server, selectors.EVENT_READ)
+        if isinstance(watcher, Inotify):
+            selector.register(watcher.fd, selectors.EVENT_READ)
+            timeout = None
+        else:
+            timeout = POLL_INTERVAL_SECONDS
+
+        print(
+            f"👀 Watching {len(self.modules)} migrations directories, "
+            f"listening on {self.socket_path}"
+        )
+
+        try:
+            while True:
+                events = selector.select(timeout)
+                if any(key.fileobj is server for key, _ in events):
+                    connection, _ = server.accept()
+                    with connection:
+                        self._serve(connection, watcher)
+                elif changed := watcher.read():
+                    time.sleep(DEBOUNCE_SECONDS)
+                    self.reload(changed | watcher.read(), verbose=True)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.close()
+            os.unlink(self.socket_path)
+
+    def _get_migrations_modules(self) -> dict[str, str]:
+        """
+        Get a mapping from migrations directories to their module names.
+        """
+
+        modules = {}
+        for app_config in apps.get_app_configs():
+            if app_config.label not in self.loader.migrated_apps:
+                continue
+            module_name, _ = MigrationLoader.migrations_module(app_config.label)
+            assert module_name is not None
+            module = import_module(module_name)
+            for directory in module.__path__:
+                modules[directory] = module_name
+        return modules
+
+    def _get_key(self, path: str) -> tuple[str, str] | None:
+        directory, filename = os.path.split(os.path.abspath(path))
+        name, extension = os.path.splitext(filename)
+        if extension != ".py" or directory not in self.modules:
+            return None
+        return next(
+            (
+                key
+                for key, migration in self.loader.disk_migrations.items()
+                if migration.__module__ == f"{self.modules[directory]}.{name}"
+            ),
+            None,
+        )
+
+    def reload(self, paths: set[str], verbose: bool = False) -> None:
+        """
+        Reload the migration graph after files changed, and re-check the
+        migrations in the changed files.
+        """
+
+        start = time.perf_counter()
+        changed_modules = set()
+        for path in paths:
+            directory, filename = os.path.split(path)
+            name, extension = os.path.splitext(filename)
+            if extension == ".py" and directory in self.modules:
+                changed_modules.add(f"{self.modules[directory]}.{name}")
+                sys.modules.pop(f"{self.modules[directory]}.{name}", None)
+
+        if not changed_modules:
+            return
+
+        old_keys = [
+            key
+            for key, migration in self.loader.disk_migrations.items()
+            if migration.__module__ in changed_modules
+        ]
+
+        try:
+            self.loader.build_graph()
+        except Exception as e:
+            print(f"❌ Could not load migrations: {e}")
+            return
+
+        changed_keys = [
+            key
+            for key, migration in self.loader.disk_migrations.items()
+            if migration.__module__ in changed_modules
+        ]
+
+        # Anything after a changed migration has to be checked against a new
+        # state. The changed migrations themselves can reuse their state
+        # unless their dependencies changed.
+        stale = {
+            descendant
+            for key in old_keys + changed_keys
+            if key in self.loader.graph.node_map
+            for descendant in self.loader.graph.backwards_plan(key)
+            if descendant != key
+        }
+        self.states = {
+            cache_key: state
+            for cache_key, state in self.states.items()
+            if cache_key[0] in self.loader.graph.nodes and cache_key[0] not in stale
+        }
+        self.results = {
+            key: result
+            for key, result in self.results.items()
+            if key in self.loader.graph.nodes
+            and key not in stale
+            and key not in old_keys
+        }
+
+        for key in changed_keys:
+            result = self.check(key)
+            if verbose:
+                self.output.migration_result(
+                    migration=self.loader.graph.nodes[key], result=result
+                )
+
+        if verbose and changed_keys:
+            duration = (time.perf_counter() - start) * 1000
+            print(f"\n⏱️  Checked {len(changed_keys)} migrations in {duration:.1f} ms")
+
+    def check(self, key: tuple[str, str]) -> MigrationResult:
+        if key in self.results:
+            return self.results[key]
+
+        parents = frozenset(
+            ".".join(parent.key) for parent in self.loader.graph.node_map[key].parents
+        )
+        if (key, parents) not in self.states:
+            self.states[key, parents] = self.loader.project_state(key, at_end=False)
+
+        migration = self.loader.graph.nodes[key]
+        self.results[key] = MigrationResult(
+            app_label=migration.app_label,
+            name=migration.name,
+            warnings=get_registry().run(migration, self.states[key, parents]),
+        )
+        return self.results[key]
+
+    def _serve(self, connection: socket.socket, watcher: Inotify | Poller) -> None:
+        """
+        Answer a query, replying with an error instead of stopping the daemon
+        when the request is invalid or the checks fail.
+        """
+
+        connection.settimeout(QUERY_TIMEOUT_SECONDS)
+        try:
+            self._handle_query(connection, watcher)
+        except Exception as e:
+            print(f"❌ Could not answer a query: {e!r}")
+            try:
+                response = {"error": repr(e)}
+                connection.sendall(json.dumps(response).encode() + b"\n")
+            except OSError:
+                # The client is gone
+                pass
+
+    def _handle_query(
+        self, connection: socket.socket, watcher: Inotify | Poller
+    ) -> None:
+        """
+        Answer a query from a client. The request is a single line of JSON
+        with the paths to check, and the response contains the results.
+        """
+
+        # Make sure recent changes are picked up before answering
+        self.reload(watcher.read(), verbose=True)
+
+        request = json.loads(connection.makefile("r").readline() or "{}")
+        keys = [
+            key
+            for path in request.get("paths", [])
+            if (key := self._get_key(path)) is not None
+        ]
+
+        results = [self.check(key) for key in keys]
+        response = {"results": [result.to_dict() for result in results]}
+        connection.sendall(json.dumps(response).encode() + b"\n")
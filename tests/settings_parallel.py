@@ -0,0 +1,5 @@
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS
+
+# A second app, independent of the tests app, so the plan can be split
+INSTALLED_APPS = [*INSTALLED_APPS, "tests.other"]
@@ -0,0 +1,108 @@
+from django.db import connection, migrations
+from django.db.migrations.loader import MigrationLoader
+
+from migration_checker.bloat import TableStats, get_bloat_warnings, get_table_bloat
+from migration_checker.executor import Executor
+from migration_checker.results import TableBloat
+from migration_checker.warnings import TABLE_BLOAT
+
+
+def get_stats(
+    *,
+    live_tuples: int = 10,
+    dead_tuples: int = 0,
+    updated_tuples: int = 0,
+    table_size: int = 8192,
+) -> TableStats:
+    return TableStats(
+        live_tuples=live_tuples,
+        dead_tuples=dead_tuples,
+        updated_tuples=updated_tuples,
+        table_size=table_size,
+        size=table_size + 16384,
+    )
+
+
+def test_get_table_bloat() -> None:
+    before = {
+        "a": get_stats(dead_tuples=2, updated_tuples=5),
+        "b": get_stats(),
+        # Vacuumed in between
+        "c": get_stats(dead_tuples=5),
+    }
+    after = {
+        "a": get_stats(dead_tuples=12, updated_tuples=15, table_size=16384),
+        "b": get_stats(),
+        "c": get_stats(),
+        "new": get_stats(live_tuples=0),
+    }
+    assert get_table_bloat(before, after) == [
+        TableBloat(
+            table="a",
+            live_tuples=10,
+            dead_tuples=10,
+            updated_tuples=10,
+            size_before=24576,
+            size_after=32768,
+            table_size_before=8192,
+            table_size_after=16384,
+        )
+    ]
+
+
+def test_get_bloat_warnings() -> None:
+    def get_bloat(**kwargs: int) -> TableBloat:
+        defaults = dict(
+            table="a",
+            live_tuples=100,
+            dead_tuples=0,
+            updated_tuples=0,
+            size_before=8192,
+            size_after=8192,
+            table_size_before=8192,
+            table_size_after=8192,
+        )
+        return TableBloat(**{**defaults, **kwargs})  # type: ignore[arg-type]
+
+    assert get_bloat_warnings([get_bloat(dead_tuples=10)]) == []
+    assert get_bloat_warnings([get_bloat(live_tuples=0, dead_tuples=10)]) == []
+    assert get_bloat_warnings([get_bloat(dead_tuples=50)], max_bloat=0.5)
+
+    # Adding an index only grows the total size
+    assert get_bloat_warnings([get_bloat(size_after=65536)]) == []
+
+    [warning] = get_bloat_warnings(
+        [get_bloat(size_after=16384, table_size_after=16384)]
+    )
+    assert warning.title == TABLE_BLOAT.title
+    assert warning.description.endswith(
+        "\n- a: 0 dead tuples for 100 live tuples, 8 kB -> 16 kB"
+    )
+
+
+def test_executor_measures_bloat(setup_db: None) -> None:
+    executor = Executor(
+        database="default", apply_migrations=True, outputs=[], max_bloat=0.2
+    )
+    executor.run()
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "INSERT INTO tests_order (number) SELECT generate_series(1, 100)"
+        )
+
+    class Migration(migrations.Migration):
+        operations = [
+            migrations.RunSQL("UPDATE tests_order SET number = number + 1000"),
+        ]
+
+    state = MigrationLoader(connection).project_state()
+    result = executor._check_migration(Migration("0005_update", "tests"), state)
+
+    [bloat] = [
+        table for table in result.bloat or () if table.table == "public.tests_order"
+    ]
+    assert bloat.live_tuples == 100
+    assert bloat.dead_tuples == 100
+    assert bloat.updated_tuples == 100
+    assert [warning.title for warning in result.warnings].count(TABLE_BLOAT.title) == 1
@@ -0,0 +1,130 @@
+from migration_checker.budgets import (
+    LockBudget,
+    LockBudgetOutput,
+    get_held_locks,
+    parse_budgets,
+)
+from migration_checker.results import MigrationResult, QueryTiming
+
+
+def get_result(name: str, duration: float) -> MigrationResult:
+    return MigrationResult(
+        app_label="orders",
+        name=name,
+        locks=[
+            ("orders_order", "AccessExclusiveLock"),
+            ("orders_line", "RowExclusiveLock"),
+        ],
+        duration=duration,
+    )
+
+
+def test_parse_budgets() -> None:
+    budgets = parse_budgets(
+        {
+            "orders_order": {"max_seconds": 2, "modes": ["AccessExclusiveLock"]},
+            "*": {"max_acquisitions": 5},
+        }
+    )
+    assert budgets["orders_order"] == LockBudget(
+        max_seconds=2, modes=frozenset({"AccessExclusiveLock"})
+    )
+    assert budgets["*"].max_acquisitions == 5
+    assert "ShareLock" in budgets["*"].modes
+
+
+def test_get_held_locks() -> None:
+    result = MigrationResult(
+        app_label="orders",
+        name="0002_order_total",
+        locks=[("orders_order", "AccessExclusiveLock")],
+        timings=[
+            QueryTiming(start=0.0, duration=0.5, locks=[]),
+            QueryTiming(
+                start=0.5,
+                duration=1.5,
+                locks=[("orders_order", "AccessExclusiveLock")],
+            ),
+        ],
+    )
+    assert list(get_held_locks(result)) == [
+        ("orders_order", "AccessExclusiveLock", 1.5)
+    ]
+
+
+def test_lock_budget_output() -> None:
+    output = LockBudgetOutput(
+        budgets={
+            "orders_order": LockBudget(max_seconds=1.0, max_acquisitions=2),
+            # Row locks don't block writes, so they don't count by default
+            "*": LockBudget(max_acquisitions=1),
+        }
+    )
+    output.begin(3)
+    for index in range(3):
+        output.migration_result(
+            None,  # type: ignore[arg-type]
+            get_result(f"000{index + 1}", duration=0.5),
+        )
+    output.done()
+
+    assert output.exceeded == [
+        "orders_order is locked for 1.50 s, the budget is 1.00 s",
+        "orders_order is locked 3 times, the budget is 2",
+    ]
+
+
+def test_lock_budget_output_several_modes() -> None:
+    output = LockBudgetOutput(
+        budgets={"orders_order": LockBudget(max_seconds=1.0, max_acquisitions=1)}
+    )
+    output.begin(1)
+    output.migration_result(
+        None,  # type: ignore[arg-type]
+        MigrationResult(
+            app_label="orders",
+            name="0002_order_number",
+            locks=[
+                ("orders_order", "ShareLock"),
+                ("orders_order", "AccessExclusiveLock"),
+            ],
+            duration=0.8,
+        ),
+    )
+    output.done()
+
+    # The table is locked once, for as long as the migration runs
+    assert output.exceeded == []
+
+
+def test_lock_budget_output_non_atomic() -> None:
+    output = LockBudgetOutput(
+        budgets={"orders_order": LockBudget(max_seconds=1.0, max_acquisitions=1)}
+    )
+    output.begin(1)
+    output.migration_result(
+        None,  # type: ignore[arg-type]
+        MigrationResult(
+            app_label="orders",
+            name="0003_order_number_index",
+            queries=[
+                'CREATE INDEX CONCURRENTLY "number" ON "orders_order" ("number")',
+                'ALTER TABLE "orders_order" ADD COLUMN "note" text NULL',
+                'ALTER TABLE "orders_order" DROP COLUMN "note"',
+            ],
+            locks=[("orders_order", "AccessExclusiveLock")],
+            timings=[
+                QueryTiming(start=0.0, duration=5.0),
+                QueryTiming(start=5.0, duration=0.5),
+                QueryTiming(start=5.5, duration=0.25),
+            ],
+            duration=5.75,
+            locks_predicted=True,
+        ),
+    )
+    output.done()
+
+    # Each statement releases its locks, and building the index concurrently
+    # doesn't block writes
+    assert output.totals[("orders_order", "AccessExclusiveLock")].seconds == 0.75
+    assert output.exceeded == []
@@ -1,3 +1,6 @@
+import json
+from pathlib import Path
+
 import django
 import pytest
 from django.db import migrations
@@ -7,37 +10,59 @@ from django.db.migrations import (
     AddIndex,
     AlterField,
     RemoveField,
+    RemoveIndex,
     RenameField,
     RenameModel,
+    RunPython,
     RunSQL,
 )
 from django.db.migrations.operations.base import Operation
 from django.db.migrations.state import ProjectState
 from django.db.models import (
+    CASCADE,
     AutoField,
     BigAutoField,
+    BigIntegerField,
+    CharField,
     CheckConstraint,
+    DecimalField,
+    Field,
+    ForeignKey,
     Index,
     IntegerField,
     PositiveIntegerField,
     Q,
+    TextField,
 )
 
-from migration_checker.checks import run_checks
+from migration_checker.checks import (
+    check_index_usage,
+    get_backwards_warnings,
+    run_checks,
+)
+from migration_checker.operations import RunPythonInBatches
 from migration_checker.warnings import (
     ADD_INDEX_IN_SEPARATE_MIGRATION,
     ADDING_CONSTRAINT,
     ADDING_FIELD_WITH_CHECK,
     ADDING_NON_NULLABLE_FIELD,
     ALTER_FIELD,
+    ALTER_FIELD_ADDS_INDEX,
+    ALTER_FIELD_VALIDATES_TABLE,
     ALTERING_MULTIPLE_MODELS,
+    ATOMIC_DATA_MIGRATION,
+    BACKWARDS_REWRITE,
+    IRREVERSIBLE_MIGRATION,
+    OVERLAPPING_INDEX,
     REMOVING_FIELD,
+    REMOVING_USED_INDEX,
     RENAMING_FIELD,
     RENAMING_MODEL,
     SCHEMA_AND_DATA_CHANGES,
     USE_ADD_INDEX_CONCURRENTLY,
     VALIDATE_CONSTRAINT_SEPARATELY,
     Warning,
+    with_details,
 )
 
 
@@ -111,6 +136,15 @@ def test_schema_and_data_changes() -> None:
     assert check_migration(*operations) == {SCHEMA_AND_DATA_CHANGES}
 
 
+def test_schema_and_batched_data_changes() -> None:
+    operations = [
+        AddField(model_name="foo", name="bar", field=IntegerField(null=True)),
+        RunPythonInBatches("foo", RunPythonInBatches.noop),
+    ]
+    # The batches can't run in the transaction of an atomic migration
+    assert check_migration(*operations) == {ATOMIC_DATA_MIGRATION}
+
+
 def test_alter_multiple_models() -> None:
     operations = [
         AddField(model_name="foo", name="bar", field=IntegerField(null=True)),
@@ -136,7 +170,12 @@ def test_add_constraint() -> None:
 
 def test_alter_field() -> None:
     operation = AlterField(model_name="foo", name="id", field=BigAutoField())
-    assert check_migration(operation) == {ALTER_FIELD}
+    assert check_migration(operation) == {
+        with_details(
+            ALTER_FIELD,
+            ["Changing type from integer to bigint (AccessExclusiveLock)"],
+        )
+    }
 
 
 def test_alter_field_to_nullable() -> None:
@@ -144,6 +183,185 @@ def test_alter_field_to_nullable() -> None:
     assert check_migration(operation) == set()
 
 
+@pytest.mark.parametrize(
+    "old_field,new_field,warnings",
+    [
+        (CharField(max_length=10), CharField(max_length=20), set()),
+        (CharField(max_length=20), CharField(max_length=10), {ALTER_FIELD}),
+        (CharField(max_length=10), TextField(), set()),
+        (TextField(), CharField(max_length=10), {ALTER_FIELD}),
+        (IntegerField(), BigIntegerField(), {ALTER_FIELD}),
+        (
+            DecimalField(max_digits=5, decimal_places=2),
+            DecimalField(max_digits=10, decimal_places=2),
+            set(),
+        ),
+        (
+            DecimalField(max_digits=5, decimal_places=2),
+            DecimalField(max_digits=10, decimal_places=3),
+            {ALTER_FIELD},
+        ),
+        (IntegerField(), IntegerField(null=True), set()),
+        (IntegerField(null=True), IntegerField(), {ALTER_FIELD_VALIDATES_TABLE}),
+        (IntegerField(), PositiveIntegerField(), {ALTER_FIELD_VALIDATES_TABLE}),
+        (IntegerField(), IntegerField(db_index=True), {ALTER_FIELD_ADDS_INDEX}),
+        (IntegerField(), IntegerField(unique=True), {ALTER_FIELD_ADDS_INDEX}),
+        (IntegerField(unique=True), IntegerField(), set()),
+        (IntegerField(), IntegerField(choices=[(1, "One")], help_text="?"), set()),
+        (
+            ForeignKey("foo.Foo", on_delete=CASCADE, db_constraint=False),
+            ForeignKey("foo.Foo", on_delete=CASCADE),
+            {ALTER_FIELD_VALIDATES_TABLE},
+        ),
+    ],
+)
+def test_alter_field_rewrites(
+    old_field: Field,  # type: ignore[type-arg]
+    new_field: Field,  # type: ignore[type-arg]
+    warnings: set[Warning],
+) -> None:
+    state = ProjectState()
+    migrations.CreateModel(name="Foo", fields=[("id", AutoField())]).state_forwards(
+        "foo", state
+    )
+    AddField(model_name="foo", name="bar", field=old_field).state_forwards("foo", state)
+
+    class TestMigration(migrations.Migration):
+        operations = [AlterField(model_name="foo", name="bar", field=new_field)]
+
+    migration = TestMigration(name="0003_foo", app_label="foo")
+    assert {warning.title for warning in run_checks(migration, state)} == {
+        warning.title for warning in warnings
+    }
+
+
+def test_alter_field_details() -> None:
+    state = ProjectState()
+    migrations.CreateModel(
+        name="Foo", fields=[("id", AutoField()), ("bar", IntegerField(null=True))]
+    ).state_forwards("foo", state)
+
+    class TestMigration(migrations.Migration):
+        operations = [
+            AlterField(
+                model_name="foo",
+                name="bar",
+                field=PositiveIntegerField(db_index=True),
+            )
+        ]
+
+    migration = TestMigration(name="0002_foo", app_label="foo")
+    assert run_checks(migration, state) == [
+        with_details(
+            ALTER_FIELD_ADDS_INDEX,
+            ["Adding index (ShareLock)"],
+        ),
+        with_details(
+            ALTER_FIELD_VALIDATES_TABLE,
+            [
+                "Setting NOT NULL (AccessExclusiveLock)",
+                "Adding check constraint (AccessExclusiveLock)",
+            ],
+        ),
+    ]
+
+
+@pytest.mark.parametrize(
+    "operation,warnings",
+    [
+        (
+            AlterField(model_name="foo", name="bar", field=IntegerField(null=True)),
+            [],
+        ),
+        (
+            AlterField(model_name="foo", name="bar", field=BigIntegerField()),
+            [BACKWARDS_REWRITE],
+        ),
+        (RunSQL("SELECT 1"), [IRREVERSIBLE_MIGRATION]),
+        (RunSQL("SELECT 1", RunSQL.noop), []),
+        (RunPython(RunPython.noop), [IRREVERSIBLE_MIGRATION]),
+    ],
+)
+def test_backwards_warnings(operation: Operation, warnings: list[Warning]) -> None:
+    state = ProjectState()
+    migrations.CreateModel(
+        name="Foo", fields=[("id", AutoField()), ("bar", IntegerField())]
+    ).state_forwards("foo", state)
+
+    class TestMigration(migrations.Migration):
+        operations = [operation]
+
+    migration = TestMigration(name="0002_foo", app_label="foo")
+    assert get_backwards_warnings(migration=migration, state=state) == warnings
+
+
+@pytest.mark.parametrize(
+    "operation,warning",
+    [
+        (RemoveIndex(model_name="foo", name="foo_used"), REMOVING_USED_INDEX),
+        (RemoveIndex(model_name="foo", name="foo_unused"), None),
+        (
+            AlterField(model_name="foo", name="bar", field=IntegerField()),
+            REMOVING_USED_INDEX,
+        ),
+        (
+            AddIndex(model_name="foo", index=Index(fields=["bar"], name="bar")),
+            OVERLAPPING_INDEX,
+        ),
+        (
+            AddIndex(
+                model_name="foo", index=Index(fields=["bar", "baz"], name="bar_baz")
+            ),
+            OVERLAPPING_INDEX,
+        ),
+        (AddIndex(model_name="foo", index=Index(fields=["baz"], name="baz")), None),
+        (
+            AlterField(model_name="foo", name="baz", field=IntegerField(db_index=True)),
+            None,
+        ),
+    ],
+)
+def test_index_usage(
+    tmp_path: Path, operation: Operation, warning: Warning | None
+) -> None:
+    snapshot = tmp_path / "indexes.json"
+    snapshot.write_text(
+        json.dumps(
+            [
+                {"table": "foo_foo", "name": "foo_used", "columns": ["id"], "scans": 5},
+                {
+                    "table": "foo_foo",
+                    "name": "foo_unused",
+                    "columns": ["id", "bar"],
+                    "scans": 0,
+                },
+                {"table": "foo_foo", "name": "foo_bar", "columns": ["bar"], "scans": 9},
+            ]
+        )
+    )
+
+    state = ProjectState()
+    migrations.CreateModel(
+        name="Foo",
+        fields=[
+            ("id", AutoField()),
+            ("bar", IntegerField(db_index=True)),
+            ("baz", IntegerField()),
+        ],
+    ).state_forwards("foo", state)
+
+    class TestMigration(migrations.Migration):
+        operations = [operation]
+
+    migration = TestMigration(name="0002_foo", app_label="foo")
+    warnings = list(
+        check_index_usage(migration=migration, state=state, snapshot=str(snapshot))
+    )
+    assert [found.title for found in warnings] == ([warning.title] if warning else [])
+    # Without a snapshot the check does nothing
+    assert not list(check_index_usage(migration=migration, state=state))
+
+
 @pytest.mark.skipif(django.VERSION < (4, 0), reason="Not supported in Django < 4.0")
 def test_add_field_and_validate_constraint() -> None:
     from django.contrib.postgres.operations import ValidateConstraint
@@ -1,3 +1,4 @@
+from typing import Iterator
 from unittest.mock import Mock
 
 import pytest
@@ -5,11 +6,15 @@ from django.contrib.postgres.operations import (
     AddIndexConcurrently,
     RemoveIndexConcurrently,
 )
-from django.db.migrations import AddIndex, RunSQL, SeparateDatabaseAndState
+from django.db.migrations import AddIndex, Migration, RunSQL, SeparateDatabaseAndState
 from django.db.migrations.operations.base import Operation
+from django.test import override_settings
 
 from migration_checker.executor import Executor
-from migration_checker.output import ConsoleOutput
+from migration_checker.output import ConsoleOutput, ResultFileOutput
+from migration_checker.results import MigrationResult, read_results
+from migration_checker.warnings import BACKWARDS_EXCLUSIVE_LOCK
+from tests import settings_parallel
 
 
 def test_executor(setup_db: None) -> None:
@@ -19,6 +24,106 @@ def test_executor(setup_db: None) -> None:
     executor.run()
 
 
+def test_executor_with_jobs(
+    setup_db: None, tmp_path: str, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    # Worker processes set up Django again, from the settings module
+    monkeypatch.setenv("DJANGO_SETTINGS_MODULE", "tests.settings_parallel")
+    check_parts_in_parallel = Executor._check_parts_in_parallel
+    num_parts = []
+
+    def spy(
+        self: Executor, migrations: list[Migration], parts: list[list[Migration]]
+    ) -> Iterator[MigrationResult]:
+        num_parts.append(len(parts))
+        return check_parts_in_parallel(self, migrations, parts)
+
+    monkeypatch.setattr(Executor, "_check_parts_in_parallel", spy)
+
+    with override_settings(INSTALLED_APPS=settings_parallel.INSTALLED_APPS):
+        # The parallel run only applies migrations to clones of the database,
+        # so the serial run starts from the same empty database
+        for jobs in (2, 1):
+            Executor(
+                database="default",
+                apply_migrations=True,
+                outputs=[ConsoleOutput(), ResultFileOutput(path=f"{tmp_path}/{jobs}")],
+                jobs=jobs,
+            ).run()
+
+    assert num_parts == [2]
+    parallel = read_results(f"{tmp_path}/2")
+    serial = read_results(f"{tmp_path}/1")
+    assert [result.key for result in parallel] == [
+        ("other", "0001_initial"),
+        ("other", "0002_product_name"),
+        ("tests", "0001_initial"),
+        ("tests", "0002_auto_20230207_1532"),
+        ("tests", "0003_alter_order_number"),
+        ("tests", "0004_orderline_order"),
+    ]
+    assert [
+        (result.key, result.queries, result.locks, result.warnings)
+        for result in parallel
+    ] == [
+        (result.key, result.queries, result.locks, result.warnings) for result in serial
+    ]
+
+
+@pytest.mark.parametrize(
+    "mode,order",
+    [
+        (
+            "each",
+            [
+                ("0001_initial", False),
+                ("0001_initial", True),
+                ("0002_auto_20230207_1532", False),
+                ("0002_auto_20230207_1532", True),
+                ("0003_alter_order_number", False),
+                ("0003_alter_order_number", True),
+                ("0004_orderline_order", False),
+                ("0004_orderline_order", True),
+            ],
+        ),
+        (
+            "plan",
+            [
+                ("0001_initial", False),
+                ("0002_auto_20230207_1532", False),
+                ("0003_alter_order_number", False),
+                ("0004_orderline_order", False),
+                ("0004_orderline_order", True),
+                ("0003_alter_order_number", True),
+                ("0002_auto_20230207_1532", True),
+                ("0001_initial", True),
+            ],
+        ),
+    ],
+)
+def test_executor_backwards(
+    setup_db: None, tmp_path: str, mode: str, order: list[tuple[str, bool]]
+) -> None:
+    path = f"{tmp_path}/results.json"
+    Executor(
+        database="default",
+        apply_migrations=True,
+        outputs=[ConsoleOutput(), ResultFileOutput(path=path)],
+        backwards=mode,
+    ).run()
+
+    results = {(result.name, result.backwards): result for result in read_results(path)}
+    assert list(results) == order
+
+    initial = results[("0001_initial", True)]
+    assert any(query.startswith("DROP TABLE") for query in initial.queries)
+    assert BACKWARDS_EXCLUSIVE_LOCK in initial.warnings
+
+    # Dropping an index concurrently can't be checked for locks
+    index = results[("0004_orderline_order", True)]
+    assert index.locks_predicted
+
+
 @pytest.mark.parametrize(
     "operation,must_be_non_atomic",
     [
@@ -30,6 +135,9 @@ def test_executor(setup_db: None) -> None:
         (RunSQL("DROP INDEX foobar CONCURRENTLY", RunSQL.noop), True),
         (RunSQL([("CREATE INDEX foobar", None)]), False),
         (RunSQL([("CREATE INDEX foobar CONCURRENTLY", None)]), True),
+        (RunSQL("VACUUM ANALYZE foobar"), True),
+        (RunSQL("ALTER TYPE mood ADD VALUE 'happy'"), True),
+        (RunSQL("-- CREATE INDEX CONCURRENTLY foobar\nSELECT 1"), False),
         (
             SeparateDatabaseAndState(
                 database_operations=[RunSQL("CREATE INDEX foobar")]
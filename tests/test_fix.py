@@ -0,0 +1,122 @@
+from django.contrib.postgres.operations import (
+    AddConstraintNotValid,
+    AddIndexConcurrently,
+    ValidateConstraint,
+)
+from django.db import migrations
+from django.db.migrations.writer import MigrationWriter
+from django.db.models import CheckConstraint, Index, IntegerField, Q
+
+from migration_checker.fix import (
+    fix_migration,
+    get_source,
+    get_unsplittable_reason,
+    split_migration,
+)
+
+
+def forwards(apps: object, schema_editor: object) -> None:
+    pass
+
+
+class UnsafeMigration(migrations.Migration):
+    dependencies = [("shop", "0001_initial")]
+    operations = [
+        migrations.AddField("order", "total", IntegerField(null=True)),
+        migrations.RunPython(migrations.RunPython.noop),
+        migrations.AddIndex("order", Index(fields=["total"], name="total")),
+        migrations.AddConstraint(
+            "order",
+            CheckConstraint(  # type: ignore[call-arg]
+                check=Q(total__gte=0), name="total_gte_0"
+            ),
+        ),
+    ]
+
+
+def test_split_migration(setup_django: None) -> None:
+    migration = UnsafeMigration("0002_order_total", "shop")
+    split = split_migration(migration)
+
+    assert [(part.name, part.dependencies, part.atomic) for part in split] == [
+        ("0002_order_total_1", [("shop", "0001_initial")], True),
+        ("0002_order_total_2", [("shop", "0002_order_total_1")], True),
+        ("0002_order_total_3", [("shop", "0002_order_total_2")], True),
+        ("0002_order_total_4", [("shop", "0002_order_total_3")], False),
+        ("0002_order_total", [("shop", "0002_order_total_4")], True),
+    ]
+    assert [[type(operation) for operation in part.operations] for part in split] == [
+        [migrations.AddField],
+        [migrations.RunPython],
+        [AddConstraintNotValid],
+        [AddIndexConcurrently],
+        [ValidateConstraint],
+    ]
+
+    source = get_source(split[3], MigrationWriter(split[3]))
+    assert "    atomic = False\n" in source
+    compile(source, "0002_order_total_4.py", "exec")
+
+
+def test_split_batched_data_migration(setup_django: None) -> None:
+    from migration_checker.operations import RunPythonInBatches
+
+    class DataMigration(migrations.Migration):
+        operations = [
+            migrations.AddField("order", "total", IntegerField(null=True)),
+            RunPythonInBatches("order", RunPythonInBatches.noop),
+            migrations.AddField("order", "tax", IntegerField(null=True)),
+        ]
+
+    split = split_migration(DataMigration("0002_order_total", "shop"))
+    assert [(len(part.operations), part.atomic) for part in split] == [
+        (1, True),
+        (1, False),
+        (1, True),
+    ]
+
+
+def test_split_safe_migration(setup_django: None) -> None:
+    class SafeMigration(migrations.Migration):
+        operations = [
+            migrations.CreateModel("Line", [("id", IntegerField(primary_key=True))]),
+            # Indexes on new tables don't have to be added concurrently
+            migrations.AddIndex("line", Index(fields=["id"], name="id")),
+        ]
+
+    migration = SafeMigration("0002_line", "shop")
+    assert split_migration(migration)[0] is migration
+
+
+def test_fix_migration(setup_django: None) -> None:
+    assert not fix_migration(app_label="tests", name="0003", dry_run=True)
+    # Indexes can't be added concurrently in an atomic migration
+    assert fix_migration(app_label="tests", name="0004", dry_run=True)
+
+
+def test_split_migration_with_local_function(setup_django: None) -> None:
+    # The function is defined in the module of the migration, like in a
+    # migration file
+    class DataMigration(migrations.Migration):
+        operations = [
+            migrations.AddField("order", "total", IntegerField(null=True)),
+            migrations.RunPython(forwards, migrations.RunPython.noop),
+        ]
+
+    migration = DataMigration("0002_order_total", "shop")
+    assert get_unsplittable_reason(migration) == (
+        "RunPython code is defined in the migration module"
+    )
+    assert split_migration(migration)[0] is migration
+
+
+def test_split_migration_removing_index(setup_django: None) -> None:
+    class IndexMigration(migrations.Migration):
+        operations = [
+            migrations.AddIndex("order", Index(fields=["total"], name="total")),
+            migrations.RemoveIndex("order", "total"),
+        ]
+
+    migration = IndexMigration("0002_order_total", "shop")
+    assert get_unsplittable_reason(migration)
+    assert split_migration(migration)[0] is migration
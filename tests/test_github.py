@@ -0,0 +1,206 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Iterator
+from urllib.parse import parse_qs, urlsplit
+
+import pytest
+
+from migration_checker.github import GithubClient, GithubError
+
+
+class FakeGithub(ThreadingHTTPServer):
+    def __init__(self) -> None:
+        super().__init__(("127.0.0.1", 0), FakeGithubHandler)
+        self.comments: list[dict[str, Any]] = []
+        self.requests: list[tuple[str, str]] = []
+        self.connections = 0
+        self.rate_limited = 0
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class FakeGithubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    server: FakeGithub
+
+    def setup(self) -> None:
+        super().setup()
+        self.server.connections += 1
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def send_json(self, status: int, data: Any, **headers: str) -> None:
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        self.server.requests.append(("GET", self.path))
+
+        if self.server.rate_limited:
+            self.server.rate_limited -= 1
+            self.send_json(403, {"message": "You have exceeded a secondary rate limit"})
+            return
+
+        url = urlsplit(self.path)
+        page = int(parse_qs(url.query).get("page", ["1"])[0])
+        per_page = int(parse_qs(url.query)["per_page"][0])
+        comments = self.server.comments[(page - 1) * per_page : page * per_page]
+
+        etag = f'"{page}-{hash(json.dumps(comments))}"'
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+
+        headers = {"ETag": etag}
+        if page * per_page < len(self.server.comments):
+            headers[
+                "Link"
+            ] = f'<{url.path}?per_page={per_page}&page={page + 1}>; rel="next"'
+        self.send_json(200, comments, **headers)
+
+    def do_POST(self) -> None:
+        self.server.requests.append(("POST", self.path))
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        comment = {
+            "id": len(self.server.comments) + 1,
+            "user": {"login": "bot"},
+            "body": data["body"],
+        }
+        self.server.comments.append(comment)
+        self.send_json(201, comment)
+
+    def do_PATCH(self) -> None:
+        self.server.requests.append(("PATCH", self.path))
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        comment_id = int(self.path.rsplit("/", 1)[1])
+        comment = next(c for c in self.server.comments if c["id"] == comment_id)
+        comment["body"] = data["body"]
+        self.send_json(200, comment)
+
+    def do_DELETE(self) -> None:
+        self.server.requests.append(("DELETE", self.path))
+        comment_id = int(self.path.rsplit("/", 1)[1])
+        self.server.comments = [
+            c for c in self.server.comments if c["id"] != comment_id
+        ]
+        self.send_response(204)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+
+@pytest.fixture
+def fake_github() -> Iterator[FakeGithub]:
+    server = FakeGithub()
+    thread = threading.Thread(
+        target=server.serve_forever, kwargs={"poll_interval": 0.01}, daemon=True
+    )
+    thread.start()
+    try:
+        yield server
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def get_client(server: FakeGithub) -> GithubClient:
+    return GithubClient(
+        token="token",
+        repo="org/repo",
+        pull_request=1,
+        base_url=server.base_url,
+        sleep=lambda seconds: None,
+    )
+
+
+def test_pagination(fake_github: FakeGithub) -> None:
+    fake_github.comments = [
+        {"id": i, "user": {"login": "user"}, "body": f"comment {i}"} for i in range(250)
+    ]
+    client = get_client(fake_github)
+
+    assert len(client.get_comments()) == 250
+    assert len(fake_github.requests) == 3
+    # All pages are fetched over a single connection
+    assert fake_github.connections == 1
+
+
+def test_find_comment_stops_early(fake_github: FakeGithub) -> None:
+    fake_github.comments = [
+        {"id": i, "user": {"login": "user"}, "body": f"comment {i}"} for i in range(250)
+    ]
+    client = get_client(fake_github)
+
+    comment = client.find_comment(marker="comment 42")
+    assert comment and comment.id == 42
+    assert len(fake_github.requests) == 1
+
+
+def test_conditional_requests(fake_github: FakeGithub) -> None:
+    client = get_client(fake_github)
+    client.create_comment(body="Hello")
+
+    assert [comment.body for comment in client.get_comments()] == ["Hello"]
+    # The second request is answered with 304 Not Modified
+    assert [comment.body for comment in client.get_comments()] == ["Hello"]
+
+    client.create_comment(body="World")
+    assert [comment.body for comment in client.get_comments()] == ["Hello", "World"]
+
+
+def test_retry_on_rate_limit(fake_github: FakeGithub) -> None:
+    fake_github.rate_limited = 2
+    client = get_client(fake_github)
+    assert client.get_comments() == []
+    assert len(fake_github.requests) == 3
+
+
+def test_give_up_on_rate_limit(fake_github: FakeGithub) -> None:
+    fake_github.rate_limited = 10
+    client = get_client(fake_github)
+    client.max_retries = 2
+    with pytest.raises(GithubError):
+        client.get_comments()
+
+
+def test_update_and_delete_comments(fake_github: FakeGithub) -> None:
+    client = get_client(fake_github)
+    client.create_comment(body="Hello")
+    client.create_comment(body="World")
+
+    client.update_comment(comment_id=1, body="Hi")
+    client.delete_comment(comment_id=2)
+
+    assert [comment.body for comment in client.get_comments()] == ["Hi"]
+    assert fake_github.connections == 1
+
+
+def test_retry_on_connection_error(fake_github: FakeGithub) -> None:
+    client = get_client(fake_github)
+    send = client._send
+    failures = {"GET": 1, "POST": 1}
+
+    def flaky_send(method: str, target: str, **kwargs: Any) -> Any:
+        if failures.get(method):
+            failures[method] -= 1
+            raise ConnectionResetError()
+        return send(method, target, **kwargs)
+
+    client._send = flaky_send  # type: ignore[method-assign]
+    assert client.get_comments() == []
+
+    # The comment may have been created before the connection dropped
+    with pytest.raises(ConnectionResetError):
+        client.create_comment(body="Hello")
+    assert fake_github.comments == []
@@ -0,0 +1,197 @@
+import textwrap
+from pathlib import Path
+
+import pytest
+from django.db.migrations.loader import MigrationLoader
+
+from migration_checker.checks import run_checks
+from migration_checker.lint import lint_file, lint_files
+from migration_checker.warnings import (
+    ADDING_CONSTRAINT,
+    ALTER_FIELD,
+    ATOMIC_DATA_MIGRATION,
+    SCHEMA_AND_DATA_CHANGES,
+    with_details,
+)
+
+MIGRATIONS_DIR = Path(__file__).parent / "migrations"
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "0001_initial",
+        "0002_auto_20230207_1532",
+        "0003_alter_order_number",
+        "0004_orderline_order",
+    ],
+)
+def test_same_warnings_as_checks(setup_django: None, name: str) -> None:
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    state = loader.project_state(("tests", name), at_end=False)
+    migration = loader.graph.nodes[("tests", name)]
+
+    result = lint_file(str(MIGRATIONS_DIR / f"{name}.py"))
+    assert set(result.warnings) == set(run_checks(migration, state))
+
+
+def write_migration(path: Path, source: str) -> str:
+    path.write_text(textwrap.dedent(source))
+    return str(path)
+
+
+def test_lint_alter_field(tmp_path: Path) -> None:
+    write_migration(
+        tmp_path / "0001_initial.py",
+        """
+        from django.db import migrations, models
+
+        class Migration(migrations.Migration):
+            initial = True
+            operations = [
+                migrations.CreateModel(
+                    name="Foo",
+                    fields=[("id", models.AutoField(primary_key=True))],
+                ),
+            ]
+        """,
+    )
+    path = write_migration(
+        tmp_path / "0002_alter.py",
+        """
+        from django.db import migrations, models
+
+        class Migration(migrations.Migration):
+            operations = [
+                migrations.AlterField("foo", "id", models.BigAutoField()),
+            ]
+        """,
+    )
+    result = lint_file(path)
+    assert result.line == 4
+    assert result.warnings == [
+        with_details(
+            ALTER_FIELD,
+            ["Changing type from integer to bigint (AccessExclusiveLock)"],
+        )
+    ]
+
+
+def test_lint_alter_field_length(tmp_path: Path) -> None:
+    write_migration(
+        tmp_path / "0001_initial.py",
+        """
+        from django.db import migrations, models
+
+        class Migration(migrations.Migration):
+            initial = True
+            operations = [
+                migrations.CreateModel(
+                    name="Foo",
+                    fields=[("name", models.CharField(max_length=10))],
+                ),
+            ]
+        """,
+    )
+    longer = write_migration(
+        tmp_path / "0002_longer.py",
+        """
+        from django.db import migrations, models
+
+        class Migration(migrations.Migration):
+            operations = [
+                migrations.AlterField("foo", "name", models.CharField(max_length=20)),
+            ]
+        """,
+    )
+    shorter = write_migration(
+        tmp_path / "0003_shorter.py",
+        """
+        from django.db import migrations, models
+
+        class Migration(migrations.Migration):
+            operations = [
+                migrations.AlterField("foo", "name", models.CharField(max_length=5)),
+            ]
+        """,
+    )
+    assert lint_file(longer).warnings == []
+    assert lint_file(shorter).warnings == [
+        with_details(
+            ALTER_FIELD,
+            ["Changing type from varchar(20) to varchar(5) (AccessExclusiveLock)"],
+        )
+    ]
+
+
+def test_lint_data_migration(tmp_path: Path) -> None:
+    path = write_migration(
+        tmp_path / "0002_data.py",
+        """
+        from django.db import migrations
+        from django.db.migrations import RunPython
+
+        class Migration(migrations.Migration):
+            operations = [
+                migrations.AddConstraint(model_name="foo", constraint=None),
+                RunPython(RunPython.noop),
+            ]
+        """,
+    )
+    assert set(lint_file(path).warnings) == {
+        ADDING_CONSTRAINT,
+        ATOMIC_DATA_MIGRATION,
+        SCHEMA_AND_DATA_CHANGES,
+    }
+
+
+def test_lint_batched_data_migration(tmp_path: Path) -> None:
+    path = write_migration(
+        tmp_path / "0002_data.py",
+        """
+        from django.db import migrations, models
+        from django.db.migrations import RunPython
+        from migration_checker.operations import RunPythonInBatches
+
+        class Migration(migrations.Migration):
+            atomic = False
+
+            operations = [
+                migrations.AddField("foo", "bar", models.IntegerField(null=True)),
+                RunPythonInBatches("foo", RunPythonInBatches.noop),
+            ]
+        """,
+    )
+    assert lint_file(path).warnings == []
+
+
+def test_lint_atomic_batched_data_migration(tmp_path: Path) -> None:
+    path = write_migration(
+        tmp_path / "0002_data.py",
+        """
+        from django.db import migrations
+        from migration_checker.operations import RunPythonInBatches
+
+        class Migration(migrations.Migration):
+            operations = [
+                RunPythonInBatches("foo", RunPythonInBatches.noop),
+            ]
+        """,
+    )
+    assert lint_file(path).warnings == [ATOMIC_DATA_MIGRATION]
+
+
+def test_lint_errors(tmp_path: Path) -> None:
+    path = write_migration(tmp_path / "0001_broken.py", "class Migration(:\n")
+    result = lint_file(path)
+    assert result.error
+
+    path = write_migration(tmp_path / "__init__.py", "")
+    assert lint_file(path).warnings == []
+
+
+def test_lint_files_in_pool(tmp_path: Path) -> None:
+    paths = [str(MIGRATIONS_DIR / "0002_auto_20230207_1532.py")] * 3
+    results = list(lint_files(paths, jobs=2))
+    assert len(results) == 3
+    assert results[0] == lint_file(paths[0])
@@ -0,0 +1,68 @@
+from pathlib import Path
+
+from migration_checker.lockorder import (
+    LockGraphOutput,
+    LockOrderConfig,
+    find_inversions,
+    get_blocking_tables,
+    get_lock_order_warnings,
+)
+from migration_checker.results import MigrationResult
+from migration_checker.warnings import LOCK_FAN_OUT, LOCK_ORDER_INVERSION
+
+ADD_FOREIGN_KEY = [
+    'ALTER TABLE "line" ADD COLUMN "order_id" bigint NULL',
+    'ALTER TABLE "line" ADD CONSTRAINT "line_order_fk" FOREIGN KEY ("order_id") '
+    'REFERENCES "order" ("id") DEFERRABLE INITIALLY DEFERRED',
+    'UPDATE "order" SET total = 0',
+]
+
+
+def test_get_blocking_tables() -> None:
+    # Row locks taken by the update don't block writes
+    assert get_blocking_tables(ADD_FOREIGN_KEY) == ["line", "order"]
+
+
+def test_find_inversions() -> None:
+    hot_path = ("order", "line", "payment")
+    assert find_inversions(["order", "line"], hot_path) == []
+    assert find_inversions(["line", "other", "order"], hot_path) == [("line", "order")]
+    assert find_inversions(["payment", "line", "order"], hot_path) == [
+        ("payment", "line"),
+        ("payment", "order"),
+        ("line", "order"),
+    ]
+
+
+def test_lock_order_warnings() -> None:
+    config = LockOrderConfig(
+        hot_path=("order", "line"), busy_tables=frozenset({"order", "line"})
+    )
+    warnings = get_lock_order_warnings(ADD_FOREIGN_KEY, config)
+    assert [warning.title for warning in warnings] == [
+        LOCK_ORDER_INVERSION.title,
+        LOCK_FAN_OUT.title,
+    ]
+    assert "order is locked after line" in warnings[0].description
+
+    assert get_lock_order_warnings(ADD_FOREIGN_KEY, LockOrderConfig()) == []
+
+
+def test_lock_graph_output(tmp_path: Path) -> None:
+    path = tmp_path / "locks.dot"
+    output = LockGraphOutput(
+        path=str(path), config=LockOrderConfig(busy_tables=frozenset({"order"}))
+    )
+    output.begin(1)
+    output.migration_result(
+        None,  # type: ignore[arg-type]
+        MigrationResult(app_label="shop", name="0002_line", queries=ADD_FOREIGN_KEY),
+    )
+    output.done()
+
+    graph = path.read_text()
+    assert (
+        '"shop.0002_line" -> "order" [label="2. ShareRowExclusiveLock", style=bold]'
+        in graph
+    )
+    assert '"order" [color=red];' in graph
@@ -0,0 +1,120 @@
+import pytest
+from django.db import connection, migrations
+from django.db.migrations.loader import MigrationLoader
+
+from migration_checker.executor import Executor
+from migration_checker.locks import predict_locks
+from migration_checker.output import ResultFileOutput
+from migration_checker.results import read_results
+
+
+@pytest.mark.parametrize(
+    "query,locks",
+    [
+        (
+            'ALTER TABLE "tests_order" ADD COLUMN "note" text NULL',
+            [("tests_order", "AccessExclusiveLock")],
+        ),
+        (
+            'ALTER TABLE "tests_order" VALIDATE CONSTRAINT "tests_order_check"',
+            [("tests_order", "ShareUpdateExclusiveLock")],
+        ),
+        (
+            'ALTER TABLE "tests_orderline" ADD CONSTRAINT "fk" FOREIGN KEY '
+            '("order_id") REFERENCES "tests_order" ("id") NOT VALID',
+            [
+                ("tests_order", "ShareRowExclusiveLock"),
+                ("tests_orderline", "ShareRowExclusiveLock"),
+            ],
+        ),
+        (
+            'ALTER TABLE "tests_order" ALTER COLUMN "number" SET STATISTICS 100, '
+            'ALTER COLUMN "number" TYPE varchar(20)',
+            [("tests_order", "AccessExclusiveLock")],
+        ),
+        (
+            'CREATE INDEX "tests_order_number" ON "tests_order" ("number")',
+            [("tests_order", "ShareLock")],
+        ),
+        (
+            'CREATE UNIQUE INDEX CONCURRENTLY "tests_order_number" '
+            'ON "tests_order" ("number")',
+            [("tests_order", "ShareUpdateExclusiveLock")],
+        ),
+        (
+            'DROP INDEX CONCURRENTLY IF EXISTS "tests_order_number"',
+            [("tests_order_number", "ShareUpdateExclusiveLock")],
+        ),
+        (
+            'CREATE TABLE "tests_orderline" ("id" bigint NOT NULL PRIMARY KEY, '
+            '"order_id" bigint NOT NULL REFERENCES "tests_order" ("id"))',
+            [
+                ("tests_orderline", "AccessExclusiveLock"),
+                ("tests_order", "ShareRowExclusiveLock"),
+            ],
+        ),
+        (
+            'DROP TABLE "tests_order", public."tests_orderline" CASCADE',
+            [
+                ("tests_order", "AccessExclusiveLock"),
+                ("tests_orderline", "AccessExclusiveLock"),
+            ],
+        ),
+        (
+            "UPDATE tests_order SET number = '1'; DELETE FROM tests_orderline",
+            [
+                ("tests_order", "RowExclusiveLock"),
+                ("tests_orderline", "RowExclusiveLock"),
+            ],
+        ),
+        ("SELECT 1", []),
+    ],
+)
+def test_predict_locks(query: str, locks: list[tuple[str, str]]) -> None:
+    assert predict_locks([query]) == locks
+
+
+def test_predict_strongest_lock() -> None:
+    assert predict_locks(
+        [
+            'CREATE INDEX "tests_order_number" ON "tests_order" ("number")',
+            'ALTER TABLE "tests_order" ADD COLUMN "note" text NULL',
+            'ALTER TABLE "tests_order" VALIDATE CONSTRAINT "tests_order_check"',
+        ]
+    ) == [("tests_order", "AccessExclusiveLock")]
+
+
+def test_predict_locks_large_query() -> None:
+    rows = ",\n".join(f"({index}, 'row; {index}')" for index in range(100_000))
+    query = (
+        f"-- Load the orders\nINSERT INTO tests_order (id, number) VALUES {rows};\n"
+        'ALTER TABLE "tests_order" ADD COLUMN "note" text NULL;'
+    )
+
+    assert predict_locks([query]) == [("tests_order", "AccessExclusiveLock")]
+
+
+def test_predict_locks_without_applying(setup_db: None, tmp_path: str) -> None:
+    path = f"{tmp_path}/results.json"
+    Executor(
+        database="default",
+        apply_migrations=False,
+        outputs=[ResultFileOutput(path=path)],
+    ).run()
+
+    results = read_results(path)
+    assert all(result.locks_predicted for result in results)
+    assert results[0].queries
+    assert ("tests_order", "AccessExclusiveLock") in (results[0].locks or [])
+
+
+def test_data_migration_locks_not_predicted(setup_db: None) -> None:
+    class Migration(migrations.Migration):
+        operations = [migrations.RunPython(migrations.RunPython.noop)]
+
+    executor = Executor(database="default", apply_migrations=False, outputs=[])
+    state = MigrationLoader(connection).project_state()
+    result = executor._check_migration(Migration("0005_data", "tests"), state)
+
+    assert result.locks is None
+    assert not result.locks_predicted
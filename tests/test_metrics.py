@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from django.db.migrations import Migration
+
+from migration_checker.executor import Executor
+from migration_checker.metrics import MetricsOutput, get_histories, print_report
+from migration_checker.results import MigrationResult
+
+
+def record_run(path: Path, commit: str, durations: dict[str, float]) -> None:
+    output = MetricsOutput(path=str(path), commit=commit)
+    output.begin(len(durations))
+    for name, duration in durations.items():
+        output.migration_result(
+            Migration(name, "app"),
+            MigrationResult(
+                app_label="app",
+                name=name,
+                queries=["SELECT 1"],
+                locks=[("a", "AccessExclusiveLock"), ("b", "ShareLock")],
+                duration=duration,
+                wal_bytes=1024,
+            ),
+        )
+    output.done()
+
+
+def test_metrics(tmp_path: Path) -> None:
+    path = tmp_path / "metrics.db"
+    for i in range(5):
+        record_run(path, f"commit-{i}", {"0001_stable": 0.1, "0002_growing": 0.1})
+    record_run(path, "commit-5", {"0001_stable": 0.1, "0002_growing": 0.5})
+
+    histories = {
+        history.name: history for history in get_histories(str(path), max_runs=4)
+    }
+
+    assert histories["0001_stable"].durations == [0.1] * 4
+    assert histories["0002_growing"].durations == [0.1, 0.1, 0.1, 0.5]
+    assert histories["0002_growing"].percentile(50) == 0.1
+    assert histories["0002_growing"].percentile(99) == 0.5
+    assert not histories["0001_stable"].is_regression(threshold=1.5, min_runs=3)
+    assert histories["0002_growing"].is_regression(threshold=1.5, min_runs=3)
+
+    assert print_report(str(path), threshold=1.5, min_runs=3, max_runs=100)
+    assert not print_report(str(path), threshold=10, min_runs=3, max_runs=100)
+
+
+def test_executor_records_metrics(setup_db: None, tmp_path: Path) -> None:
+    path = tmp_path / "metrics.db"
+    output = MetricsOutput(path=str(path), commit="abc")
+    Executor(database="default", apply_migrations=True, outputs=[output]).run()
+
+    [history, *_] = get_histories(str(path), max_runs=10)
+    assert history.durations[0] > 0
+    assert history.wal_bytes[0] > 0
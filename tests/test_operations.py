@@ -0,0 +1,86 @@
+from typing import Any
+
+import pytest
+from django.db import NotSupportedError, connection, migrations, transaction
+from django.db.migrations.loader import MigrationLoader
+from django.db.migrations.writer import OperationWriter
+from django.db.models import F, Q
+
+from migration_checker.executor import Executor
+from migration_checker.operations import RunPythonInBatches
+
+FAIL_AFTER: list[int] = []
+
+
+def multiply_numbers(apps: Any, schema_editor: Any, queryset: Any) -> None:
+    if FAIL_AFTER and FAIL_AFTER.pop() == 0:
+        raise RuntimeError("Interrupted")
+    queryset.update(number=F("number") * 100)
+
+
+def get_migration(**kwargs: Any) -> migrations.Migration:
+    class Migration(migrations.Migration):
+        atomic = False
+        operations = [
+            RunPythonInBatches(
+                "order",
+                multiply_numbers,
+                migrations.RunPython.noop,
+                condition=Q(number__lt=100),
+                **kwargs,
+            )
+        ]
+
+    return Migration("0005_multiply_numbers", "tests")
+
+
+def test_run_python_in_batches(setup_db: None) -> None:
+    executor = Executor(database="default", apply_migrations=True, outputs=[])
+    executor.run()
+    state = MigrationLoader(connection).project_state()
+    Order = state.apps.get_model("tests", "Order")
+    Order.objects.bulk_create(Order(number=number) for number in range(1, 6))
+
+    # The second batch fails, and running again resumes from there
+    FAIL_AFTER[:] = [0, 1]
+    with pytest.raises(RuntimeError):
+        executor._check_migration(get_migration(batch_size=2), state)
+    assert sorted(Order.objects.values_list("number", flat=True)) == [
+        3,
+        4,
+        5,
+        100,
+        200,
+    ]
+
+    result = executor._check_migration(get_migration(batch_size=2), state)
+    assert [batch.rows for batch in result.batches] == [2, 1]
+    assert all(batch.duration > 0 for batch in result.batches)
+    assert ("tests_order", "RowExclusiveLock") in (result.batches[0].locks or [])
+    assert sorted(Order.objects.values_list("number", flat=True)) == [
+        100,
+        200,
+        300,
+        400,
+        500,
+    ]
+
+
+def test_run_python_in_batches_in_transaction(setup_db: None) -> None:
+    migration = get_migration()
+    state = MigrationLoader(connection).project_state()
+    with pytest.raises(NotSupportedError):
+        with transaction.atomic():
+            with connection.schema_editor(atomic=False) as schema_editor:
+                migration.apply(state, schema_editor)
+
+
+def test_run_python_in_batches_serialize() -> None:
+    operation = RunPythonInBatches(
+        "order", multiply_numbers, condition=Q(number__lt=100), batch_size=10
+    )
+    source, imports = OperationWriter(operation, indentation=0).serialize()
+    assert source.startswith("migration_checker.operations.RunPythonInBatches(")
+    assert "batch_size=10," in source
+    assert "condition=models.Q(('number__lt', 100))," in source
+    assert "import migration_checker.operations" in imports
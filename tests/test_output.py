@@ -0,0 +1,387 @@
+import inspect
+import io
+import json
+import threading
+from importlib import import_module
+from pathlib import Path
+from typing import Iterator, Sequence
+
+import pytest
+from django.db.migrations import Migration
+
+from migration_checker.github import Comment
+from migration_checker.output import (
+    COMMENT_BUDGET,
+    MARKER,
+    BackgroundOutputs,
+    GithubCommentOutput,
+    JsonLinesOutput,
+    Output,
+    ProgressOutput,
+    SarifOutput,
+    get_class_sources,
+    get_migration_md,
+    get_source,
+)
+from migration_checker.results import MigrationResult, get_query_fingerprint
+from migration_checker.warnings import REMOVING_FIELD
+
+
+class RecordingOutput:
+    def __init__(self) -> None:
+        self.calls: list[str] = []
+        self.thread_names: set[str] = set()
+
+    def no_migrations_to_apply(self) -> None:
+        self.calls.append("no_migrations_to_apply")
+
+    def begin(self, num_migrations: int, keys: Sequence[tuple[str, str]] = ()) -> None:
+        self.calls.append(f"begin {num_migrations}")
+
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        self.thread_names.add(threading.current_thread().name)
+        self.calls.append(f"{result.app_label}.{result.name}")
+
+    def done(self) -> None:
+        self.calls.append("done")
+
+
+class BlockingOutput(RecordingOutput):
+    def __init__(self) -> None:
+        super().__init__()
+        self.unblock = threading.Event()
+
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        self.unblock.wait()
+        super().migration_result(migration, result)
+
+
+class FailingOutput(RecordingOutput):
+    def migration_result(self, migration: Migration, result: MigrationResult) -> None:
+        raise ValueError("Failed to render")
+
+
+def test_background_outputs() -> None:
+    first, second = RecordingOutput(), RecordingOutput()
+    outputs = BackgroundOutputs([first, second])
+
+    outputs.begin(num_migrations=2)
+    for name in ("0001_initial", "0002_foo"):
+        outputs.migration_result(
+            migration=Migration(name, "foo"),
+            result=MigrationResult(app_label="foo", name=name),
+        )
+    outputs.done()
+
+    expected = ["begin 2", "foo.0001_initial", "foo.0002_foo", "done"]
+    assert first.calls == second.calls == expected
+    assert first.thread_names == {"migration-checker-outputs"}
+
+
+def test_background_outputs_backpressure() -> None:
+    output = BlockingOutput()
+    outputs = BackgroundOutputs([output], max_pending=1)
+
+    def submit() -> None:
+        for name in ("0001_initial", "0002_foo", "0003_bar"):
+            outputs.migration_result(
+                migration=Migration(name, "foo"),
+                result=MigrationResult(app_label="foo", name=name),
+            )
+
+    producer = threading.Thread(target=submit)
+    producer.start()
+
+    # One result is being rendered and one is waiting, so the producer blocks
+    producer.join(timeout=0.1)
+    assert producer.is_alive()
+
+    output.unblock.set()
+    producer.join()
+    outputs.done()
+    assert output.calls == ["foo.0001_initial", "foo.0002_foo", "foo.0003_bar", "done"]
+
+
+def test_background_outputs_error() -> None:
+    outputs = BackgroundOutputs([FailingOutput()])
+    outputs.begin(num_migrations=1)
+    outputs.migration_result(
+        migration=Migration("0001_initial", "foo"),
+        result=MigrationResult(app_label="foo", name="0001_initial"),
+    )
+    with pytest.raises(ValueError, match="Failed to render"):
+        outputs.done()
+
+
+def test_background_outputs_error_while_failing(
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    outputs = BackgroundOutputs([FailingOutput()])
+    outputs.begin(num_migrations=1)
+    outputs.migration_result(
+        migration=Migration("0001_initial", "foo"),
+        result=MigrationResult(app_label="foo", name="0001_initial"),
+    )
+
+    # The error applying migrations isn't replaced by the output error
+    with pytest.raises(RuntimeError, match="Migration failed"):
+        try:
+            raise RuntimeError("Migration failed")
+        finally:
+            outputs.close()
+    assert "Failed to render" in capsys.readouterr().err
+
+
+class FakeClient:
+    def __init__(self) -> None:
+        self.comments: list[Comment] = []
+
+    def iter_comments(self) -> Iterator[Comment]:
+        yield from self.comments
+
+    def create_comment(self, *, body: str) -> None:
+        self.comments.append(Comment(id=len(self.comments) + 1, author="", body=body))
+
+    def update_comment(self, *, comment_id: int, body: str) -> None:
+        next(c for c in self.comments if c.id == comment_id).body = body
+
+    def delete_comment(self, *, comment_id: int) -> None:
+        self.comments = [c for c in self.comments if c.id != comment_id]
+
+
+def get_output(client: FakeClient, **kwargs: str) -> GithubCommentOutput:
+    return GithubCommentOutput(client=client, **kwargs)  # type: ignore[arg-type]
+
+
+def post_results(output: GithubCommentOutput, results: list[MigrationResult]) -> None:
+    output.begin(len(results))
+    for result in results:
+        output.migration_result(Migration(result.name, result.app_label), result)
+    output.done()
+
+
+def large_result(name: str) -> MigrationResult:
+    return MigrationResult(
+        app_label="app",
+        name=name,
+        queries=[f"UPDATE app SET value = {i} -- {'x' * 2000}" for i in range(30)],
+        locks=[("app", "AccessExclusiveLock")],
+        warnings=[REMOVING_FIELD],
+    )
+
+
+def test_migration_md_truncates_sql() -> None:
+    result = large_result("0001_initial")
+    md = get_migration_md(
+        migration=Migration("0001_initial", "app"),
+        queries=result.queries,
+        locks=result.locks,
+        warnings=result.warnings,
+        include_source=False,
+        max_sql_length=5000,
+    )
+
+    assert f"-- Truncated {len(result.queries[0])} characters, sha1 " in md
+    assert "\n-- 26 more queries, see the full report\n" in md
+    assert len(md) < 6000
+
+
+def test_github_comment_is_split(tmp_path: Path) -> None:
+    client = FakeClient()
+    output = get_output(
+        client,
+        report_path=str(tmp_path / "report.md"),
+        report_url="https://github.com/org/repo/actions/runs/1",
+    )
+    post_results(output, [large_result(f"{i:04}_migration") for i in range(20)])
+
+    assert len(client.comments) > 1
+    assert all(
+        len(comment.body) <= COMMENT_BUDGET + 1000 for comment in client.comments
+    )
+    assert all(MARKER in comment.body for comment in client.comments)
+    body = "".join(comment.body for comment in client.comments)
+    assert all(f"## app.{i:04}_migration" in body for i in range(20))
+    assert (
+        "uploaded as the `report` artifact of "
+        "[the workflow run](https://github.com/org/repo/actions/runs/1)"
+    ) in body
+
+    # The report has all queries of all migrations
+    report = (tmp_path / "report.md").read_text()
+    assert report.count("UPDATE app SET value") == 20 * 30
+
+
+def test_github_comments_are_reused() -> None:
+    client = FakeClient()
+    client.comments = [Comment(id=1, author="", body="Unrelated")]
+    results = [large_result(f"{i:04}_migration") for i in range(20)]
+
+    post_results(get_output(client), results)
+    ids = [comment.id for comment in client.comments]
+    assert len(ids) > 2
+
+    post_results(get_output(client), results)
+    assert [comment.id for comment in client.comments] == ids
+
+    # Comments that are no longer needed are removed
+    post_results(get_output(client), results[:1])
+    assert [comment.id for comment in client.comments] == ids[:2]
+
+    get_output(client).no_migrations_to_apply()
+    assert [comment.id for comment in client.comments] == ids[:2]
+    assert "no longer contains any migrations" in client.comments[1].body
+
+
+def test_github_comment_omits_migrations() -> None:
+    client = FakeClient()
+    results = [
+        MigrationResult(
+            app_label="app",
+            name=f"{i:04}_{'x' * 200}",
+            warnings=[REMOVING_FIELD] * 100,
+        )
+        for i in range(200)
+    ]
+
+    post_results(get_output(client), results)
+
+    assert len(client.comments) == 10
+    assert "migrations did not fit in these comments" in client.comments[-1].body
+    assert " more\n" in client.comments[-1].body
+    assert all(len(comment.body) <= 65536 for comment in client.comments)
+
+
+def test_get_source() -> None:
+    module = import_module("tests.migrations.0001_initial")
+    migration = module.Migration("0001_initial", "tests")
+    get_class_sources.cache_clear()
+
+    assert get_source(migration) == inspect.getsource(module.Migration)
+    assert get_source(migration) == inspect.getsource(module.Migration)
+    assert get_class_sources.cache_info().misses == 1
+
+
+def test_query_fingerprint() -> None:
+    assert get_query_fingerprint(
+        "UPDATE app SET name = 'a' WHERE id = 1"
+    ) == get_query_fingerprint("UPDATE app  SET name = 'it''s'\nWHERE id = 22")
+    assert get_query_fingerprint("SELECT 1 FROM a") != get_query_fingerprint(
+        "SELECT 1 FROM b"
+    )
+
+
+def test_json_lines_and_sarif_outputs(tmp_path: Path) -> None:
+    module = import_module("tests.migrations.0001_initial")
+    migration = module.Migration("0001_initial", "tests")
+    result = MigrationResult(
+        app_label="tests",
+        name="0001_initial",
+        queries=["CREATE TABLE a (id int)"],
+        locks=[("a", "AccessExclusiveLock")],
+        warnings=[REMOVING_FIELD],
+        duration=0.5,
+    )
+
+    outputs: list[Output] = [
+        JsonLinesOutput(path=str(tmp_path / "results.jsonl")),
+        SarifOutput(path=str(tmp_path / "results.sarif")),
+    ]
+    for output in outputs:
+        output.begin(1)
+        output.migration_result(migration, result)
+        output.done()
+
+    records = (tmp_path / "results.jsonl").read_text().splitlines()
+    assert [json.loads(record) for record in records] == [
+        {
+            "app_label": "tests",
+            "name": "0001_initial",
+            "file": "tests/migrations/0001_initial.py",
+            "line": 6,
+            "backwards": False,
+            "duration": 0.5,
+            "warnings": [
+                {
+                    "rule": "removing-a-field",
+                    "level": "notice",
+                    "title": "Removing a field",
+                }
+            ],
+            "locks": [{"table": "a", "mode": "AccessExclusiveLock"}],
+            "locks_predicted": False,
+            "batches": [],
+            "bloat": None,
+            "num_queries": 1,
+            "query_fingerprints": [get_query_fingerprint("CREATE TABLE a (id int)")],
+        }
+    ]
+
+    sarif = json.loads((tmp_path / "results.sarif").read_text())
+    [run] = sarif["runs"]
+    assert [rule["id"] for rule in run["tool"]["driver"]["rules"]] == [
+        "removing-a-field"
+    ]
+    [sarif_result] = run["results"]
+    assert sarif_result["level"] == "note"
+    location = sarif_result["locations"][0]["physicalLocation"]
+    assert location["artifactLocation"]["uri"] == "tests/migrations/0001_initial.py"
+    assert location["region"] == {"startLine": 6}
+
+
+def test_progress_output() -> None:
+    stream = io.StringIO()
+    output = ProgressOutput(
+        expected_durations={("app", "0001_initial"): 1.0, ("app", "0002_slow"): 3.0},
+        stream=stream,
+        interval=0,
+    )
+    output.begin(4)
+    output.migration_result(
+        Migration("0001_initial", "app"),
+        MigrationResult(
+            app_label="app",
+            name="0001_initial",
+            locks=[("a", "AccessExclusiveLock")],
+            duration=0.5,
+        ),
+    )
+    output.migration_result(
+        Migration("0002_slow", "app"),
+        MigrationResult(
+            app_label="app", name="0002_slow", warnings=[REMOVING_FIELD], duration=1.5
+        ),
+    )
+    output.done()
+
+    lines = stream.getvalue().splitlines()
+    assert lines[1].startswith("✅ app.0001_initial")
+    assert "AccessExclusiveLock on a" in lines[1]
+    assert lines[3].startswith("💡 app.0002_slow")
+    assert lines[3].endswith(": Removing a field")
+    assert lines[-1].startswith("⏳ 2/4 migrations")
+
+    # Twice as fast as earlier runs, which took 2s per migration on average
+    assert output.get_eta(elapsed=2) == 2 * 2 * 0.5
+
+
+def test_progress_eta_uses_plan() -> None:
+    output = ProgressOutput(
+        expected_durations={
+            ("app", "0001_initial"): 1.0,
+            ("app", "0002_quick"): 1.0,
+            ("app", "0099_slow"): 100.0,
+        },
+        stream=io.StringIO(),
+    )
+    output.begin(
+        3, keys=[("app", "0001_initial"), ("app", "0002_quick"), ("app", "0003_new")]
+    )
+    output.migration_result(
+        Migration("0001_initial", "app"),
+        MigrationResult(app_label="app", name="0001_initial", duration=0.5),
+    )
+
+    # The slow migration isn't in the plan, so it only counts towards the
+    # estimate of the migration without history
+    assert output.get_eta(elapsed=1) == (1.0 + 34.0) * 0.5
@@ -0,0 +1,70 @@
+from django.db import migrations
+from django.db.migrations.graph import MigrationGraph
+
+from migration_checker.parallel import partition_plan, split_plan
+
+
+def build_graph(
+    *dependencies: tuple[str, list[str]]
+) -> tuple[MigrationGraph, list[migrations.Migration]]:
+    graph = MigrationGraph()
+    plan = []
+    for key, parents in dependencies:
+        app_label, name = key.split(".")
+        migration = migrations.Migration(name, app_label)
+        graph.add_node((app_label, name), migration)
+        for parent in parents:
+            graph.add_dependency(
+                migration, (app_label, name), tuple(parent.split("."))  # type: ignore
+            )
+        plan.append(migration)
+    return graph, plan
+
+
+def keys(groups: list[list[migrations.Migration]]) -> list[list[str]]:
+    return [
+        [f"{migration.app_label}.{migration.name}" for migration in group]
+        for group in groups
+    ]
+
+
+def test_split_plan() -> None:
+    graph, plan = build_graph(
+        ("a.0001", []),
+        ("b.0001", []),
+        ("a.0002", ["a.0001"]),
+        ("c.0001", ["b.0001"]),
+        ("d.0001", []),
+    )
+    assert keys(split_plan(graph, plan)) == [
+        ["a.0001", "a.0002"],
+        ["b.0001", "c.0001"],
+        ["d.0001"],
+    ]
+
+
+def test_split_plan_joins_groups() -> None:
+    graph, plan = build_graph(
+        ("a.0001", []),
+        ("b.0001", []),
+        ("c.0001", ["a.0001", "b.0001"]),
+    )
+    assert keys(split_plan(graph, plan)) == [["a.0001", "b.0001", "c.0001"]]
+
+
+def test_partition_plan() -> None:
+    graph, plan = build_graph(
+        ("a.0001", []),
+        ("b.0001", []),
+        ("a.0002", ["a.0001"]),
+        ("c.0001", []),
+        ("a.0003", ["a.0002"]),
+    )
+    assert keys(partition_plan(graph, plan, 2)) == [
+        ["a.0001", "a.0002", "a.0003"],
+        ["b.0001", "c.0001"],
+    ]
+    assert keys(partition_plan(graph, plan, 1)) == [
+        ["a.0001", "b.0001", "a.0002", "c.0001", "a.0003"]
+    ]
+    assert len(partition_plan(graph, plan, 5)) == 3
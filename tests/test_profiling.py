@@ -0,0 +1,51 @@
+import importlib
+import sys
+from pathlib import Path
+
+import pytest
+
+from migration_checker.profiling import Profiler
+
+
+def test_phases() -> None:
+    profiler = Profiler()
+    with profiler.phase("outer"):
+        with profiler.phase("inner"):
+            pass
+
+    outer, inner = profiler.phases
+    assert (outer.name, outer.depth) == ("outer", 0)
+    assert (inner.name, inner.depth) == ("inner", 1)
+    assert outer.start <= inner.start
+    assert outer.duration >= inner.duration
+
+    events = profiler.get_trace_events()["traceEvents"]
+    assert [event["name"] for event in events] == ["outer", "inner"]
+    assert all(event["ph"] == "X" for event in events)
+
+
+def test_time_imports(tmp_path: Path) -> None:
+    (tmp_path / "profiled_parent.py").write_text("import profiled_child\n")
+    (tmp_path / "profiled_child.py").write_text("VALUE = 1\n")
+    sys.path.insert(0, str(tmp_path))
+
+    profiler = Profiler()
+    try:
+        with profiler.time_imports():
+            module = importlib.import_module("profiled_parent")
+    finally:
+        sys.path.remove(str(tmp_path))
+        sys.modules.pop("profiled_parent", None)
+        sys.modules.pop("profiled_child", None)
+
+    # The wrapping loader is not visible to the imported module
+    assert module.__loader__.__class__.__name__ == "SourceFileLoader"
+
+    parent, child = profiler.imports
+    assert (parent.module, parent.depth) == ("profiled_parent", 0)
+    assert (child.module, child.depth) == ("profiled_child", 1)
+    assert parent.self_time == pytest.approx(parent.cumulative - child.cumulative)
+    assert [timing["module"] for timing in profiler.get_report()["imports"]] == [
+        "profiled_parent",
+        "profiled_child",
+    ]
@@ -0,0 +1,109 @@
+from importlib.metadata import EntryPoint
+from pathlib import Path
+from typing import Iterable
+
+import pytest
+from django.db.migrations import Migration, RemoveField
+from django.db.migrations.state import ProjectState
+
+from migration_checker import registry
+from migration_checker.profiling import Profiler
+from migration_checker.registry import CheckRegistry, load_config
+from migration_checker.warnings import REMOVING_FIELD, Warning
+
+TOO_MANY_OPERATIONS = Warning(title="Too many operations", description="")
+
+
+def check_num_operations(
+    *, migration: Migration, state: ProjectState, max_operations: int = 10
+) -> Iterable[Warning]:
+    if len(migration.operations) > max_operations:
+        yield TOO_MANY_OPERATIONS
+
+
+@pytest.fixture
+def plugin(monkeypatch: pytest.MonkeyPatch) -> None:
+    entry_point = EntryPoint(
+        name="num_operations",
+        value="tests.test_registry:check_num_operations",
+        group=registry.ENTRY_POINT_GROUP,
+    )
+    monkeypatch.setattr(
+        registry, "entry_points", lambda group: [entry_point] if group else []
+    )
+
+
+def get_migration() -> Migration:
+    class TestMigration(Migration):
+        operations = [RemoveField("order", "number")]
+
+    return TestMigration("0002_remove_field", "tests")
+
+
+def test_builtin_checks() -> None:
+    checks = CheckRegistry()
+    assert "remove_field" in checks.enabled
+    assert checks.run(get_migration(), ProjectState()) == [REMOVING_FIELD]
+
+    checks = CheckRegistry(disable=["remove_field"])
+    assert checks.run(get_migration(), ProjectState()) == []
+
+    with pytest.raises(ValueError, match="Unknown check 'typo'"):
+        CheckRegistry(enable=["typo"])
+
+
+def test_plugin_checks(plugin: None) -> None:
+    checks = CheckRegistry(enable=["num_operations"])
+    assert checks.loaded == {}
+    assert checks.run(get_migration(), ProjectState()) == []
+
+    checks = CheckRegistry(
+        enable=["num_operations"], options={"num_operations": {"max_operations": 0}}
+    )
+    profiler = Profiler()
+    assert checks.run(get_migration(), ProjectState(), profiler=profiler) == [
+        TOO_MANY_OPERATIONS
+    ]
+    assert [name for name, _ in profiler.get_slowest("check ")] == ["num_operations"]
+
+
+def test_load_config(tmp_path: Path) -> None:
+    path = tmp_path / "pyproject.toml"
+    path.write_text(
+        """
+[tool.migration_checker]
+disable = ["remove_field"]
+
+[tool.migration_checker.checks.num_operations]
+max_operations = 5
+"""
+    )
+
+    assert load_config(str(path)) == {
+        "disable": ["remove_field"],
+        "checks": {"num_operations": {"max_operations": 5}},
+    }
+    assert load_config(str(tmp_path / "missing.toml")) == {}
+
+
+def test_load_config_without_section(tmp_path: Path) -> None:
+    path = tmp_path / "pyproject.toml"
+    path.write_text(
+        """
+[tool.poetry]
+packages = [{ include = "migration_checker" }]
+"""
+    )
+
+    assert load_config(str(path)) == {}
+
+
+def test_load_config_without_tomllib(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    path = tmp_path / "pyproject.toml"
+    path.write_text("[tool.migration_checker]\ndisable = []\n")
+    monkeypatch.setattr(registry, "tomllib", None)
+
+    assert load_config(str(path)) == {}
+    assert "requires tomli" in capsys.readouterr().err
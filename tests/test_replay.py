@@ -0,0 +1,65 @@
+import json
+from pathlib import Path
+
+from django.core.management import call_command
+from django.db import connection
+
+from migration_checker.executor import Executor
+from migration_checker.output import ResultFileOutput
+from migration_checker.replay import Replayer, read_corpus, record_corpus
+from migration_checker.results import read_results
+from migration_checker.warnings import OLD_QUERIES_FAIL
+
+
+def test_record_corpus(setup_db: None, tmp_path: Path) -> None:
+    path = str(tmp_path / "corpus.jsonl")
+    with record_corpus(path):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT %s", [1])
+            cursor.execute("SELECT %s", [2])
+            cursor.execute("SELECT %s, %s", ["a", 1])
+            cursor.execute("SET search_path = public")
+
+    assert read_corpus(path) == ["SELECT 1", "SELECT 'a', 1"]
+
+    # Queries already in the corpus are not added again
+    with record_corpus(path):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT %s", [3])
+    assert len(read_corpus(path)) == 2
+
+
+def test_replay(setup_db: None, tmp_path: Path) -> None:
+    call_command("migrate", "tests", "0001", verbosity=0)
+
+    corpus_path = tmp_path / "corpus.jsonl"
+    corpus_path.write_text(
+        "".join(
+            json.dumps({"sql": sql}) + "\n"
+            for sql in [
+                "SELECT id FROM tests_order",
+                "INSERT INTO tests_order (id) VALUES (1)",
+                "SELECT missing FROM tests_order",
+            ]
+        )
+    )
+    results_path = str(tmp_path / "results.json")
+    Executor(
+        database="default",
+        apply_migrations=True,
+        outputs=[ResultFileOutput(path=results_path)],
+        replayer=Replayer(connection=connection, queries=read_corpus(str(corpus_path))),
+    ).run()
+
+    warnings = {
+        result.name: [warning.title for warning in result.warnings]
+        for result in read_results(results_path)
+    }
+    # The new column is NOT NULL without a default, so old inserts fail
+    assert OLD_QUERIES_FAIL.title in warnings["0002_auto_20230207_1532"]
+    assert OLD_QUERIES_FAIL.title not in warnings["0003_alter_order_number"]
+
+    # The inserted row is rolled back
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT count(*) FROM tests_order")
+        assert cursor.fetchone() == (0,)
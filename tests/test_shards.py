@@ -0,0 +1,56 @@
+from pathlib import Path
+
+from django.db.migrations.loader import MigrationLoader
+
+from migration_checker.executor import Executor
+from migration_checker.output import ConsoleOutput, ResultFileOutput
+from migration_checker.results import MigrationResult, read_results, write_results
+from migration_checker.shards import get_plan_order, merge_results
+from migration_checker.warnings import REMOVING_FIELD
+
+
+def test_results_round_trip(tmp_path: Path) -> None:
+    results = [
+        MigrationResult(
+            app_label="tests",
+            name="0001_initial",
+            queries=["SELECT 1"],
+            locks=[("tests_order", "AccessExclusiveLock")],
+            warnings=[REMOVING_FIELD],
+        ),
+        MigrationResult(app_label="tests", name="0002_auto_20230207_1532"),
+    ]
+    write_results(str(tmp_path / "results.json"), results)
+    assert read_results(str(tmp_path / "results.json")) == results
+
+
+def test_get_plan_order(setup_django: None) -> None:
+    loader = MigrationLoader(None, ignore_no_migrations=True)
+    assert list(get_plan_order(loader.graph)) == [
+        ("tests", "0001_initial"),
+        ("tests", "0002_auto_20230207_1532"),
+        ("tests", "0003_alter_order_number"),
+        ("tests", "0004_orderline_order"),
+    ]
+
+
+def test_merge_shards(setup_db: None, tmp_path: Path) -> None:
+    paths = [str(tmp_path / f"shard{index}.json") for index in (1, 2)]
+    for index, path in enumerate(paths, start=1):
+        Executor(
+            database="default",
+            apply_migrations=False,
+            outputs=[ResultFileOutput(path=path)],
+            shard=(index, 2),
+        ).run()
+
+    # All migrations depend on each other, so they end up in the first shard
+    assert len(read_results(paths[0])) == 4
+    assert read_results(paths[1]) == []
+
+    merged_path = str(tmp_path / "merged.json")
+    merge_results(
+        paths=list(reversed(paths)),
+        outputs=[ConsoleOutput(), ResultFileOutput(path=merged_path)],
+    )
+    assert read_results(merged_path) == read_results(paths[0])
@@ -0,0 +1,54 @@
+import pytest
+
+from migration_checker.sql import iter_statement_keywords, must_be_non_atomic
+
+
+@pytest.mark.parametrize(
+    "sql,non_atomic",
+    [
+        ("CREATE INDEX CONCURRENTLY foo ON bar (baz)", True),
+        ("create unique index concurrently foo on bar (baz)", True),
+        ("SELECT 1; DROP INDEX CONCURRENTLY foo;", True),
+        ("REINDEX INDEX CONCURRENTLY foo", True),
+        ("CREATE INDEX foo ON bar (baz)", False),
+        ("/* CREATE INDEX CONCURRENTLY */ CREATE INDEX foo ON bar (baz)", False),
+        ("INSERT INTO foo VALUES ('CREATE INDEX CONCURRENTLY', 'it''s')", False),
+        ("INSERT INTO foo VALUES (E'\\' CREATE INDEX CONCURRENTLY')", False),
+        (
+            "CREATE FUNCTION f() RETURNS void AS $body$ "
+            "VACUUM; CREATE INDEX CONCURRENTLY foo ON bar (baz) "
+            "$body$ LANGUAGE sql",
+            False,
+        ),
+        ("DO $$ BEGIN CREATE INDEX CONCURRENTLY foo ON bar (baz); END $$", False),
+        ("DO $$ BEGIN NULL; END $$; VACUUM foo", True),
+        ("DO $$ BEGIN NULL; END $$; ALTER TYPE mood ADD VALUE 'happy'", True),
+        ('CREATE INDEX "concurrently" ON bar (baz)', False),
+        ("ALTER TYPE mood RENAME VALUE 'sad' TO 'blue'", False),
+        # Unterminated strings are left to sqlparse
+        ("CREATE INDEX CONCURRENTLY foo ON bar ('baz", True),
+    ],
+)
+def test_must_be_non_atomic(sql: str, non_atomic: bool) -> None:
+    assert must_be_non_atomic(sql) is non_atomic
+
+
+def test_large_query() -> None:
+    rows = ",\n".join(f"({index}, 'row; {index}')" for index in range(100_000))
+    sql = f"INSERT INTO foo (id, name) VALUES {rows};\nVACUUM foo;"
+
+    assert [first_word for first_word, _ in iter_statement_keywords(sql)] == [
+        "INSERT",
+        "VACUUM",
+    ]
+    assert must_be_non_atomic(sql)
+
+
+def test_large_query_with_dollar_quotes() -> None:
+    rows = ",\n".join(f"({index}, 'row; {index}')" for index in range(100_000))
+    sql = f"DO $$ BEGIN NULL; END $$;\nINSERT INTO foo (id, name) VALUES {rows};"
+
+    assert [first_word for first_word, _ in iter_statement_keywords(sql)] == [
+        "DO",
+        "INSERT",
+    ]
@@ -0,0 +1,45 @@
+from pathlib import Path
+
+from migration_checker.executor import Executor
+from migration_checker.results import MigrationResult, QueryTiming
+from migration_checker.timeline import TimelineOutput, get_bars
+
+
+def test_lock_intervals() -> None:
+    result = MigrationResult(
+        app_label="app",
+        name="0002_add_field",
+        queries=["ALTER TABLE a ADD COLUMN b int", "UPDATE a SET b = 1"],
+        locks=[("a", "AccessExclusiveLock"), ("a", "RowExclusiveLock")],
+        timings=[
+            QueryTiming(start=0.0, duration=0.1, locks=[("a", "AccessExclusiveLock")]),
+            QueryTiming(
+                start=0.1,
+                duration=0.9,
+                locks=[("a", "AccessExclusiveLock"), ("a", "RowExclusiveLock")],
+            ),
+        ],
+    )
+
+    assert [(bar.label, bar.start, bar.end) for bar in get_bars(result)] == [
+        ("ALTER TABLE a ADD COLUMN b int", 0.0, 0.1),
+        ("UPDATE a SET b = 1", 0.1, 1.0),
+        ("🔒 a AccessExclusiveLock", 0.0, 1.0),
+        ("🔒 a RowExclusiveLock", 0.1, 1.0),
+    ]
+
+
+def test_timeline(setup_db: None, tmp_path: Path) -> None:
+    path = tmp_path / "timeline.html"
+    Executor(
+        database="default",
+        apply_migrations=True,
+        outputs=[TimelineOutput(path=str(path))],
+        lock_timeline=True,
+    ).run()
+
+    timeline = path.read_text()
+    assert "<h2>tests.0001_initial</h2>" in timeline
+    assert "CREATE TABLE" in timeline
+    assert "🔒 tests_order AccessExclusiveLock" in timeline
+    assert timeline.endswith("</html>\n")
@@ -0,0 +1,86 @@
+import json
+import socket
+from pathlib import Path
+from typing import Any
+
+from django.db.migrations.loader import MigrationLoader
+
+from migration_checker.warnings import (
+    ADDING_FIELD_WITH_CHECK,
+    ADDING_NON_NULLABLE_FIELD,
+    ALTERING_MULTIPLE_MODELS,
+)
+from migration_checker.watch import Inotify, Poller, Watcher
+
+
+def test_poller(tmp_path: Path) -> None:
+    poller = Poller([str(tmp_path)])
+    assert poller.read() == set()
+
+    (tmp_path / "0001_initial.py").write_text("")
+    (tmp_path / "README").write_text("")
+    assert poller.read() == {str(tmp_path / "0001_initial.py")}
+    assert poller.read() == set()
+
+
+def test_inotify(tmp_path: Path) -> None:
+    inotify = Inotify([str(tmp_path)])
+    assert inotify.read() == set()
+
+    (tmp_path / "0001_initial.py").write_text("")
+    assert inotify.read() == {str(tmp_path / "0001_initial.py")}
+
+
+def test_watcher_check(setup_django: None) -> None:
+    watcher = Watcher(socket_path="unused")
+    watcher.loader = MigrationLoader(None, ignore_no_migrations=True)
+    watcher.modules = watcher._get_migrations_modules()
+
+    path = Path(__file__).parent / "migrations" / "0002_auto_20230207_1532.py"
+    key = watcher._get_key(str(path))
+    assert key == ("tests", "0002_auto_20230207_1532")
+
+    result = watcher.check(key)
+    assert set(result.warnings) == {
+        ADDING_FIELD_WITH_CHECK,
+        ADDING_NON_NULLABLE_FIELD,
+        ALTERING_MULTIPLE_MODELS,
+    }
+
+    # Reloading the file re-checks the migration, but reuses the cached state
+    watcher.reload({str(path)})
+    assert len(watcher.states) == 1
+    assert watcher.results[key] is not result
+    assert watcher.results[key] == result
+
+
+def test_watcher_malformed_request(setup_django: None, tmp_path: Path) -> None:
+    watcher = Watcher(socket_path="unused")
+    watcher.loader = MigrationLoader(None, ignore_no_migrations=True)
+    watcher.modules = watcher._get_migrations_modules()
+    poller = Poller([str(tmp_path)])
+
+    def send(request: bytes) -> dict[str, Any]:
+        client, server = socket.socketpair()
+        with client, server:
+            client.sendall(request)
+            watcher._serve(server, poller)
+            response = json.loads(client.makefile("r").readline())
+        assert isinstance(response, dict)
+        return response
+
+    assert "JSONDecodeError" in send(b"not json\n")["error"]
+    assert "error" in send(b"[]\n")
+
+    # The daemon keeps answering after a bad request
+    path = Path(__file__).parent / "migrations" / "0002_auto_20230207_1532.py"
+    request = json.dumps({"paths": [str(path)]}).encode() + b"\n"
+    [result] = send(request)["results"]
+    assert result["name"] == "0002_auto_20230207_1532"
+
+    # Clients that hang up before the response don't stop the daemon either
+    client, server = socket.socketpair()
+    with server:
+        client.sendall(request)
+        client.close()
+        watcher._serve(server, poller)